@@ -0,0 +1,98 @@
+"""
+A bounded cache with least recently used eviction, an optional time to live and hit statistics, for the caches of
+model output and of transcription results.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+
+    def __init__(self, max_size: int, ttl=None):
+        """
+        :param max_size: the maximum number of entries, the least recently used entry is evicted beyond it
+        :param ttl: seconds an entry is valid after it was added, default: no limit
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        # key -> (value, expiry time or None)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        # the version of the data the entries were computed from, see validate()
+        self.version = None
+        self.invalidations = 0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and not self._expired(entry)
+
+    @staticmethod
+    def _expired(entry: tuple) -> bool:
+        return entry[1] is not None and entry[1] <= time.monotonic()
+
+    def get(self, key, default=None):
+        """ The value of 'key', counted as a hit, or 'default', counted as a miss. Expired entries are removed. """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry):
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value) -> None:
+        expiry = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expiry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """ Removes all entries, the statistics are kept """
+        with self._lock:
+            self._entries.clear()
+
+    def validate(self, version) -> bool:
+        """
+        Clears the cache if 'version' differs from the version the entries were computed from.
+        :return: True if the entries are valid for 'version'
+        """
+        with self._lock:
+            if version == self.version:
+                return True
+            if self._entries:
+                self._entries.clear()
+                self.invalidations += 1
+            self.version = version
+            return False
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {'size': len(self._entries), 'max_size': self.max_size, 'ttl': self.ttl, 'hits': self.hits,
+                'misses': self.misses, 'evictions': self.evictions, 'expirations': self.expirations,
+                'invalidations': self.invalidations, 'hit_rate': self.hits / lookups if lookups else 0.0}
@@ -1,95 +1,133 @@
 """
 Converts phonetic transcriptions in one alphabet to transcriptions in another alphabet
 """
-import os
+import logging
+from collections import Counter
+from functools import lru_cache
 
-package_path = os.path.dirname(os.path.abspath(__file__))
-ALPHABETS_FILE = os.path.join(package_path, 'data/sampa_ipa_single_flite.csv')
+from ice_g2p import dictionaries
+from ice_g2p.phone_inventory import get_inventory
 
 
-class Converter:
+@lru_cache(maxsize=None)
+def get_valid_alphabets() -> tuple:
+    """
+    Returns the names of all alphabets in ALPHABETS_FILE
+    """
+    return tuple(dictionaries.get_alphabets_table()[0])
 
-    def __init__(self):
-        self.alphabet_dictionary = self.init_dict()
 
-    def init_dict(self):
-        """
-        Initialize a symbol dictionary where we can look up mappings between all alphabets in ALPHABETS_FILE.
-        The result is a dictionary of dictionaries, where the top-level keys are the names of the alphabets
-        and the sub-dictionaries the mappings from a top-level dictionary to all other dictionaries.
+@lru_cache(maxsize=None)
+def get_symbol_table(from_alphabet: str, to_alphabet: str) -> dict:
+    """
+    Returns a flat mapping of each symbol in 'from_alphabet' to the corresponding symbol in 'to_alphabet'.
+    The table is built once per pair of alphabets and shared by all converters.
 
-        Example:
-        {'SAMPA' : {'a' : {'IPA' : 'a', 'SINGLE' : 'a', 'FLITE' : 'a'},
-                   {'a:' : {'IPA' : 'aː', 'SINGLE' : 'A', 'FLITE' : 'aa'},
-                   { ... }}
-        'IPA'   : { ... },
-        }
+    Example: get_symbol_table('SAMPA', 'IPA')
+        {'a': 'a', 'a:': 'aː', 'ai': 'ai', ... }
+    """
+    inventory = get_inventory(from_alphabet)
+    symbols = inventory.conversion[to_alphabet]
+    return {inventory.symbols[i]: symbols[i] for i in range(len(symbols)) if inventory.in_alphabet[i]}
 
-        """
-        alphabet_dictionary = {}
-        lines = self.read_mapping_file()
-        headers = lines[0].split('\t')
-        for ind, header in enumerate(headers):
-            alphabet_dictionary[header] = {}
-            for line in lines[1:]:
-                symbols = line.split('\t')
-                key_symbol = symbols[ind]
-                symbol_dict = {}
-                for i, h in enumerate(headers):
-                    if i == ind:
-                        continue
-                    else:
-                       symbol_dict[h] = symbols[i]
-                alphabet_dictionary[header][key_symbol] = symbol_dict
-        return alphabet_dictionary
-
-    def read_mapping_file(self):
-        with open(ALPHABETS_FILE) as f:
-            lines = f.read().splitlines()
-        return lines
+
+class Converter:
+
+    def __init__(self):
+        # symbols not found in the respective from-alphabet: (alphabet, symbol) -> count
+        self.unknown_symbols = Counter()
 
     def get_valid_alphabets(self):
-        return list(self.alphabet_dictionary.keys())
+        return list(get_valid_alphabets())
+
+    def validate(self, from_alphabet: str, to_alphabet: str):
+        valid = get_valid_alphabets()
+        if from_alphabet not in valid or to_alphabet not in valid:
+            raise ValueError(f"{from_alphabet} or {to_alphabet} is not contained in the converter's dictionary."
+                             f" Valid alphabets: {list(valid)}")
 
-    def convert(self, input: str, from_alphabet: str, to_alphabet: str):
+    def convert(self, input: str, from_alphabet: str, to_alphabet: str, passthrough=()):
         """
         Converts a transcription in one alphabet to another alphabet.
         Raises a ValueError if either from or to alphabet is not available for conversion.
         If a symbol in the input string is not found in the respective from alphabet, the symbol is
-        kept as is and not converted. A message is written to stdout if this happens.
+        kept as is and not converted. Such symbols are counted in 'unknown_symbols', see report_unknown().
 
         :param input: a transcribed string, the symbols have to be separated by a space character
         :param from_alphabet: the alphabet of the input string
         :param to_alphabet: the alphabet to convert the input string into
+        :param passthrough: symbols to keep as they are without counting them as unknown, e.g. separators
         :return: a converted transcription
         """
-
-        valid = self.get_valid_alphabets()
-        if from_alphabet not in valid or to_alphabet not in valid:
-            raise ValueError(f"{from_alphabet} or {to_alphabet} is not contained in the converter's dictionary."
-                             f" Valid alphabets: {valid}")
-
+        self.validate(from_alphabet, to_alphabet)
         if from_alphabet == to_alphabet:
             return input
+        return self._convert(input, from_alphabet, get_symbol_table(from_alphabet, to_alphabet), passthrough)
 
-        converted_str = ''
-        current_dict = self.alphabet_dictionary[from_alphabet]
+    def _convert(self, input: str, from_alphabet: str, table: dict, passthrough) -> str:
+        converted = []
         for symbol in input.split():
-            if symbol not in current_dict:
-                print(f'"{symbol}" seems not to be a valid symbol in {from_alphabet} alphabet. Skipping conversion.')
-                converted_str += symbol + ' '
+            converted_symbol = table.get(symbol)
+            if converted_symbol is None:
+                if symbol not in passthrough:
+                    self.unknown_symbols[(from_alphabet, symbol)] += 1
+                converted_symbol = symbol
+            converted.append(converted_symbol)
+        return ' '.join(converted)
+
+    def convert_many(self, transcripts: list, from_alphabet: str, to_alphabet: str, passthrough=()) -> list:
+        """
+        Converts each transcription in 'transcripts', see convert()
+        """
+        return list(self.convert_stream(transcripts, from_alphabet, to_alphabet, passthrough))
+
+    def convert_stream(self, transcripts, from_alphabet: str, to_alphabet: str, passthrough=()):
+        """
+        Converts the transcriptions of an iterable, e.g. the lines of a file, and yields the converted
+        transcriptions one by one.
+        """
+        self.validate(from_alphabet, to_alphabet)
+        table = get_symbol_table(from_alphabet, to_alphabet)
+        for transcript in transcripts:
+            if from_alphabet == to_alphabet:
+                yield transcript
             else:
-                converted_symbol = current_dict[symbol][to_alphabet]
-                converted_str += converted_symbol + ' '
+                yield self._convert(transcript, from_alphabet, table, passthrough)
+
+    def report_unknown(self) -> str:
+        """
+        Returns a summary of all symbols that could not be converted since the last report, or an empty
+        string if all symbols were valid. Resets the counts.
+        """
+        if not self.unknown_symbols:
+            return ''
+        report = ', '.join(f'"{symbol}" ({alphabet}): {count}'
+                           for (alphabet, symbol), count in self.unknown_symbols.most_common())
+        self.unknown_symbols.clear()
+        return 'Symbols not valid in the input alphabet, kept unconverted: ' + report
+
+
+_shared_converter = None
+
 
-        return converted_str.strip()
+def get_converter() -> Converter:
+    """
+    Returns a converter shared across the process
+    """
+    global _shared_converter
+    if _shared_converter is None:
+        _shared_converter = Converter()
+    return _shared_converter
 
 
 def main():
-    converter = Converter()
+    converter = get_converter()
     print(converter.get_valid_alphabets())
     print(converter.convert('p_h au f Y k l_0', 'SAMPA', 'IPA'))
+    report = converter.report_unknown()
+    if report:
+        logging.warning(report)
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,120 @@
+"""
+Reading and writing corpus files in file mode.
+
+Input files compressed with gzip (.gz), bzip2 (.bz2) or xz (.xz) are decompressed on the fly. Output files are
+written in large chunks, either as tab separated values (tsv, the original line in the first column if kept) or as
+one JSON object per line (jsonl) with the transcription of each token:
+
+    {"text": "hestur í haga", "transcription": "h E s t Y r i: h a: G a",
+     "tokens": [{"word": "hestur", "transcription": "h E s t Y r"}, ...]}
+
+Output files are named after the input file without its extension and compression suffix, e.g.
+corpus.txt.gz -> corpus_transcribed.tsv.gz, compressed like the input file unless another compression is given.
+"""
+
+import os
+import bz2
+import gzip
+import json
+import lzma
+from pathlib import Path
+
+OPENERS = {'gz': gzip.open, 'bz2': bz2.open, 'xz': lzma.open}
+OUTPUT_FORMATS = ('tsv', 'jsonl')
+# number of output lines joined to one write call
+WRITE_CHUNK_LINES = 10000
+# buffer size of uncompressed output files
+WRITE_BUFFER_SIZE = 1 << 20
+
+
+def compression_of(path) -> str:
+    """ The compression of 'path' by its suffix: 'gz', 'bz2', 'xz' or '' if not compressed """
+    suffix = Path(path).suffix[1:]
+    return suffix if suffix in OPENERS else ''
+
+
+def open_text(path, mode='r'):
+    """ Opens 'path' in text mode 'r' or 'w', compressed files are decompressed or compressed on the fly """
+    compression = compression_of(path)
+    if compression:
+        return OPENERS[compression](path, mode + 't')
+    if mode == 'w':
+        return open(path, mode, buffering=WRITE_BUFFER_SIZE)
+    return open(path, mode)
+
+
+def read_lines(path) -> list:
+    with open_text(path) as f:
+        return f.read().splitlines()
+
+
+def iter_lines(path):
+    """ The lines of 'path' without line breaks, read one by one """
+    with open_text(path) as f:
+        for line in f:
+            yield line.rstrip('\n')
+
+
+def base_name(path) -> str:
+    """ The file name of 'path' without compression suffix and extension: corpus.txt.gz -> corpus """
+    path = Path(path)
+    if compression_of(path):
+        path = path.with_suffix('')
+    return path.stem
+
+
+def output_path(filename, suffix: str, out_format='tsv', outdir=None, compression=None) -> str:
+    """
+    Returns the output file name for the input file 'filename', for example:
+    path/to/textfile.txt.gz -> path/to/textfile_transcribed.tsv.gz
+    :param suffix: the suffix to label the output file with
+    :param out_format: one of OUTPUT_FORMATS, the extension of the output file
+    :param outdir: the output directory, default: the directory of 'filename'
+    :param compression: 'gz', 'bz2', 'xz' or '' (no compression), default: the compression of 'filename'
+    """
+    if compression is None:
+        compression = compression_of(filename)
+    name = base_name(filename) + suffix + '.' + out_format
+    if compression:
+        name += '.' + compression
+    return str(Path(outdir) if outdir else Path(filename).parent) + '/' + name
+
+
+def format_record(line: str, transcription: str, out_format='tsv', keep_original=False, tokens=None) -> str:
+    """
+    Formats one output line (without line break).
+    :param tokens: for jsonl: a list of (word, transcription) tuples
+    """
+    if out_format == 'jsonl':
+        record = {'text': line, 'transcription': transcription}
+        if tokens is not None:
+            record['tokens'] = [{'word': wrd, 'transcription': transcr} for wrd, transcr in tokens]
+        return json.dumps(record, ensure_ascii=False)
+    if keep_original:
+        return line + '\t' + transcription
+    return transcription
+
+
+def write_records(path, records, out_format='tsv', keep_original=False) -> int:
+    """
+    Writes output 'records' to 'path', in chunks of WRITE_CHUNK_LINES lines.
+    :param records: an iterable of (line, transcription, tokens) tuples, see format_record()
+    :return: the number of lines written
+    """
+    if out_format not in OUTPUT_FORMATS:
+        raise ValueError(f'Output format "{out_format}" does not exist. Available: {list(OUTPUT_FORMATS)}')
+    directory = os.path.dirname(str(path))
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    count = 0
+    chunk = []
+    with open_text(path, 'w') as f:
+        for line, transcription, tokens in records:
+            chunk.append(format_record(line, transcription, out_format, keep_original, tokens) + '\n')
+            if len(chunk) >= WRITE_CHUNK_LINES:
+                f.write(''.join(chunk))
+                count += len(chunk)
+                chunk = []
+        f.write(''.join(chunk))
+        count += len(chunk)
+    return count
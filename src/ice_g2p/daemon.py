@@ -0,0 +1,317 @@
+"""
+A resident transcriber behind a Unix domain socket, so that repeated calls of 'ice-g2p -i' do not load the models
+and dictionaries each time.
+
+    $ ice-g2p daemon start -d -a standard,north
+    $ ice-g2p -i 'hestur í haga' -d        # answered by the daemon
+    $ ice-g2p daemon status
+    $ ice-g2p daemon stop
+
+The daemon loads one Transcriber with the given model settings (dialects, dictionary, custom dictionary file,
+language detection, morphological fallback, decoding). The CLI forwards string input to a running daemon if the
+daemon was started with the same model settings, otherwise (or if no daemon is running) it transcribes in-process
+as before. The output options (syllabification, stress, word separator) are set per request. The custom dictionary
+file is reloaded by the daemon when it changes.
+
+Protocol: the client sends a JSON line {"settings": {...}} (see model_settings()), answered by {"ok": true} or
+{"error": "..."}, followed by requests and responses as in serve.py. Instead of settings, the first line can hold
+a command: {"command": "status"} or {"command": "stop"}.
+
+The socket is '$ICE_G2P_SOCKET', 'ice-g2p.sock' in '$XDG_RUNTIME_DIR' or 'daemon.sock' in the private directory
+'ice-g2p-<uid>' (mode 0700) in the temporary directory. The socket is only accessible to its owner, and clients only
+connect to a socket owned by the same user. 'daemon start' writes the log of the daemon to '<socket>.log'.
+"""
+
+import os
+import sys
+import json
+import time
+import stat
+import socket
+import logging
+import argparse
+import tempfile
+import threading
+import subprocess
+import socketserver
+
+from ice_g2p import serve
+from ice_g2p.g2p_lstm import DECODING_PROFILES, decoding_settings
+
+SOCKET_ENV = 'ICE_G2P_SOCKET'
+# seconds to wait for a connection to the daemon
+CONNECT_TIMEOUT = 1.0
+# seconds to wait for the daemon to load the models on 'start'
+START_TIMEOUT = 300
+
+
+def socket_path(path=None) -> str:
+    if path:
+        return str(path)
+    if os.environ.get(SOCKET_ENV):
+        return os.environ[SOCKET_ENV]
+    if os.environ.get('XDG_RUNTIME_DIR'):
+        return os.path.join(os.environ['XDG_RUNTIME_DIR'], 'ice-g2p.sock')
+    return os.path.join(tempfile.gettempdir(), f'ice-g2p-{os.getuid()}', 'daemon.sock')
+
+
+def make_socket_dir(path: str) -> None:
+    """
+    Creates the directory of the socket 'path' with mode 0700 if it does not exist.
+    :raises OSError: if the directory belongs to another user or is accessible to other users
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    dir_stat = os.lstat(directory)
+    if dir_stat.st_uid != os.getuid():
+        raise OSError(f'The socket directory {directory} belongs to another user')
+    if directory == os.path.dirname(socket_path()) and dir_stat.st_mode & 0o077:
+        raise OSError(f'The socket directory {directory} is accessible to other users')
+
+
+def owned_socket(path: str) -> bool:
+    """ True if 'path' is a socket of the current user """
+    try:
+        path_stat = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISSOCK(path_stat.st_mode) and path_stat.st_uid == os.getuid()
+
+
+def model_settings(dialects: list, use_dict=False, lang_detect=False, morph=False, decoding=None,
+                   custom_dict_file=None) -> dict:
+    """ The settings a daemon has to be started with to answer requests of a client with the same settings """
+    return {'dialects': list(dialects), 'use_dict': bool(use_dict), 'lang_detect': bool(lang_detect),
+            'morph': bool(morph), 'decoding': decoding_settings(**(decoding or {})),
+            'custom_dict': os.path.abspath(custom_dict_file) if custom_dict_file else None}
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+
+    def write(self, message: dict):
+        self.wfile.write((json.dumps(message, ensure_ascii=False) + '\n').encode('utf-8'))
+        self.wfile.flush()
+
+    def handle(self):
+        try:
+            hello = json.loads(self.rfile.readline().decode('utf-8'))
+        except ValueError as e:
+            self.write({'error': str(e)})
+            return
+        if not isinstance(hello, dict):
+            self.write({'error': 'the first line has to be a JSON object with "settings" or "command"'})
+            return
+        command = hello.get('command')
+        if command == 'status':
+            self.write({'pid': os.getpid(), 'settings': self.server.settings,
+                        'part_cache': self.server.requests.g2p.part_cache_stats(),
+                        'result_cache': self.server.requests.g2p.result_cache_stats()})
+            return
+        if command == 'stop':
+            self.write({'stopped': True})
+            threading.Thread(target=self.server.shutdown).start()
+            return
+        if hello.get('settings') != self.server.settings:
+            self.write({'error': 'the daemon was started with other settings', 'settings': self.server.settings})
+            return
+        self.write({'ok': True})
+        for line in self.rfile:
+            line = line.decode('utf-8')
+            if not line.strip():
+                continue
+            # the transcriber is not thread safe, one request at a time
+            with self.server.lock:
+                response = self.server.requests.handle_batch([line])[0]
+            self.write(response)
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, g2p, settings: dict):
+        """
+        :param path: the socket path
+        :param g2p: the resident transcriber
+        :param settings: the model settings of 'g2p', see model_settings()
+        """
+        self.settings = settings
+        self.lock = threading.Lock()
+        # the text is not stripped, so the output is the same as in-process
+        self.requests = serve.Server(g2p, {'dialect': g2p.dialects[0], 'syll': '', 'sep': '', 'stress': False,
+                                           'alphabet': None}, strip_text=False)
+        make_socket_dir(path)
+        if os.path.exists(path) and status(path) is None:
+            # left over from a daemon that did not shut down
+            os.unlink(path)
+        # the socket is created accessible to its owner only
+        umask = os.umask(0o177)
+        try:
+            super().__init__(path, RequestHandler)
+        finally:
+            os.umask(umask)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+def connect(path: str) -> socket.socket:
+    """ Connects to the daemon at 'path', which has to be a socket of the current user """
+    if not owned_socket(path):
+        raise OSError(f'{path} is not a socket of the current user')
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(CONNECT_TIMEOUT)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        raise
+    sock.settimeout(None)
+    return sock
+
+
+def send_command(path: str, command: str):
+    """ Sends 'command' to the daemon at 'path', returns the answer or None if no daemon is running """
+    if not os.path.exists(path):
+        return None
+    try:
+        with connect(path) as sock, sock.makefile('rw', encoding='utf-8') as f:
+            f.write(json.dumps({'command': command}) + '\n')
+            f.flush()
+            return json.loads(f.readline())
+    except (OSError, ValueError):
+        return None
+
+
+def status(path: str):
+    return send_command(path, 'status')
+
+
+def transcribe_remote(text: str, settings: dict, syllab_symbol='', word_sep='', stress_label=False, path=None):
+    """
+    Transcribes 'text' with a running daemon, one tab separated column per dialect like main.transcribe_line().
+    :return: the transcription, None if no daemon with the same 'settings' is running
+    """
+    path = socket_path(path)
+    if not os.path.exists(path):
+        return None
+    try:
+        with connect(path) as sock, sock.makefile('rw', encoding='utf-8') as f:
+            f.write(json.dumps({'settings': settings}, ensure_ascii=False) + '\n')
+            f.flush()
+            if not json.loads(f.readline()).get('ok'):
+                return None
+            for dialect in settings['dialects']:
+                f.write(json.dumps({'text': text, 'dialect': dialect, 'syll': syllab_symbol, 'sep': word_sep,
+                                    'stress': stress_label}, ensure_ascii=False) + '\n')
+            f.flush()
+            responses = [json.loads(f.readline()) for dialect in settings['dialects']]
+    except (OSError, ValueError):
+        return None
+    if any('transcription' not in response for response in responses):
+        return None
+    return '\t'.join(response['transcription'] for response in responses)
+
+
+def run(path: str, settings: dict, warm_cache=None, result_cache_size=0, result_cache_ttl=None) -> None:
+    """
+    Loads the transcriber and answers requests on 'path' until the daemon is stopped. The custom dictionary file
+    is reloaded when it changes.
+    :param warm_cache: cache files written by 'ice-g2p warm' to load, see warm.py
+    :param result_cache_size: answer repeated requests from a cache of up to this many results
+    :param result_cache_ttl: seconds a cached result is valid
+    """
+    from ice_g2p.transcriber import Transcriber
+    g2p = Transcriber(dialects=settings['dialects'], use_dict=settings['use_dict'],
+                      lang_detect=settings['lang_detect'], morph_fallback=settings['morph'],
+                      decoding=settings['decoding'], warm_cache=warm_cache,
+                      custom_dict_file=settings['custom_dict'], watch_custom_dict=True,
+                      result_cache_size=result_cache_size, result_cache_ttl=result_cache_ttl)
+    server = DaemonServer(path, g2p, settings)
+    logging.info(f'ice-g2p daemon {os.getpid()} listening on {path}')
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def start(path: str, argv: list) -> bool:
+    """
+    Starts 'run' with the options in 'argv' in a background process and waits until it answers.
+    :return: True if the daemon is running
+    """
+    if status(path) is not None:
+        logging.warning(f'A daemon is already running on {path}')
+        return True
+    try:
+        # the log is written next to the socket, before the daemon creates the directory
+        make_socket_dir(path)
+    except OSError as e:
+        logging.error(f'Could not start the daemon: {e}')
+        return False
+    with open(path + '.log', 'a') as log:
+        process = subprocess.Popen([sys.executable, '-m', 'ice_g2p.daemon', 'run'] + argv, stdin=subprocess.DEVNULL,
+                                   stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+    start_time = time.time()
+    while time.time() - start_time < START_TIMEOUT:
+        if status(path) is not None:
+            return True
+        if process.poll() is not None:
+            break
+        time.sleep(0.2)
+    logging.error(f'The daemon did not start, see {path}.log')
+    return False
+
+
+def get_arguments(argv: list):
+    parser = argparse.ArgumentParser(prog='ice-g2p daemon', description='Keep a transcriber loaded behind a Unix '
+                                     'domain socket, the ice-g2p command line tool forwards string input to it.')
+    parser.add_argument('command', choices=['start', 'run', 'stop', 'status'],
+                        help='start in the background, run in the foreground, stop or show the status')
+    parser.add_argument('--socket', help=f'socket path, default: ${SOCKET_ENV} or {socket_path()}')
+    parser.add_argument('--dialect', '-a', default='standard', help='dialect(s) to load, separated by commas')
+    parser.add_argument('--dict', '-d', action='store_true', help='use pronunciation dictionary')
+    parser.add_argument('--langdetect', '-l', action='store_true', help='use word-based language detection')
+    parser.add_argument('--morph', action='store_true', help='with --dict: use the morphological fallback')
+    parser.add_argument('--profile', default='default', choices=list(DECODING_PROFILES), help='decoding profile')
+    parser.add_argument('--beam', type=int, help='beam size, overrides the profile')
+    parser.add_argument('--lenpen', type=float, help='length penalty, overrides the profile')
+    parser.add_argument('--maxlen-a', type=float, help='maximum output length: maxlen-a * input length + maxlen-b')
+    parser.add_argument('--maxlen-b', type=int, help='maximum output length: maxlen-a * input length + maxlen-b')
+    parser.add_argument('--custom-dict', help='with --dict: custom dictionary file, reloaded when it changes')
+    parser.add_argument('--warm-cache', action='append', help='cache file written by "ice-g2p warm", used with '
+                        '--dict, can be given several times')
+    parser.add_argument('--result-cache', type=int, default=0, metavar='SIZE', help='answer repeated requests '
+                        'from a cache of up to SIZE results')
+    parser.add_argument('--result-cache-ttl', type=float, metavar='SECONDS', help='seconds a cached result is valid, '
+                        'default: until a dictionary changes')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    args = get_arguments(argv)
+    logging.basicConfig(level=logging.INFO)
+    path = socket_path(args.socket)
+    if args.command == 'status':
+        answer = status(path)
+        print(f'running (pid {answer["pid"]}): {json.dumps(answer["settings"])}' if answer else 'not running')
+        for name in ('part_cache', 'result_cache'):
+            if answer and answer.get(name) is not None:
+                print(f'{name}: {json.dumps(answer[name])}')
+    elif args.command == 'stop':
+        print('stopped' if send_command(path, 'stop') else 'not running')
+    else:
+        decoding = {'profile': args.profile, 'beam': args.beam, 'lenpen': args.lenpen, 'max_len_a': args.maxlen_a,
+                    'max_len_b': args.maxlen_b}
+        settings = model_settings(args.dialect.split(','), args.dict, args.langdetect, args.morph, decoding,
+                                  args.custom_dict)
+        if args.command == 'run':
+            run(path, settings, args.warm_cache, args.result_cache, args.result_cache_ttl)
+        elif not start(path, argv[:argv.index('start')] + argv[argv.index('start') + 1:]):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
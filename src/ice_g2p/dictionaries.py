@@ -6,6 +6,9 @@ HEAD_FILE = os.path.join(package_path, 'data/head_map.csv')
 MODIFIER_FILE = os.path.join(package_path, 'data/modifier_map.csv')
 VOWELS_FILE = os.path.join(package_path, 'data/vowels_sampa.txt')
 CONS_CLUSTERS_FILE = os.path.join(package_path, 'data/cons_clusters_sampa.txt')
+VOWELS_FILE_IPA = os.path.join(package_path, 'data/vowels_ipa.txt')
+CONS_CLUSTERS_FILE_IPA = os.path.join(package_path, 'data/cons_clusters_ipa.txt')
+ALPHABETS_FILE = os.path.join(package_path, 'data/sampa_ipa_single_flite.csv')
 
 
 def read_map(filename):
@@ -47,13 +50,27 @@ def get_modifier_map():
     return read_map(MODIFIER_FILE)
 
 
-def get_dictionary():
+def get_dictionary(dialect=None):
+    if dialect:
+        return read_dictionary(os.path.join(package_path, f'dictionaries/ice_pron_dict_{dialect}_clear.csv'))
     return read_dictionary(DICTIONARY_FILE)
 
 
-def get_vowels():
+def get_vowels(alphabet='SAMPA'):
+    if alphabet == 'IPA':
+        return read_list(VOWELS_FILE_IPA)
     return read_list(VOWELS_FILE)
 
 
-def get_cons_clusters():
+def get_cons_clusters(alphabet='SAMPA'):
+    if alphabet == 'IPA':
+        return read_list(CONS_CLUSTERS_FILE_IPA)
     return read_list(CONS_CLUSTERS_FILE)
+
+
+def get_alphabets_table():
+    """
+    Returns the phonetic alphabets mapping table as a list of rows, the first row contains the names
+    of the alphabets, each following row the symbols of one phone in all alphabets.
+    """
+    return [line.split('\t') for line in read_list(ALPHABETS_FILE)]
@@ -0,0 +1,231 @@
+"""
+Differential testing of optimized transcription paths against the reference pipeline.
+
+The reference pipeline transcribes line by line with Transcriber.transcribe(). A candidate configuration, e.g.
+corpus mode (transcribe the vocabulary in batches, then render each line) or the multi-dialect pass, has to
+produce exactly the same output. Both run side by side over the words of the pronunciation dictionary and/or a
+text corpus, with a deterministic stub model instead of the fairseq models, so the comparison does not depend on
+the model checkpoints.
+
+For the first divergent line the word level stages of both pipelines are traced: the g2p transcription (with its
+source, see FairseqG2P.transcription_source()), the syllabification and the stress labels. The report names the
+first word and stage where the pipelines differ, or the first differing output token if all stages agree.
+
+Example:
+    $ g2p-diff --config corpus --dict-words --corpus text.txt -d -y . -t
+    lines: 48489, divergent: 0
+"""
+
+import sys
+import argparse
+
+import ice_g2p.syllab_stress_processing as syllabify
+from ice_g2p.stress import set_stress
+from ice_g2p.transcriber import Transcriber
+
+STAGES = ('g2p', 'syllabification', 'stress')
+
+# letters to phones for the stub model, letters not contained are kept
+STUB_PHONES = {'a': 'a', 'á': 'au', 'b': 'p', 'c': 'k', 'd': 't', 'ð': 'D', 'e': 'E', 'é': 'j E', 'f': 'f',
+               'g': 'k', 'h': 'h', 'i': 'I', 'í': 'i', 'j': 'j', 'k': 'k', 'l': 'l', 'm': 'm', 'n': 'n', 'o': 'O',
+               'ó': 'ou', 'p': 'p', 'q': 'k', 'r': 'r', 's': 's', 't': 't', 'u': 'Y', 'ú': 'u', 'v': 'v',
+               'w': 'v', 'x': 'x s', 'y': 'I', 'ý': 'i', 'z': 's', 'þ': 'T', 'æ': 'ai', 'ö': '9', 'å': 'O',
+               'ä': 'E', 'ü': 'Y'}
+
+
+class StubModel:
+    """
+    A deterministic replacement of the fairseq hub interface: each letter is transcribed by STUB_PHONES,
+    regardless of the decoding settings.
+    """
+
+    def translate(self, sentences, beam=5, verbose=False, **kwargs):
+        if isinstance(sentences, list):
+            return [self.transcribe(sentence) for sentence in sentences]
+        return self.transcribe(sentences)
+
+    @staticmethod
+    def transcribe(sentence: str) -> str:
+        return ' '.join(STUB_PHONES.get(letter, letter) for letter in sentence.split())
+
+    def encode(self, sentence: str) -> str:
+        return sentence
+
+    def decode(self, tokens) -> str:
+        return tokens
+
+    def generate(self, tokenized_sentences, beam=5, nbest=1, **kwargs):
+        return [[{'tokens': self.transcribe(tokens), 'score': -float(i)} for i in range(nbest)]
+                for tokens in tokenized_sentences]
+
+
+def create_transcriber(options: dict, dialects=None) -> Transcriber:
+    return Transcriber(dialect=options.get('dialect', 'standard'), use_dict=options.get('use_dict', False),
+                       syllab_symbol=options.get('syllab_symbol', ''), word_sep=options.get('word_sep', ''),
+                       stress_label=options.get('stress_label', False), lang_detect=options.get('lang_detect', False),
+                       dialects=dialects, model=StubModel())
+
+
+def run_reference(options: dict, lines: list) -> tuple:
+    """
+    Transcribes 'lines' line by line with Transcriber.transcribe()
+    :return: the transcriber and a list of (word transcriptions, output) for each line
+    """
+    g2p = create_transcriber(options)
+    results = []
+    for line in lines:
+        transcripts = [g2p.transcribe_lang(wrd.strip(), icelandic=g2p.is_icelandic(wrd.strip()))
+                       for wrd in line.split(' ')]
+        results.append((transcripts, g2p.transcribe(line)))
+    return g2p, results
+
+
+def run_corpus(options: dict, lines: list) -> tuple:
+    """ Corpus mode: transcribe the vocabulary of all lines in batches, then render each line """
+    g2p = create_transcriber(options)
+    table = g2p.transcribe_vocabulary({wrd.strip() for line in lines for wrd in line.split(' ')})
+    return g2p, [([table.get(wrd.strip(), '') for wrd in line.split(' ')], g2p.render(line, table))
+                 for line in lines]
+
+
+def run_dialects(options: dict, lines: list) -> tuple:
+    """ Multi-dialect pass together with the other dialect, the column of the configured dialect is compared """
+    dialect = options.get('dialect', 'standard')
+    other = 'north' if dialect == 'standard' else 'standard'
+    g2p = create_transcriber(options, dialects=[dialect, other])
+    tables = g2p.transcribe_vocabulary_dialects({wrd.strip() for line in lines for wrd in line.split(' ')})
+    return g2p, [([tables[dialect].get(wrd.strip(), '') for wrd in line.split(' ')],
+                  g2p.render(line, tables[dialect])) for line in lines]
+
+
+CONFIGS = {'corpus': run_corpus,
+           'dialects': run_dialects}
+
+
+def trace_stages(g2p: Transcriber, line: str, transcripts: list, cached: bool) -> list:
+    """
+    Returns the stage outputs of each word of 'line', given the word transcriptions of the g2p stage:
+    a dictionary per word with the keys 'source', and STAGES as far as configured.
+    The reference syllabifies without, optimized paths with the syllabification cache.
+    """
+    words = line.split(' ')
+    stages = [{'source': g2p.word_source(wrd), 'g2p': transcr} for wrd, transcr in zip(words, transcripts)]
+    if not g2p.syllab_symbol:
+        return stages
+    entries = syllabify.init_pron_dict_from_tuples(list(zip(words, transcripts)), g2p.syllab_symbol)
+    if cached:
+        syllabified = syllabify.syllabify_and_label_cached(entries)
+    else:
+        syllabified = syllabify.syllabify_and_label(entries)
+    for stage, wrd in zip(stages, words):
+        stage['syllabification'] = syllabified[wrd].dot_format_syllables()
+    for stage, entry in zip(stages, set_stress([syllabified[wrd] for wrd in words])):
+        stage['stress'] = entry.simple_stress_format()
+    return stages
+
+
+def first_divergence(line_no: int, line: str, ref_g2p, ref_result, cand_g2p, cand_result) -> dict:
+    """
+    Locates the first divergence of a line: the first word and stage where the traces of the reference and the
+    candidate differ, or the first differing output token.
+    """
+    ref_transcripts, ref_output = ref_result
+    cand_transcripts, cand_output = cand_result
+    divergence = {'line_no': line_no, 'line': line, 'reference_output': ref_output, 'candidate_output': cand_output}
+    ref_trace = trace_stages(ref_g2p, line, ref_transcripts, cached=False)
+    cand_trace = trace_stages(cand_g2p, line, cand_transcripts, cached=True)
+    for ind, (wrd, ref_stages, cand_stages) in enumerate(zip(line.split(' '), ref_trace, cand_trace)):
+        for stage in STAGES:
+            if ref_stages.get(stage) != cand_stages.get(stage):
+                divergence.update({'word_index': ind, 'word': wrd, 'stage': stage,
+                                   'reference': ref_stages[stage], 'candidate': cand_stages[stage],
+                                   'reference_source': ref_stages['source'],
+                                   'candidate_source': cand_stages['source']})
+                return divergence
+    ref_tokens = ref_output.split(' ')
+    cand_tokens = cand_output.split(' ')
+    token_index = next((i for i, (ref, cand) in enumerate(zip(ref_tokens, cand_tokens)) if ref != cand),
+                       min(len(ref_tokens), len(cand_tokens)))
+    divergence.update({'stage': 'output', 'token_index': token_index,
+                       'reference': ref_tokens[token_index] if token_index < len(ref_tokens) else '',
+                       'candidate': cand_tokens[token_index] if token_index < len(cand_tokens) else ''})
+    return divergence
+
+
+def compare(lines: list, options: dict, config: str = 'corpus', run_candidate=None) -> dict:
+    """
+    Runs the reference pipeline and the candidate configuration over 'lines' and compares the outputs.
+    :param lines: the input lines
+    :param options: the transcriber options: dialect, use_dict, syllab_symbol, word_sep, stress_label, lang_detect
+    :param config: the candidate configuration, one of CONFIGS
+    :param run_candidate: a function (options, lines) -> (transcriber, results) to use instead of 'config'
+    :return: the number of 'lines', the number of 'divergent' lines and the 'first' divergence (None if all equal)
+    """
+    if run_candidate is None:
+        run_candidate = CONFIGS[config]
+    ref_g2p, ref_results = run_reference(options, lines)
+    cand_g2p, cand_results = run_candidate(options, lines)
+    divergent = 0
+    first = None
+    for line_no, (line, ref_result, cand_result) in enumerate(zip(lines, ref_results, cand_results), 1):
+        if ref_result[1] == cand_result[1]:
+            continue
+        divergent += 1
+        if first is None:
+            first = first_divergence(line_no, line, ref_g2p, ref_result, cand_g2p, cand_result)
+    return {'lines': len(lines), 'divergent': divergent, 'first': first}
+
+
+def format_report(report: dict) -> str:
+    result = f'lines: {report["lines"]}, divergent: {report["divergent"]}'
+    first = report['first']
+    if first:
+        result += f'\nfirst divergence in line {first["line_no"]}: "{first["line"]}"'
+        if first['stage'] == 'output':
+            result += f'\n  output token {first["token_index"]}'
+        else:
+            result += (f'\n  word {first["word_index"]} "{first["word"]}", stage: {first["stage"]}'
+                       f'\n  source: {first["reference_source"]} (reference), {first["candidate_source"]} (candidate)')
+        result += (f'\n  reference: {first["reference"]}\n  candidate: {first["candidate"]}'
+                   f'\n  reference output: {first["reference_output"]}\n  candidate output: {first["candidate_output"]}')
+    return result
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser(description='Compare an optimized transcription path with the reference '
+                                                 'pipeline, using a deterministic stub model.')
+    parser.add_argument('--config', default='corpus', choices=list(CONFIGS), help='the configuration to compare')
+    parser.add_argument('--dict-words', action='store_true', help='transcribe each word of the dictionary')
+    parser.add_argument('--corpus', help='a text file to transcribe line by line')
+    parser.add_argument('--limit', type=int, help='maximum number of lines from each input')
+    parser.add_argument('--dialect', '-a', default='standard', help='dialect to transcribe by')
+    parser.add_argument('--sep', '-s', default='', help='word separator to use')
+    parser.add_argument('--syll', '-y', default='', help='syllable separator to use')
+    parser.add_argument('--stress', '-t', action='store_true', help='use stress labels')
+    parser.add_argument('--dict', '-d', action='store_true', help='use pronunciation dictionary')
+    parser.add_argument('--langdetect', '-l', action='store_true', help='use word-based language detection')
+    return parser.parse_args()
+
+
+def main():
+    args = get_arguments()
+    lines = []
+    if args.dict_words:
+        from ice_g2p.dictionaries import get_dictionary
+        lines.extend(list(get_dictionary(args.dialect))[:args.limit])
+    if args.corpus:
+        with open(args.corpus) as f:
+            lines.extend(f.read().splitlines()[:args.limit])
+    if not lines:
+        print('Nothing to compare, use --dict-words and/or --corpus')
+        sys.exit(1)
+    options = {'dialect': args.dialect, 'use_dict': args.dict, 'syllab_symbol': args.syll, 'word_sep': args.sep,
+               'stress_label': args.stress, 'lang_detect': args.langdetect}
+    report = compare(lines, options, args.config)
+    print(format_report(report))
+    if report['divergent']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from ice_g2p.syllabification import VOWELS
+from ice_g2p.phone_inventory import get_inventory
+
+# length symbol and post aspiration symbol for each alphabet, SAMPA is the default
+PHON_SYMBOLS = {'SAMPA': (':', '_h'), 'IPA': ('ː', '\u02B0')}
 
 
 class PronDictEntry:
@@ -9,29 +12,38 @@ class PronDictEntry:
     Contains information on a pronunciation dict entry and methods to manipulate it
 
     The initialisation of a PronDictEntry object takes a word string and its transcription as parameters.
+    The phones of the transcription are stored as an array of phone ids (see phone_inventory), the syllables
+    of the entry are ranges in this array (see syllable.Syllable).
     """
+    __slots__ = ('word', 'transcript', 'phones', 'gpos', 'reference_transcr', 'syllables', 'frequency',
+                 'alphabet', 'syllab_symbol', '_transcript_variants', '_compound_elements', '_entailing_compounds')
 
-    def __init__(self, word='', transcription='', reference='', alphabet='SAMPA', syllab_symbol='.'):
+    def __init__(self, word='', transcription='', reference='', alphabet='SAMPA', syllab_symbol='.', phones=None):
         """
 
         :param word: a dictionary entry (ex: 'dag')
         :param transcription: transcription of 'word', with the phones space separated (ex: 't a: G')
+        :param phones: the transcription as an array of phone ids, if given 'transcription' is ignored
 
         """
         self.word = word
-        self.transcript = transcription.strip()
-        self.transcription_arr = self.transcript.split()
-        self.transcript_variants = set()
-        self.transcript_variants.add(self.transcript)
+        self.set_phon_symbols(alphabet)
+        if phones is None:
+            self.transcript = transcription.strip()
+            self.phones = self.inventory.encode(self.transcript)
+        else:
+            self.phones = phones
+            self.transcript = self.inventory.to_string(phones)
         self.gpos = 'nil'  # guessed part-of-speech
         # transcript, syllabification or stress labeled reference string for testing
         self.reference_transcr = reference
         self.syllables = []
-        self.compound_elements = []
-        self.entailing_compounds = [] # compounds where this word is one part
         self.frequency = 0
-        self.set_phon_symbols(alphabet)
         self.syllab_symbol = syllab_symbol
+        # only created when needed, most entries never use them
+        self._transcript_variants = None
+        self._compound_elements = None
+        self._entailing_compounds = None  # compounds where this word is one part
 
     def __str__(self):
         return self.word + '\t' + self.gpos + '\t' + self.transcript + '\t' + str(self.syllables)
@@ -39,14 +51,46 @@ class PronDictEntry:
     def __repr__(self):
         return self.__str__()
 
-    def set_phon_symbols(self, alphabet):
-        if alphabet == 'IPA':
-            self.length_symbol = 'ː'
-            self.post_aspir = '\u02B0'
-        else:
-            self.length_symbol = ':'
-            self.post_aspir = '_h'
+    @property
+    def inventory(self):
+        return get_inventory(self.alphabet)
+
+    @property
+    def transcription_arr(self):
+        return self.inventory.decode(self.phones)
+
+    @property
+    def transcript_variants(self):
+        if self._transcript_variants is None:
+            self._transcript_variants = {self.transcript}
+        return self._transcript_variants
 
+    @transcript_variants.setter
+    def transcript_variants(self, variants):
+        self._transcript_variants = variants
+
+    @property
+    def compound_elements(self):
+        if self._compound_elements is None:
+            self._compound_elements = []
+        return self._compound_elements
+
+    @property
+    def entailing_compounds(self):
+        if self._entailing_compounds is None:
+            self._entailing_compounds = []
+        return self._entailing_compounds
+
+    @property
+    def length_symbol(self):
+        return PHON_SYMBOLS[self.alphabet][0]
+
+    @property
+    def post_aspir(self):
+        return PHON_SYMBOLS[self.alphabet][1]
+
+    def set_phon_symbols(self, alphabet):
+        self.alphabet = 'IPA' if alphabet == 'IPA' else 'SAMPA'
 
     def simplify_compound_variants(self):
         tmp_variants = self.transcript_variants
@@ -69,11 +113,8 @@ class PronDictEntry:
         self.syllables[ind] = syll
 
     def cmu_format_syllables(self):
-        formatted_string = '('
-        for syll in self.syllables:
-            formatted_string += '((' + syll.content + ') ' + str(syll.stress) + ') '
-
-        return formatted_string.strip() + ')'
+        formatted = ['((' + syll.content + ') ' + str(syll.stress) + ')' for syll in self.syllables]
+        return '(' + ' '.join(formatted) + ')'
 
     def cmu_format(self):
         return '("' + self.word + '" ' + self.gpos + ' ' + self.cmu_format_syllables() + ')'
@@ -81,7 +122,7 @@ class PronDictEntry:
     def dot_format_syllables(self):
         sylls = ''
         for syll in self.syllables:
-            sylls += syll.content.strip() + f" {self.syllab_symbol} "
+            sylls += ' '.join(syll.phone_list()) + f" {self.syllab_symbol} "
         if len(sylls) > 3:
             # strip the last syllab_symbol with spaces from the word
             sylls = sylls[0:-3]
@@ -94,11 +135,11 @@ class PronDictEntry:
         sylls = ''
         for syll in self.syllables:
             stressed_phones = []
-            phones = syll.content.strip().split()
-            for p in phones:
-                if p in VOWELS:
-                    p = p + str(syll.stress)
-                stressed_phones.append(p)
+            for p in syll.phone_ids():
+                if self.inventory.is_vowel[p]:
+                    stressed_phones.append(self.inventory.symbols[p] + str(syll.stress))
+                else:
+                    stressed_phones.append(self.inventory.symbols[p])
 
             sylls += ' '.join(stressed_phones) + f" {self.syllab_symbol} "
 
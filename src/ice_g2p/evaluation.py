@@ -0,0 +1,140 @@
+"""
+Offline evaluation of accuracy and throughput against the shipped pronunciation dictionaries.
+
+A seeded sample of ice_pron_dict_<dialect>_clear.csv is held out and transcribed with the configured models,
+decoding profile and options. If the dictionary is used (--dict), the held-out words are removed from it first,
+such that only the compound parts and inflected forms of other words can be looked up. The report contains the
+phone error rate (PER), the word error rate (WER) and the number of words transcribed per second.
+
+Example:
+    $ g2p-evaluate --dialect standard --size 1000 --profile fast
+    dialect: standard, words: 1000, PER: ..., WER: ..., words/sec: ...
+"""
+
+import json
+import time
+import random
+import argparse
+
+DEFAULT_SAMPLE_SIZE = 1000
+
+
+def edit_distance(seq1, seq2) -> int:
+    """ Levenshtein distance between two sequences, e.g. two lists of phones """
+    prev = list(range(len(seq2) + 1))
+    for i, elem1 in enumerate(seq1, 1):
+        curr = [i]
+        for j, elem2 in enumerate(seq2, 1):
+            curr.append(min(prev[j] + 1, curr[j - 1] + 1, prev[j - 1] + (elem1 != elem2)))
+        prev = curr
+    return prev[-1]
+
+
+def split_dictionary(pron_dict: dict, size: int, seed: int = 1) -> tuple:
+    """
+    Splits 'pron_dict' into a held-out sample of 'size' entries, drawn with 'seed', and the remaining entries.
+    :return: a tuple (held_out, rest) of dictionaries
+    """
+    words = sorted(pron_dict)
+    random.Random(seed).shuffle(words)
+    held_out = {word: pron_dict[word] for word in words[:size]}
+    rest = {word: transcr for word, transcr in pron_dict.items() if word not in held_out}
+    return held_out, rest
+
+
+def score(hypotheses: dict, references: dict) -> dict:
+    """
+    Compares the transcriptions in 'hypotheses' to 'references' (word -> transcription, space separated phones).
+    A missing hypothesis counts as an empty transcription.
+    :return: the number of 'words', the phone error rate 'per' and the word error rate 'wer'
+    """
+    errors = phones = word_errors = 0
+    for word, reference in references.items():
+        ref_phones = reference.split()
+        hyp_phones = hypotheses.get(word, '').split()
+        dist = edit_distance(hyp_phones, ref_phones)
+        errors += dist
+        phones += len(ref_phones)
+        word_errors += dist > 0
+    return {'words': len(references),
+            'per': errors / phones if phones else 0.0,
+            'wer': word_errors / len(references) if references else 0.0}
+
+
+def evaluate(transcribe_words, references: dict) -> dict:
+    """
+    Transcribes the words of 'references' with 'transcribe_words' and scores the result, see score().
+    :param transcribe_words: a function transcribing a list of words, returns a dictionary word -> transcription
+    :return: the scores, the elapsed 'seconds' and 'words_per_sec'
+    """
+    start = time.perf_counter()
+    hypotheses = transcribe_words(list(references))
+    seconds = time.perf_counter() - start
+    report = score(hypotheses, references)
+    report['seconds'] = seconds
+    report['words_per_sec'] = len(references) / seconds if seconds > 0 else 0.0
+    return report
+
+
+def evaluate_transcriber(dialect='standard', size=DEFAULT_SAMPLE_SIZE, seed=1, use_dict=False, morph=False,
+                         decoding=None, batch=False) -> dict:
+    """
+    Evaluates a Transcriber for 'dialect' with the given options on a held-out sample of the dictionary.
+    :param batch: transcribe all words in one call of transcribe_vocabulary() instead of word by word
+    :return: the report of evaluate(), with the settings
+    """
+    from ice_g2p.dictionaries import get_dictionary
+    from ice_g2p.transcriber import Transcriber
+    held_out, rest = split_dictionary(get_dictionary(dialect), size, seed)
+    g2p = Transcriber(dialect=dialect, use_dict=use_dict, decoding=decoding)
+    g2p.override_core_dict(rest)
+    if morph:
+        g2p.g2p.enable_morph_fallback()
+
+    if batch:
+        transcribe_words = g2p.transcribe_vocabulary
+    else:
+        def transcribe_words(words):
+            return {wrd: g2p.transcribe(wrd) for wrd in words}
+
+    report = evaluate(transcribe_words, held_out)
+    report.update({'dialect': dialect, 'seed': seed, 'use_dict': use_dict, 'morph': morph, 'batch': batch,
+                   'decoding': g2p.g2p.decoding})
+    return report
+
+
+def format_report(report: dict) -> str:
+    return (f'dialect: {report["dialect"]}, words: {report["words"]}, PER: {report["per"]:.4f}, '
+            f'WER: {report["wer"]:.4f}, words/sec: {report["words_per_sec"]:.1f}')
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser(description='Evaluate accuracy and speed on held-out dictionary entries.')
+    parser.add_argument('--dialect', '-a', default='standard', help='dialect of the dictionary and model')
+    parser.add_argument('--size', '-n', type=int, default=DEFAULT_SAMPLE_SIZE, help='number of held-out entries')
+    parser.add_argument('--seed', type=int, default=1, help='random seed for the held-out sample')
+    parser.add_argument('--dict', '-d', action='store_true', help='use the dictionary without the held-out entries')
+    parser.add_argument('--morph', action='store_true', help='with --dict: use the morphological fallback')
+    parser.add_argument('--batch', action='store_true', help='transcribe all words in batches')
+    parser.add_argument('--profile', default='default', help='decoding profile')
+    parser.add_argument('--beam', type=int, help='beam size, overrides the profile')
+    parser.add_argument('--lenpen', type=float, help='length penalty, overrides the profile')
+    parser.add_argument('--maxlen-a', type=float, help='maximum output length: maxlen-a * input length + maxlen-b')
+    parser.add_argument('--maxlen-b', type=int, help='maximum output length: maxlen-a * input length + maxlen-b')
+    parser.add_argument('--json', action='store_true', help='print the report as json')
+    return parser.parse_args()
+
+
+def main():
+    args = get_arguments()
+    decoding = {'profile': args.profile, 'beam': args.beam, 'lenpen': args.lenpen, 'max_len_a': args.maxlen_a,
+                'max_len_b': args.maxlen_b}
+    report = evaluate_transcriber(args.dialect, args.size, args.seed, args.dict, args.morph, decoding, args.batch)
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print(format_report(report))
+
+
+if __name__ == '__main__':
+    main()
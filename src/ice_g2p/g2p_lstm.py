@@ -4,10 +4,17 @@
 """
 
 import os
+import time
+import heapq
+import bisect
+import hashlib
 import logging
+import itertools
 from fairseq.models.transformer import TransformerModel
 
 from ice_g2p import compound_analysis
+from ice_g2p.cache import LRUCache
+from ice_g2p.lexicon import Lexicon
 
 logging.getLogger('fairseq').setLevel(logging.WARNING)
 
@@ -17,30 +24,124 @@ WORD_SEP = '-'
 ALPHABET = '[aábcðdeéfghiíjklmnoóprstuúvxyýzþæö]'
 ENGLISH_ALPHABET = '[aåäbcdefghijklmnoöpqrstuüvwxyz]'
 DICT_PREFIX = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dictionaries/ice_pron_dict_')
+# max number of words / compound parts sent to the model in one translate() call
+BATCH_SIZE = 256
+# beam size of the model (fairseq default) and of greedy decoding
+BEAM = 5
+GREEDY_BEAM = 1
+# initial estimates of the time per model call in milliseconds, updated with the measured times
+CALL_MS = {BEAM: 50.0, GREEDY_BEAM: 15.0}
+# Decoding settings passed on to fairseq: beam size, maximum output length (max_len_a * input length + max_len_b)
+# and length penalty. Settings not given in a profile keep the defaults of the model.
+DECODING_SETTINGS = ('beam', 'max_len_a', 'max_len_b', 'lenpen')
+DECODING_PROFILES = {'default': {'beam': BEAM},
+                     'fast': {'beam': GREEDY_BEAM}}
+# weight of a new measurement in the moving average of the time per model call
+CALL_MS_WEIGHT = 0.2
+# maximum number of compound parts in the cache of model output for compound parts
+PART_CACHE_SIZE = 100000
+
+
+def short_hash(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:12]
+
+
+def decoding_settings(profile='default', **settings) -> dict:
+    """
+    Returns the decoding settings of 'profile' (see DECODING_PROFILES), updated by 'settings'.
+    Settings with the value None are ignored.
+
+    Example: decoding_settings('fast', max_len_a=1.5, max_len_b=5)
+        {'beam': 1, 'max_len_a': 1.5, 'max_len_b': 5}
+    """
+    if profile not in DECODING_PROFILES:
+        raise ValueError(f'Decoding profile "{profile}" does not exist. Available: {list(DECODING_PROFILES)}')
+    unknown = set(settings).difference(DECODING_SETTINGS)
+    if unknown:
+        raise ValueError(f'Unknown decoding setting(s) {sorted(unknown)}. Available: {list(DECODING_SETTINGS)}')
+    result = dict(DECODING_PROFILES[profile])
+    result.update({key: value for key, value in settings.items() if value is not None})
+    return result
 
 
 class FairseqG2P:
 
-    def __init__(self, model_file='model-256-.3-s-s.pt', dialect='standard', use_english=False):
+    def __init__(self, model_file='model-256-.3-s-s.pt', dialect='standard', use_english=False, decoding=None,
+                 g2p_model=None):
         """
         Initializes a Fairseq lstm g2p model according to model_path
         and model_file.
         :param model_file: the g2p model file
         :param dialect: the pronunciation variant to use
         :param use_cwd: if set to False, model_path has to be absolute
+        :param decoding: decoding profile and settings, e.g. {'profile': 'fast'} or {'beam': 3, 'lenpen': 1.2},
+        see decoding_settings()
+        :param g2p_model: a model to use instead of loading the fairseq model, e.g. differential.StubModel. It has
+        to provide translate() like fairseq's hub interface.
         """
         self.model_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fairseq_models/ice-g2p-models', dialect)
         self.model_file = model_file
         if use_english:
             model_path_english = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fairseq_models/ice-g2p-models', 'english')
-            self.g2p_model = TransformerModel.from_pretrained(model_path_english, self.model_file)
+            self.model_checkpoint = os.path.join(model_path_english, self.model_file)
             self.alphabet = ENGLISH_ALPHABET
         else:
-            self.g2p_model = TransformerModel.from_pretrained(self.model_path, self.model_file)
+            self.model_checkpoint = os.path.join(self.model_path, self.model_file)
             self.alphabet = ALPHABET
-        self.pron_dict = self.read_prondict(dialect)
-        self.custom_dict = None
+        if g2p_model is not None:
+            self.g2p_model = g2p_model
+            self.model_checkpoint = None
+        else:
+            self.g2p_model = TransformerModel.from_pretrained(os.path.dirname(self.model_checkpoint), self.model_file)
+        # the custom and the core dictionary and the words transcribed ahead of time (see load_warm_cache())
+        self.lexicon = Lexicon(core=self.read_prondict(dialect))
         self.automatic_g2p_dict = {}
+        # the lexicon version the words in automatic_g2p_dict were transcribed with, see automatic_lookup()
+        self.automatic_version = self.lexicon.version
+        # model output for compound parts, before the length marks of non-first parts are removed (see join_parts())
+        self.part_cache = LRUCache(PART_CACHE_SIZE)
+        self.morph = None
+        self._model_hash = None
+        # estimated milliseconds per model call: beam size -> ms
+        self.call_ms = dict(CALL_MS)
+        self.decoding = decoding_settings(**(decoding or {}))
+        self._sorted_words = None
+
+    def set_decoding(self, profile='default', **settings):
+        """ Set the decoding profile and settings for all following model calls, see decoding_settings() """
+        self.decoding = decoding_settings(profile, **settings)
+        self.part_cache.clear()
+
+    def model_signature(self) -> str:
+        """ The model hash, extended by a hash of the decoding settings if they differ from the default profile """
+        if self.decoding == DECODING_PROFILES['default']:
+            return self.model_hash
+        return self.model_hash + '/' + short_hash(str(sorted(self.decoding.items())))
+
+    @property
+    def model_hash(self) -> str:
+        """ A short hash of the model checkpoint file, computed on first use """
+        if self._model_hash is None and self.model_checkpoint is None:
+            self._model_hash = short_hash(type(self.g2p_model).__name__)
+        if self._model_hash is None:
+            sha = hashlib.sha1()
+            with open(self.model_checkpoint, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    sha.update(chunk)
+            self._model_hash = sha.hexdigest()[:12]
+        return self._model_hash
+
+    @property
+    def pron_dict(self) -> dict:
+        return self.lexicon.layer('core')
+
+    @property
+    def custom_dict(self):
+        return self.lexicon.layer('custom')
+
+    @property
+    def warm_dict(self) -> dict:
+        return self.lexicon.layer('warm')
 
     def override_pron_dict(self, pron_dict: dict):
         """
@@ -48,7 +149,18 @@ class FairseqG2P:
         :param pron_dict: new pronunciation dictionary
         :return:
         """
-        self.pron_dict = pron_dict
+        self.lexicon.set_layer('core', pron_dict)
+        if self.morph:
+            self.enable_morph_fallback(self.morph.min_count)
+
+    def enable_morph_fallback(self, min_count=None):
+        """
+        Transcribe inflected forms of dictionary words from the dictionary before calling the model, see
+        morphology.py. Only used with use_dict=True.
+        :param min_count: only apply ending rules seen at least 'min_count' times in the dictionary
+        """
+        from ice_g2p.morphology import MorphIndex, MIN_RULE_COUNT
+        self.morph = MorphIndex(self.pron_dict, min_count=min_count or MIN_RULE_COUNT)
 
     def set_custom_dict(self, custom_dict: dict):
         """
@@ -61,7 +173,40 @@ class FairseqG2P:
         :param custom_dict: a dictionary with custom vocabulary and/or transcriptions. Has priority over the
         built-in dicionary
         """
-        self.custom_dict = custom_dict
+        self.lexicon.set_layer('custom', custom_dict)
+
+    def load_custom_dict(self, path, watch=False) -> int:
+        """
+        Loads the custom dictionary from the file 'path' ('word<TAB>transcription' per line), see lexicon.py.
+        :param watch: reload the file when it changes, without interrupting transcription
+        :return: the number of entries loaded
+        """
+        count = self.lexicon.load('custom', path)
+        if watch:
+            self.lexicon.watch()
+        return count
+
+    def load_warm_cache(self, path) -> int:
+        """
+        Loads a cache file written by 'ice-g2p warm' (see warm.py): the words in it are not sent to the model
+        any more. Used with use_dict=True, like the automatic g2p dictionary. A cache built with another model or
+        other decoding settings is skipped with a warning.
+        :return: the number of words loaded
+        """
+        from ice_g2p.warm import read_warm_cache
+        header, transcribed = read_warm_cache(path)
+        if not self.add_warm_cache(header, transcribed):
+            logging.warning(f'Skipping warm cache {path}: built with model {header.get("model")}, '
+                            f'this model is {self.model_signature()}')
+            return 0
+        return len(transcribed)
+
+    def add_warm_cache(self, header: dict, transcribed: dict) -> bool:
+        """ Adds the content of a warm cache file (see warm.read_warm_cache()) if it was built with this model """
+        if header.get('model') != self.model_signature():
+            return False
+        self.lexicon.update_layer('warm', transcribed)
+        return True
 
     def transcribe(self, text, use_dict=False, sep=False) -> str:
         """
@@ -75,19 +220,9 @@ class FairseqG2P:
         for wrd in text.split(' '):
             if not wrd:
                 continue
-            # start with lookup
-            transcr = self.dict_lookup(wrd, use_dict)
-            if not transcr:
-                # if transcription not yet found, perform automatic g2p
-                if set(wrd).difference(self.alphabet):
-                    print(text + ' contains non valid character(s) ' + str(
-                        set(wrd).difference(self.alphabet)) + ', skipping transcription.')
-                    continue
-                # use the current g2p model to transcribe the word automatically
-                transcr = self.model_transcribe(wrd, use_dict)
-                # add to automatic_g2p_dict so that each word only gets transcribed once in batch processing.
-                self.automatic_g2p_dict[wrd] = transcr
-
+            transcr, source = self.transcribe_word(wrd, use_dict)
+            if source == 'invalid':
+                continue
             # add transcription regardless of origin
             transcribed_arr.append(transcr)
 
@@ -98,37 +233,325 @@ class FairseqG2P:
 
         return transcribed
 
+    def transcribe_word(self, wrd, use_dict=False) -> tuple:
+        """
+        Transcribes the single word 'wrd' like transcribe().
+        :return: a tuple (transcription, source), the source is one of
+            'custom', 'dict'    found in the custom or the core dictionary
+            'morph'             transcribed by the morphological fallback
+            'model'             transcribed by the g2p model, now or ahead of time (see load_warm_cache())
+            'invalid'           the word contains non valid characters and is not transcribed
+        Both are empty for an empty word. Words found in the cache of automatic transcriptions have the source
+        of their first transcription.
+        """
+        transcr, source = self.lookup_word(wrd, use_dict)
+        if source or not wrd:
+            return transcr, source
+        # use the current g2p model to transcribe the word automatically
+        transcr = self.model_transcribe(wrd, use_dict)
+        # add to automatic_g2p_dict so that each word only gets transcribed once in batch processing.
+        self.automatic_g2p_dict[wrd] = transcr
+        return transcr, 'model'
+
+    def lookup_word(self, wrd, use_dict=False) -> tuple:
+        """
+        Same as transcribe_word(), without calling the model: returns ('', '') if 'wrd' needs the model.
+        """
+        if not wrd:
+            return '', ''
+        # start with lookup
+        transcr = self.dict_lookup(wrd, use_dict)
+        if transcr:
+            return transcr, self.lookup_source(wrd, transcr)
+        # if transcription not yet found, perform automatic g2p
+        if set(wrd).difference(self.alphabet):
+            print(wrd + ' contains non valid character(s) ' + str(
+                set(wrd).difference(self.alphabet)) + ', skipping transcription.')
+            return '', 'invalid'
+        transcr = self.morph_lookup(wrd, use_dict)
+        if transcr:
+            self.automatic_g2p_dict[wrd] = transcr
+            return transcr, 'morph'
+        return '', ''
+
+    def lookup_source(self, wrd, transcr) -> str:
+        """ The source of the transcription 'transcr' of 'wrd' found by dict_lookup(), see transcribe_word() """
+        if self.custom_dict and self.custom_dict.get(wrd):
+            return 'custom'
+        if self.pron_dict.get(wrd):
+            return 'dict'
+        if wrd in self.automatic_g2p_dict and self.morph and self.morph.transcribe(wrd) == transcr:
+            return 'morph'
+        return 'model'
+
+    def transcribe_words(self, words, use_dict=False, comp_parts=None) -> dict:
+        """
+        Transcribes a collection of words in bulk. Each word is only transcribed once, words not found in the
+        dictionaries are decomposed and all compound parts that need automatic g2p are sent to the model
+        in batches. Words containing non valid characters get an empty transcription.
+        :param words: an iterable of words (no spaces)
+        :param use_dict: if True, look up the words and compound parts in the dictionaries first
+        :param comp_parts: a cache of compound parts (word -> list of parts) to use and fill, the compound
+        analysis does not depend on the model and can be shared between models
+        :return: a dictionary mapping each word to its transcription
+        """
+        transcribed = {}
+        oov = []
+        for wrd in words:
+            if wrd in transcribed:
+                continue
+            transcribed[wrd], source = self.lookup_word(wrd, use_dict)
+            if wrd and not source:
+                oov.append(wrd)
+
+        for wrd, transcr in self.model_transcribe_batch(oov, use_dict, comp_parts).items():
+            transcribed[wrd] = transcr
+            self.automatic_g2p_dict[wrd] = transcr
+
+        return transcribed
+
+    def transcribe_within(self, wrd, use_dict=False, budget_ms=None) -> tuple:
+        """
+        Transcribes the word 'wrd' like transcribe(), but only calls the model if the estimated time of the
+        model calls fits into 'budget_ms'. Otherwise cheaper strategies are used:
+            'greedy'     the model with greedy decoding instead of beam search
+            'parts'      concatenation of the compound parts found in the dictionaries or in the cache of automatic
+                         transcriptions, regardless of use_dict
+            'neighbour'  compound parts not found are replaced by the dictionary word sharing the longest
+                         prefix with the part
+        Degraded transcriptions are not cached.
+        :return: a tuple (transcription, strategy), strategy is an empty string if the word was not degraded
+        """
+        transcr, source = self.lookup_word(wrd, use_dict)
+        if source or not wrd:
+            return transcr, ''
+
+        parts = compound_analysis.get_compound_parts(wrd)
+        part_transcripts = [self.part_lookup(part, use_dict) for part in parts]
+        missing = [i for i, t in enumerate(part_transcripts) if not t]
+        strategy = ''
+        beam = self.decoding['beam']
+        # nothing is approximated if all parts are known, even if the budget is already spent
+        if not missing or budget_ms is None or budget_ms >= len(missing) * self.estimated_call_ms(beam):
+            for i in missing:
+                part_transcripts[i] = self.timed_translate([parts[i]], beam)[0]
+                self.part_cache.put(parts[i], part_transcripts[i])
+        elif beam > GREEDY_BEAM and budget_ms >= self.estimated_call_ms(GREEDY_BEAM):
+            strategy = 'greedy'
+            for i, t in zip(missing, self.timed_translate([parts[i] for i in missing], GREEDY_BEAM)):
+                part_transcripts[i] = t
+        else:
+            strategy = 'parts'
+            for i in missing:
+                part_transcripts[i] = self.cache_lookup(parts[i])
+                if not part_transcripts[i]:
+                    strategy = 'neighbour'
+                    part_transcripts[i] = self.neighbour_lookup(parts[i])
+
+        transcr = self.join_parts(part_transcripts)
+        if not strategy:
+            self.automatic_g2p_dict[wrd] = transcr
+        return transcr, strategy
+
+    def timed_translate(self, words: list, beam: int) -> list:
+        """ Translate 'words' in one call with 'beam', and update the estimated time per model call """
+        estimate = self.estimated_call_ms(beam)
+        start = time.perf_counter()
+        translated = self.g2p_model.translate([' '.join(wrd) for wrd in words], **dict(self.decoding, beam=beam))
+        elapsed_ms = (time.perf_counter() - start) * 1000 / max(len(words), 1)
+        self.call_ms[beam] = estimate + CALL_MS_WEIGHT * (elapsed_ms - estimate)
+        return translated
+
+    def estimated_call_ms(self, beam: int) -> float:
+        """ The estimated time of a model call with 'beam', initially proportional to the beam size """
+        return self.call_ms.get(beam, CALL_MS[BEAM] * beam / BEAM)
+
+    def cache_lookup(self, wrd) -> str:
+        """ Look up 'wrd' in all dictionaries and in the cache of automatic transcriptions """
+        return self.lexicon.get(wrd) or self.automatic_lookup(wrd)
+
+    def automatic_lookup(self, wrd) -> str:
+        """ Look up 'wrd' in the cache of automatic transcriptions. The cache is cleared when the lexicon has
+        changed, e.g. by a reload of the custom dictionary, since the compound parts of the cached words may
+        have been looked up in a changed layer. """
+        if self.automatic_version != self.lexicon.version:
+            self.automatic_g2p_dict = {}
+            self.automatic_version = self.lexicon.version
+        return self.automatic_g2p_dict.get(wrd, '')
+
+    def neighbour_lookup(self, wrd) -> str:
+        """ Return the transcription of the dictionary word sharing the longest prefix with 'wrd', if the
+        common prefix is at least half as long as 'wrd'. Return an empty string otherwise. """
+        if self._sorted_words is None or len(self._sorted_words) != len(self.pron_dict):
+            self._sorted_words = sorted(self.pron_dict)
+        ind = bisect.bisect_left(self._sorted_words, wrd)
+        best = ''
+        best_len = 0
+        for neighbour in self._sorted_words[max(ind - 1, 0):ind + 1]:
+            prefix_len = len(os.path.commonprefix([wrd, neighbour]))
+            if prefix_len > best_len:
+                best, best_len = neighbour, prefix_len
+        if best_len * 2 < len(wrd):
+            return ''
+        return self.pron_dict[best]
+
+    def transcription_source(self, wrd, use_dict=False) -> str:
+        """
+        Describes where the transcription of 'wrd' comes from with the current dictionaries and model, without
+        transcribing it. If the source of a word is the same in two runs, the word is transcribed the same way.
+            'custom:<hash>'         custom dictionary, hash of the transcription
+            'dict:<hash>'           core dictionary, hash of the transcription
+            'morph:<hash>'          morphological fallback, hash of the transcription
+            'model:<hash>:<hash>'   g2p model, hash of the model checkpoint and hash of the compound parts
+                                    and their dictionary or fallback transcriptions
+            'invalid'               the word contains non valid characters and is not transcribed
+        Returns an empty string for an empty word.
+        """
+        if not wrd:
+            return ''
+        transcr = self.static_lookup(wrd, use_dict)
+        if transcr:
+            return transcr
+        if set(wrd).difference(self.alphabet):
+            return 'invalid'
+        transcr = self.morph_source(wrd, use_dict)
+        if transcr:
+            return transcr
+        parts = compound_analysis.get_compound_parts(wrd)
+        part_sources = [part + '=' + (self.static_lookup(part, use_dict) or self.morph_source(part, use_dict))
+                        for part in parts]
+        return 'model:' + self.model_signature() + ':' + short_hash(' '.join(part_sources))
+
+    def static_lookup(self, wrd, use_dict) -> str:
+        """ Return the source ('custom:<hash>' or 'dict:<hash>') of the transcription of 'wrd' in the custom or the
+        core dictionary, an empty string if not found or if use_dict==False. """
+        if not use_dict:
+            return ''
+        if self.custom_dict and self.custom_dict.get(wrd):
+            return 'custom:' + short_hash(self.custom_dict[wrd])
+        if self.pron_dict.get(wrd):
+            return 'dict:' + short_hash(self.pron_dict[wrd])
+        return ''
+
+    def morph_source(self, wrd, use_dict) -> str:
+        if not use_dict or not self.morph:
+            return ''
+        transcr = self.morph.transcribe(wrd)
+        return 'morph:' + short_hash(transcr) if transcr else ''
+
+    def morph_lookup(self, wrd, use_dict, kind='word') -> str:
+        """ Transcribe 'wrd' with the morphological fallback if enabled and use_dict==True, counting
+        the saved model calls. Return an empty string if the fallback does not apply. """
+        if not use_dict or not self.morph:
+            return ''
+        return self.morph.lookup(wrd, kind)
+
     def dict_lookup(self, wrd, use_dict):
         """ Look up the transcription of wrd in the available dictionaries if use_dict==True and return the
         transcription.
         If use_dict==False or if no transcription is found, return an empty string. """
         if not use_dict:
             return ''
-        transcr = self.automatic_g2p_dict.get(wrd)
-        if self.custom_dict and not transcr:
-            transcr = self.custom_dict.get(wrd)
-        if not transcr:
-            transcr = self.pron_dict.get(wrd, '')
-        return transcr
+        # the dictionaries in one probe, see lexicon.py, then the words transcribed so far
+        return self.lexicon.get(wrd) or self.automatic_lookup(wrd)
 
     def model_transcribe(self, wrd, use_dict):
         """ Transcribe 'wrd', if the compound analysis detects compound parts, transcribe each part
         separately and join the transcripts into one string. Return the transcript of 'wrd'. """
-        transcr = ''
+        part_transcripts = []
         # if wrd is a compound, transcribe each compound part separately
         comp_parts = compound_analysis.get_compound_parts(wrd)
-        for i, part in enumerate(comp_parts):
-            t = self.dict_lookup(part, use_dict)
+        for part in comp_parts:
+            t = self.part_lookup(part, use_dict)
             if not t:
-                t = self.g2p_model.translate(' '.join(part))
+                t = self.g2p_model.translate(' '.join(part), **self.decoding)
+                self.part_cache.put(part, t)
+            part_transcripts.append(t)
+        return self.join_parts(part_transcripts)
+
+    def part_lookup(self, part, use_dict) -> str:
+        """ Look up the compound part 'part' in the dictionaries, with the morphological fallback and in the cache
+        of model output for compound parts. Return an empty string if the part has to be sent to the model. """
+        return (self.dict_lookup(part, use_dict) or self.morph_lookup(part, use_dict, 'part')
+                or self.part_cache.get(part, ''))
+
+    def model_transcribe_batch(self, words, use_dict, comp_parts=None) -> dict:
+        """ Same as model_transcribe() for a list of words: the compound parts of all words that are not found
+        in the dictionaries are translated in batches of BATCH_SIZE. Return a dictionary with the transcript
+        of each word. Compound parts are taken from and added to 'comp_parts', if given. """
+        if comp_parts is None:
+            comp_parts = {}
+        word_parts = {}
+        for wrd in words:
+            if wrd not in comp_parts:
+                comp_parts[wrd] = compound_analysis.get_compound_parts(wrd)
+            word_parts[wrd] = comp_parts[wrd]
+        part_transcripts = {}
+        to_translate = []
+        for parts in word_parts.values():
+            for part in parts:
+                if part in part_transcripts:
+                    continue
+                part_transcripts[part] = self.part_lookup(part, use_dict)
+                if not part_transcripts[part]:
+                    to_translate.append(part)
+        for part, transcr in zip(to_translate, self.translate_batch(to_translate)):
+            part_transcripts[part] = transcr
+            self.part_cache.put(part, transcr)
+
+        transcribed = {}
+        for wrd, parts in word_parts.items():
+            transcribed[wrd] = self.join_parts([part_transcripts[part] for part in parts])
+        return transcribed
+
+    def translate_batch(self, words: list) -> list:
+        """ Translate each word in 'words' with the g2p model, in batches of BATCH_SIZE """
+        translated = []
+        for i in range(0, len(words), BATCH_SIZE):
+            translated.extend(self.g2p_model.translate([' '.join(wrd) for wrd in words[i:i + BATCH_SIZE]],
+                                                       **self.decoding))
+        return translated
+
+    def transcribe_nbest(self, wrd, nbest=5, use_dict=False) -> list:
+        """
+        Returns the 'nbest' best transcriptions of 'wrd' with their scores (sum of the model scores of the
+        compound parts, higher is better) as a list of (transcription, score) tuples, best first.
+        Words and compound parts found in the dictionaries have a single transcription with the score 0.
+        Returns an empty list for words with non valid characters that are not in the dictionaries.
+        """
+        transcr, source = self.lookup_word(wrd, use_dict)
+        if source == 'invalid' or not wrd:
+            return []
+        if source:
+            return [(transcr, 0.0)]
+        parts = compound_analysis.get_compound_parts(wrd)
+        candidates = []
+        for part in parts:
+            transcr = self.dict_lookup(part, use_dict) or self.morph_lookup(part, use_dict, 'part')
+            candidates.append([(transcr, 0.0)] if transcr else self.generate_nbest(part, nbest))
+        best = heapq.nlargest(nbest, itertools.product(*candidates), key=lambda comb: sum(c[1] for c in comb))
+        return [(self.join_parts([c[0] for c in comb]), sum(c[1] for c in comb)) for comb in best]
+
+    def generate_nbest(self, wrd, nbest) -> list:
+        """ Return the 'nbest' best hypotheses of the model for 'wrd' as (transcription, score) tuples """
+        settings = dict(self.decoding, beam=max(self.decoding['beam'], nbest))
+        tokens = self.g2p_model.encode(' '.join(wrd))
+        hypos = self.g2p_model.generate([tokens], nbest=nbest, **settings)[0]
+        return [(self.g2p_model.decode(hypo['tokens']), float(hypo['score'])) for hypo in hypos[:nbest]]
+
+    @staticmethod
+    def join_parts(part_transcripts: list) -> str:
+        """ Join the transcripts of compound parts to the transcript of the compound. The length marks of all
+        but the first part are removed here, whatever the source of the part transcripts. """
+        transcr = ''
+        for i, t in enumerate(part_transcripts):
             if i > 0:
                 # currently we only transcribe long vowels in the first syllable
                 # this is not entirely correct, but as long as the pronunciation dictionary
                 # follows this rule, we follow it here as well
                 t = t.replace(':', '')
             transcr += t + ' '
-        transcr = transcr.strip()
-        return transcr
+        return transcr.strip()
 
     @staticmethod
     def read_prondict(dialect: str) -> dict:
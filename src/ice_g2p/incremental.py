@@ -0,0 +1,94 @@
+"""
+Incremental re-transcription of files after dictionaries or models have changed.
+
+Next to each output file we store a provenance file '<output>.prov.jsonl'. Its first line holds the output settings
+(dialect, separators, alphabet, ...), each following line one transcribed input line with its output and the
+source of the transcription of each word (see FairseqG2P.transcription_source()): the dictionary entry it was
+looked up in, or the model checkpoint and the dictionary entries of the compound parts for words transcribed
+by the model.
+
+When a file is transcribed again, the sources of the words are computed without transcribing, and only the lines
+containing a word whose source has changed are transcribed. The output of all other lines is taken over from the
+provenance file. If the settings have changed, all lines are transcribed.
+
+Example:
+    $ ice-g2p -if corpus/ -d --incremental
+"""
+
+import os
+import json
+
+
+PROVENANCE_SUFFIX = '.prov.jsonl'
+
+
+def provenance_path(output_file) -> str:
+    return str(output_file) + PROVENANCE_SUFFIX
+
+
+def read_provenance(path) -> tuple:
+    """
+    Reads a provenance file.
+    :return: the settings and a dictionary mapping each input line to a tuple (output, word sources),
+    (None, {}) if the file does not exist
+    """
+    if not os.path.exists(path):
+        return None, {}
+    records = {}
+    with open(path) as f:
+        settings = json.loads(f.readline())
+        for line in f:
+            record = json.loads(line)
+            records[record['line']] = (record['out'], record['src'])
+    return settings, records
+
+
+def write_provenance(path, settings: dict, records: dict) -> None:
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(json.dumps(settings, ensure_ascii=False) + '\n')
+        for line, (out, sources) in records.items():
+            f.write(json.dumps({'line': line, 'out': out, 'src': sources}, ensure_ascii=False) + '\n')
+    os.replace(tmp_path, path)
+
+
+def transcribe_incremental(lines: list, transcribe_lines, word_source, settings: dict,
+                           prev_settings: dict = None, previous: dict = None) -> tuple:
+    """
+    Transcribes 'lines', reusing the output of the previous run for lines where all words still have the same
+    transcription source.
+
+    :param lines: the input lines
+    :param transcribe_lines: a function transcribing a list of lines, returns a list of outputs
+    :param word_source: a function returning the transcription source of a word
+    :param settings: the current output settings, previous outputs are only reused if the settings are unchanged
+    :param prev_settings: the settings of the previous run
+    :param previous: input line -> (output, word sources) of the previous run, see read_provenance()
+    :return: the transcribed dictionary (input line -> output), the new provenance records and
+    the number of lines 'reused' and 'transcribed'
+    """
+    if previous is None or prev_settings != settings:
+        previous = {}
+    sources = {}
+    records = {}
+    changed = []
+    for line in lines:
+        if line in records:
+            continue
+        line_sources = {}
+        for wrd in line.split(' '):
+            wrd = wrd.strip()
+            if wrd not in sources:
+                sources[wrd] = word_source(wrd)
+            line_sources[wrd] = sources[wrd]
+        if line in previous and previous[line][1] == line_sources:
+            records[line] = (previous[line][0], line_sources)
+        else:
+            records[line] = (None, line_sources)
+            changed.append(line)
+
+    for line, out in zip(changed, transcribe_lines(changed)):
+        records[line] = (out, records[line][1])
+    transcribed = {line: records[line][0] for line in lines}
+    stats = {'reused': len(records) - len(changed), 'transcribed': len(changed)}
+    return transcribed, records, stats
@@ -0,0 +1,221 @@
+"""
+Resumable, sharded transcription jobs.
+
+A job is defined by a manifest file listing the input shards, one file path per line (relative paths are relative
+to the manifest, empty lines and lines starting with '#' are ignored). Each shard is transcribed line by line into
+its own output file in the output directory:
+
+    <outdir>/<shard name>_<shard index>_transcribed.tsv
+
+The output is first written to a temporary file and then renamed, so an output file is always complete.
+After the rename a checkpoint marker '<output>.done' is written, shards with a marker are skipped when the job is
+started again. To process a shard, a worker has to claim it by creating the lock file '<output>.lock' exclusively.
+Thus several processes, also on different machines sharing the output directory, can work on the same job.
+The lock file contains a token unique to the claim. A worker refreshes its lock while processing, a lock that has
+not been refreshed for 'lock_timeout' seconds is considered stale (the worker died) and can be taken over by another
+worker. A worker whose lock was taken over notices it on the next refresh by the changed token and stops processing
+the shard, it never touches the lock of the new owner.
+
+Example:
+    $ ice-g2p --job shards.txt --outdir transcribed/ -d
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import logging
+from pathlib import Path
+
+from ice_g2p import corpus_io
+
+DONE_SUFFIX = '.done'
+LOCK_SUFFIX = '.lock'
+# seconds after which the lock of a shard is considered stale
+LOCK_TIMEOUT = 600
+# refresh the lock after this number of processed lines
+HEARTBEAT_LINES = 1000
+
+log = logging.getLogger(__name__)
+
+
+def read_manifest(manifest: Path) -> list:
+    """
+    Returns the list of input shards (paths) defined in 'manifest'
+    """
+    manifest = Path(manifest)
+    shards = []
+    with open(manifest) as f:
+        for line in f.read().splitlines():
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            shard = Path(line)
+            if not shard.is_absolute():
+                shard = manifest.parent / shard
+            shards.append(shard)
+    return shards
+
+
+def shard_output_path(outdir: Path, index: int, shard: Path, suffix: str = '_transcribed') -> Path:
+    return Path(outdir) / f'{corpus_io.base_name(shard)}_{index}{suffix}.tsv'
+
+
+def worker_id() -> str:
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def is_done(output: Path) -> bool:
+    return os.path.exists(str(output) + DONE_SUFFIX)
+
+
+def write_atomic(path: Path, content: str) -> None:
+    """
+    Writes 'content' to a temporary file next to 'path' and renames it to 'path'
+    """
+    tmp_path = f'{path}.tmp.{worker_id()}'
+    with open(tmp_path, 'w') as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def lock_token(output: Path):
+    """ The token in the lock file of 'output', None if there is no lock """
+    try:
+        with open(str(output) + LOCK_SUFFIX) as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def claim(output: Path, lock_timeout: float = LOCK_TIMEOUT):
+    """
+    Tries to claim the shard with output file 'output' by creating its lock file. A stale lock is taken over.
+    :return: the token of the lock if the shard was claimed, None if another worker is processing it
+    """
+    lock_path = str(output) + LOCK_SUFFIX
+    token = f'{worker_id()}:{uuid.uuid4().hex}'
+    for attempt in range(2):
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                age = time.time() - os.path.getmtime(lock_path)
+            except FileNotFoundError:
+                # released in the meantime, try again
+                continue
+            if age < lock_timeout:
+                return None
+            # Stale lock: rename it away before claiming, if several workers try this at the same time,
+            # only one of them succeeds with the rename.
+            stale_path = f'{lock_path}.stale.{token}'
+            try:
+                os.rename(lock_path, stale_path)
+            except FileNotFoundError:
+                return None
+            if time.time() - os.path.getmtime(stale_path) < lock_timeout:
+                # another worker took the lock over since we checked it, the lock we renamed is its fresh lock
+                try:
+                    os.link(stale_path, lock_path)
+                except OSError:
+                    pass
+                os.remove(stale_path)
+                return None
+            os.remove(stale_path)
+            log.warning(f'Took over stale lock {lock_path}')
+            continue
+        with os.fdopen(fd, 'w') as f:
+            f.write(token)
+        # a worker that measured the same lock as stale might have replaced ours meanwhile
+        return token if lock_token(output) == token else None
+    return None
+
+
+def refresh(output: Path, token: str) -> bool:
+    """
+    Refreshes the lock of 'output' if it still has 'token'.
+    :return: False if the lock was taken over or released by another worker
+    """
+    if lock_token(output) != token:
+        return False
+    try:
+        os.utime(str(output) + LOCK_SUFFIX)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def release(output: Path, token: str) -> None:
+    """ Removes the lock of 'output' if it still has 'token', the lock of another worker is kept """
+    if lock_token(output) != token:
+        return
+    try:
+        os.remove(str(output) + LOCK_SUFFIX)
+    except FileNotFoundError:
+        pass
+
+
+def process_shard(shard: Path, output: Path, process_lines, token: str, keep_original=False):
+    """
+    Transcribes the lines of 'shard' with 'process_lines' and writes the results atomically to 'output',
+    followed by the checkpoint marker. The lock of the shard with 'token' (see claim()) is refreshed every
+    HEARTBEAT_LINES lines, the shard is given up if the lock was taken over by another worker.
+    :return: the number of lines processed, None if the lock was lost
+    """
+    lines = corpus_io.read_lines(shard)
+    transcribed = []
+    for start in range(0, len(lines), HEARTBEAT_LINES):
+        transcribed.extend(process_lines(lines[start:start + HEARTBEAT_LINES]))
+        if not refresh(output, token):
+            log.warning(f'Lost the lock of {output} to another worker, stopped processing {shard}')
+            return None
+    out_lines = []
+    for line, transcr in zip(lines, transcribed):
+        out_lines.append(line + '\t' + transcr if keep_original else transcr)
+    write_atomic(output, ''.join(line + '\n' for line in out_lines))
+    write_atomic(Path(str(output) + DONE_SUFFIX),
+                 json.dumps({'input': str(shard), 'lines': len(lines), 'worker': worker_id(), 'time': time.time()}))
+    return len(lines)
+
+
+def run_job(manifest: Path, outdir: Path, process_lines, keep_original=False, suffix='_transcribed',
+            lock_timeout: float = LOCK_TIMEOUT) -> dict:
+    """
+    Processes all shards of 'manifest' that are neither done nor claimed by another worker.
+
+    :param manifest: the manifest file listing the input shards
+    :param outdir: the output directory, shared by all workers of the job
+    :param process_lines: a function transcribing a list of lines, returns a list of transcriptions
+    :param keep_original: write the original line in the first column
+    :param suffix: the suffix to label the output files with
+    :param lock_timeout: seconds after which a lock is considered stale
+    :return: a summary: number of shards 'done' before, 'processed' by this worker, 'locked' by other workers
+    (also the shards whose lock was taken over while processing)
+    """
+    os.makedirs(outdir, exist_ok=True)
+    summary = {'done': 0, 'processed': 0, 'locked': 0}
+    for index, shard in enumerate(read_manifest(manifest)):
+        output = shard_output_path(outdir, index, shard, suffix)
+        if is_done(output):
+            summary['done'] += 1
+            continue
+        token = claim(output, lock_timeout)
+        if token is None:
+            summary['locked'] += 1
+            continue
+        try:
+            # another worker might have finished the shard between our check and the claim
+            if is_done(output):
+                summary['done'] += 1
+                continue
+            print(f'processing: {shard}')
+            if process_shard(shard, output, process_lines, token, keep_original) is None:
+                summary['locked'] += 1
+            else:
+                summary['processed'] += 1
+        finally:
+            release(output, token)
+    return summary
@@ -0,0 +1,216 @@
+"""
+The layered lexicon of FairseqG2P: the custom dictionary, the core pronunciation dictionary and the words
+transcribed ahead of time (see warm.py), in this order of priority. On each change the layers are merged into
+one read view, so a lookup resolves all layers with a single probe.
+
+Custom dictionaries can be loaded from files with one 'word<TAB>transcription' line per entry, optionally
+compressed (see corpus_io.py). On the first load the parsed file is compiled to '<file>.compiled', later loads read
+the compiled version as long as the source file is unchanged. The compiled file is plain JSON, a header line and a
+line with the entries, so loading it never runs code from the file. With watch(), the source files are checked every
+WATCH_INTERVAL seconds and a changed file is loaded and swapped in atomically: lookups running during the reload see
+the previous version, and a file that fails to load is logged while the previous version is kept.
+
+    lexicon = Lexicon(core=pron_dict)
+    lexicon.load('custom', 'custom_dict.tsv')
+    lexicon.watch()
+    lexicon.get('hestur')
+"""
+
+import os
+import json
+import logging
+import tempfile
+import threading
+from collections import namedtuple
+
+from ice_g2p import corpus_io
+
+# the layers in order of priority
+LAYERS = ('custom', 'core', 'warm')
+COMPILED_SUFFIX = '.compiled'
+COMPILED_VERSION = 2
+# seconds between checks of the watched files
+WATCH_INTERVAL = 2.0
+
+# the entries of each layer, None for a custom layer that was never set
+Layers = namedtuple('Layers', LAYERS)
+# the layers and their merged entries, replaced as a whole on each change
+LexiconState = namedtuple('LexiconState', ['merged', 'layers'])
+
+
+def file_signature(path) -> tuple:
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def parse_dict_file(path) -> dict:
+    """
+    Parses a dictionary file with one 'word<TAB>transcription' line per entry, empty lines are skipped.
+    :raises ValueError: for a line without a tab
+    """
+    entries = {}
+    for num, line in enumerate(corpus_io.iter_lines(path), 1):
+        if not line.strip():
+            continue
+        wrd, sep, transcr = line.partition('\t')
+        if not sep:
+            raise ValueError(f'{path}, line {num}: expected "word<TAB>transcription", found "{line}"')
+        entries[wrd.strip()] = transcr.strip()
+    return entries
+
+
+def compiled_path(path) -> str:
+    return str(path) + COMPILED_SUFFIX
+
+
+def read_compiled(path, signature: tuple):
+    """ The entries of the compiled version of 'path', None if there is none for the source file 'signature' """
+    try:
+        with open(compiled_path(path), encoding='utf-8') as f:
+            header = json.loads(f.readline())
+            if header != {'version': COMPILED_VERSION, 'source': list(signature)}:
+                return None
+            entries = json.loads(f.readline())
+    except (OSError, ValueError):
+        return None
+    if not isinstance(entries, dict) or not all(isinstance(transcr, str) for transcr in entries.values()):
+        return None
+    return entries
+
+
+def write_compiled(path, signature: tuple, entries: dict) -> None:
+    """ Writes the compiled version of 'path' atomically, skipped if the directory is not writable """
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=directory, delete=False) as f:
+            f.write(json.dumps({'version': COMPILED_VERSION, 'source': list(signature)}) + '\n')
+            f.write(json.dumps(entries, ensure_ascii=False) + '\n')
+        os.replace(f.name, compiled_path(path))
+    except OSError as e:
+        logging.debug(f'Could not write the compiled dictionary of {path}: {e}')
+
+
+def load_dict_file(path) -> tuple:
+    """
+    Loads the dictionary file 'path', from its compiled version if it is up to date, otherwise the file is parsed
+    and compiled.
+    :return: the signature (size, modification time) of the loaded file and its entries
+    """
+    signature = file_signature(path)
+    entries = read_compiled(path, signature)
+    if entries is None:
+        entries = parse_dict_file(path)
+        write_compiled(path, signature, entries)
+    return signature, entries
+
+
+def merge(layers: Layers) -> dict:
+    """ Merges the layers into one dictionary, empty transcriptions do not hide the entries of lower layers """
+    merged = {}
+    for entries in reversed(layers):
+        if entries:
+            merged.update((wrd, transcr) for wrd, transcr in entries.items() if transcr)
+    return merged
+
+
+class Lexicon:
+
+    def __init__(self, core=None, custom=None, warm=None):
+        layers = Layers(custom=custom, core=core or {}, warm=warm or {})
+        self._state = LexiconState(merge(layers), layers)
+        # layer -> (path, signature) of the files loaded by load()
+        self.sources = {}
+        # incremented on each change of the layers
+        self.version = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for key in ('_lock', '_stop', '_watcher'):
+            del state[key]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+
+    def get(self, wrd) -> str:
+        """ The transcription of 'wrd' in the layer of highest priority containing it, an empty string if none """
+        return self._state.merged.get(wrd, '')
+
+    def __contains__(self, wrd) -> bool:
+        return wrd in self._state.merged
+
+    def __len__(self) -> int:
+        return len(self._state.merged)
+
+    def layer(self, name: str):
+        """ The entries of the layer 'name', None for a custom layer that was never set """
+        return getattr(self._state.layers, name)
+
+    def set_layer(self, name: str, entries) -> None:
+        """ Replaces the layer 'name' by 'entries', a file loaded for the layer is not watched any more """
+        if name not in LAYERS:
+            raise ValueError(f'Layer "{name}" does not exist. Available: {list(LAYERS)}')
+        self.sources.pop(name, None)
+        with self._lock:
+            # the other layers are shared with the previous state, the new state is built completely before it
+            # replaces the previous one
+            layers = self._state.layers._replace(**{name: entries})
+            self._state = LexiconState(merge(layers), layers)
+            self.version += 1
+
+    def update_layer(self, name: str, entries: dict) -> None:
+        """ Adds 'entries' to the layer 'name', the other layers are not copied """
+        self.set_layer(name, {**(self.layer(name) or {}), **entries})
+
+    def load(self, name: str, path) -> int:
+        """
+        Loads the dictionary file 'path' as the layer 'name', see load_dict_file(). The file is watched by watch().
+        :return: the number of entries loaded
+        """
+        signature, entries = load_dict_file(path)
+        self.set_layer(name, entries)
+        self.sources[name] = (str(path), signature)
+        return len(entries)
+
+    def reload(self) -> list:
+        """
+        Loads the files of the layers that have changed since they were loaded. A file that fails to load is logged,
+        the layer keeps its previous version.
+        :return: the names of the reloaded layers
+        """
+        reloaded = []
+        for name, (path, signature) in list(self.sources.items()):
+            try:
+                if file_signature(path) == signature:
+                    continue
+                self.load(name, path)
+            except (OSError, ValueError) as e:
+                logging.error(f'Could not reload the {name} dictionary {path}, keeping the previous version: {e}')
+                continue
+            logging.info(f'Reloaded the {name} dictionary {path}: {len(self.layer(name))} entries')
+            reloaded.append(name)
+        return reloaded
+
+    def watch(self, interval: float = WATCH_INTERVAL) -> None:
+        """ Checks the loaded files for changes every 'interval' seconds in a background thread, see reload() """
+        if self._watcher is not None:
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval):
+                self.reload()
+        self._watcher = threading.Thread(target=run, daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self) -> None:
+        if self._watcher is not None:
+            self._stop.set()
+            self._watcher.join()
+            self._watcher = None
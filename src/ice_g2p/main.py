@@ -14,16 +14,30 @@ import os
 import sys
 import logging
 import argparse
+from collections import Counter
 from pathlib import Path
 
-from ice_g2p.converter import Converter
+from ice_g2p.converter import get_converter
+from ice_g2p import jobs
+from ice_g2p import corpus_io
+from ice_g2p import incremental
+from ice_g2p import serve
+from ice_g2p import daemon
+from ice_g2p import streaming
+from ice_g2p import warm
 from ice_g2p.transcriber import Transcriber
 from ice_g2p.transcriber import G2P_METHOD
+from ice_g2p.g2p_lstm import DECODING_PROFILES
 
 AVAILABLE_DIALECTS = ['standard', 'north']
 
 
-def write_transcribed(transcribed: dict, filename: Path, suffix: str, keep_original: bool) -> None:
+def transcribed_filename(filename: Path, suffix: str, out_format='tsv', outdir=None, compression=None) -> str:
+    return corpus_io.output_path(filename, suffix, out_format, outdir, compression)
+
+
+def write_transcribed(transcribed: dict, filename: Path, suffix: str, keep_original: bool, out_format='tsv',
+                      outdir=None, compression=None, tokens=None) -> None:
     """
     Writes the transcriptions with the original grapheme strings to a file
     named 'filename' extended by 'suffix', for example:
@@ -34,72 +48,375 @@ def write_transcribed(transcribed: dict, filename: Path, suffix: str, keep_origi
     :param filename: the original filename containing the grapheme strings
     :param suffix: the suffix to label the output file with
     :param keep_original: write the original grapheme string in the first column
+    :param out_format: 'tsv' or 'jsonl', see corpus_io.py
+    :param outdir: the output directory, default: the directory of 'filename'
+    :param compression: 'gz', 'bz2', 'xz' or '' (none), default: the compression of 'filename'
+    :param tokens: for jsonl: the (word, transcription) pairs of each line, written as token fields
     :return:
     """
-    filename_stem = filename.stem
-    extended_filename = str(filename.parent) + '/' + filename_stem + suffix + '.tsv'
-    with open(extended_filename, 'w') as f:
-        for key in transcribed:
-            if keep_original:
-                f.write(key + '\t')
-            f.write(transcribed[key] + '\n')
+    extended_filename = transcribed_filename(filename, suffix, out_format, outdir, compression)
+    records = ((line, transcribed[line], tokens[line] if tokens else None) for line in transcribed)
+    corpus_io.write_records(extended_filename, records, out_format, keep_original)
+
+
+def token_transcripts(line: str, tables: dict) -> list:
+    """ Returns (word, transcription) for each word in 'line', one tab separated column per dialect in 'tables' """
+    return [(wrd, '\t'.join(table.get(wrd.strip(), '') for table in tables.values())) for wrd in line.split(' ')]
+
+
+def convert_tokens(tokens: dict, to_alpha: str) -> dict:
+    """ Converts the transcriptions of the (word, transcription) pairs of each line in 'tokens' to 'to_alpha' """
+    converted = iter(convert_lines([transcr for pairs in tokens.values() for wrd, transcr in pairs], to_alpha))
+    return {line: [(wrd, next(converted)) for wrd, transcr in pairs] for line, pairs in tokens.items()}
+
+
+def transcribe_line(g2p: Transcriber, line: str, deadline_ms=None, degraded=None, tokens=None) -> str:
+    """
+    Transcribes 'line', with one tab separated column per dialect if 'g2p' transcribes several dialects.
+    With 'deadline_ms' (single dialect only), the words transcribed with a cheaper strategy are added to
+    'degraded' (word -> strategy). If 'tokens' is given, the (word, transcription) pair of each word of the line
+    is appended to it, as used for the transcription of the line.
+    """
+    if len(g2p.dialects) > 1:
+        tables = g2p.transcribe_vocabulary_dialects(line.split(' '))
+        if tokens is not None:
+            tokens.extend(token_transcripts(line, tables))
+        return render_line(g2p, line, tables)
+    if deadline_ms is not None:
+        line_tokens, degraded_words = g2p.transcribe_tokens_with_deadline(line, deadline_ms)
+        if degraded is not None:
+            degraded.update(degraded_words)
+    elif tokens is None:
+        return g2p.transcribe(line)
+    else:
+        line_tokens = g2p.transcribe_tokens(line)
+    if tokens is not None:
+        tokens.extend((token.word, token.transcript) for token in line_tokens)
+    return g2p.format_tokens(line_tokens)
+
+
+def render_line(g2p: Transcriber, line: str, tables: dict) -> str:
+    """
+    Renders 'line' from the word transcriptions of each dialect (see Transcriber.transcribe_vocabulary_dialects()),
+    one tab separated column per dialect
+    """
+    return '\t'.join(g2p.render_dialects(line, tables).values())
+
+
+def report_saved_calls(g2p: Transcriber):
+    saved = g2p.saved_model_calls()
+    print(f'model calls saved by the morphological fallback: words: {saved["word"]}, compound parts: {saved["part"]}')
+
+
+def report_degraded(degraded: dict):
+    if degraded:
+        print('degraded: ' + ', '.join(f'{wrd} ({strategy})' for wrd, strategy in degraded.items()))
 
 
 def process_string(input_str: str, dialect='standard', use_dict=False, syllab_symbol='', word_sep='',
-                   stress_label=False, lang_detect=False) -> str:
+                   stress_label=False, lang_detect=False, dialects=None, morph=False, deadline_ms=None, decoding=None,
+                   warm_cache=None, custom_dict_file=None, use_daemon=False) -> str:
+    """
+    Transcribes 'input_str'. With 'use_daemon', the string is sent to a running daemon with the same model settings
+    if there is one (see daemon.py), except for transcription with a deadline or the morphological fallback
+    which report on the transcription.
+    """
     print('processing: "' + input_str + '"')
+    if use_daemon and deadline_ms is None and not morph:
+        settings = daemon.model_settings(dialects or [dialect], use_dict, lang_detect, morph, decoding,
+                                         custom_dict_file)
+        transcribed = daemon.transcribe_remote(input_str, settings, syllab_symbol or '', word_sep or '', stress_label)
+        if transcribed is not None:
+            return transcribed
     g2p = Transcriber(G2P_METHOD.FAIRSEQ, dialect=dialect, lang_detect=lang_detect, syllab_symbol=syllab_symbol, word_sep=word_sep,
-                      stress_label=stress_label, use_dict=use_dict)
-    return g2p.transcribe(input_str)
+                      stress_label=stress_label, use_dict=use_dict, dialects=dialects, morph_fallback=morph, decoding=decoding,
+                      warm_cache=warm_cache, custom_dict_file=custom_dict_file)
+    degraded = {}
+    transcribed = transcribe_line(g2p, input_str, deadline_ms, degraded)
+    report_degraded(degraded)
+    if morph:
+        report_saved_calls(g2p)
+    return transcribed
+
+
+def process_nbest(input_str: str, nbest: int, dialect='standard', use_dict=False, lang_detect=False, morph=False,
+                  decoding=None, warm_cache=None, custom_dict_file=None) -> None:
+    """
+    Prints the 'nbest' best transcriptions of each word in 'input_str' with their scores, one per line:
+    word\ttranscription\tscore
+    """
+    g2p = Transcriber(G2P_METHOD.FAIRSEQ, dialect=dialect, lang_detect=lang_detect, use_dict=use_dict,
+                      morph_fallback=morph, decoding=decoding, warm_cache=warm_cache, custom_dict_file=custom_dict_file)
+    for wrd in input_str.split(' '):
+        for transcr, score in g2p.transcribe_nbest(wrd, nbest):
+            print(f'{wrd}\t{transcr}\t{score:.4f}')
 
 
 def process_file(filename: Path, dialect='standard', use_dict=False, syllab_symbol='', word_sep='',
-                   stress_label=False, lang_detect=False) -> dict:
+                   stress_label=False, lang_detect=False, dialects=None, morph=False, deadline_ms=None, decoding=None,
+                   warm_cache=None, custom_dict_file=None,
+                   g2p=None, tokens=None) -> dict:
     """
     Transcribes the content of 'filename' line by line
-    :param filename: input file to transcribe
+    :param filename: input file to transcribe, may be compressed (.gz, .bz2, .xz)
     :param word_sep: if the transcription should contain word separators
+    :param deadline_ms: time budget per line, see Transcriber.transcribe_with_deadline()
+    :param g2p: the transcriber to use, created from the other settings if not given
+    :param tokens: if given, the (word, transcription) pairs of each line are added to it, see transcribe_line()
     :return: a map of grapheme strings and their phonetic transcriptions
     """
     print("processing: " + str(filename))
-    with open(filename) as f:
-        file_content = f.read().splitlines()
+    file_content = corpus_io.read_lines(filename)
 
-    g2p = Transcriber(G2P_METHOD.FAIRSEQ, dialect=dialect, use_dict=use_dict, syllab_symbol=syllab_symbol, word_sep=word_sep,
-                   stress_label=stress_label, lang_detect=lang_detect)
+    if g2p is None:
+        g2p = Transcriber(G2P_METHOD.FAIRSEQ, dialect=dialect, use_dict=use_dict, syllab_symbol=syllab_symbol, word_sep=word_sep,
+                       stress_label=stress_label, lang_detect=lang_detect, dialects=dialects, morph_fallback=morph, decoding=decoding,
+                       warm_cache=warm_cache, custom_dict_file=custom_dict_file)
     transcribed = {}
+    degraded = {}
     for line in file_content:
-        transcribed[line] = g2p.transcribe(line)
+        line_tokens = [] if tokens is not None else None
+        transcribed[line] = transcribe_line(g2p, line, deadline_ms, degraded, line_tokens)
+        if tokens is not None:
+            tokens[line] = line_tokens
+    report_degraded(degraded)
+    if morph:
+        report_saved_calls(g2p)
 
     return transcribed
 
 
 def process_file_or_dir(file_or_dir: Path, out_suffix: str, dialect='standard', use_dict=False, syllab_symbol='', word_sep='',
-                   stress_label=False, lang_detect=False, keep_original=False) -> None:
+                   stress_label=False, lang_detect=False, keep_original=False, alphabet=None, dialects=None, morph=False,
+                   deadline_ms=None, decoding=None, warm_cache=None, custom_dict_file=None, out_format='tsv', outdir=None,
+                   compression=None, pipelined=False) -> None:
+    """
+    Transcribes a file or all files in a directory tree line by line, with one transcriber for all files.
+    For the output options 'out_format', 'outdir' and 'compression' see write_transcribed().
+    :param pipelined: read, preprocess, transcribe and write each file in parallel threads, see streaming.py
+    (single dialect, no deadline)
+    """
+    print("processing: " + str(file_or_dir))
+    input_files = list_input_files(file_or_dir)
+    if not input_files:
+        return
+    g2p = Transcriber(G2P_METHOD.FAIRSEQ, dialect=dialect, use_dict=use_dict, syllab_symbol=syllab_symbol, word_sep=word_sep,
+                      stress_label=stress_label, lang_detect=lang_detect, dialects=dialects, morph_fallback=morph, decoding=decoding,
+                      warm_cache=warm_cache, custom_dict_file=custom_dict_file)
+    if pipelined:
+        file_transcriber = streaming.FileTranscriber(g2p, alphabet, out_format, keep_original)
+        for file_path in input_files:
+            print("processing: " + str(file_path))
+            file_transcriber.transcribe_file(file_path, transcribed_filename(file_path, out_suffix, out_format, outdir,
+                                                                             compression))
+        if morph:
+            report_saved_calls(g2p)
+        return
+    for file_path in input_files:
+        tokens = {} if out_format == 'jsonl' else None
+        transcribed_content = process_file(file_path, dialect=dialect, use_dict=use_dict, syllab_symbol=syllab_symbol, word_sep=word_sep,
+                   stress_label=stress_label, lang_detect=lang_detect, dialects=dialects, morph=morph,
+                   deadline_ms=deadline_ms, decoding=decoding, warm_cache=warm_cache,
+                   custom_dict_file=custom_dict_file, g2p=g2p, tokens=tokens)
+        if alphabet:
+            transcribed_content = convert_transcribed(transcribed_content, alphabet, syllab_symbol, word_sep)
+            if tokens:
+                tokens = convert_tokens(tokens, alphabet)
+        write_transcribed(transcribed_content, file_path, out_suffix, keep_original, out_format, outdir, compression,
+                          tokens)
+
+
+def list_input_files(file_or_dir: Path) -> list:
+    """
+    Returns 'file_or_dir' if it is a file, or all non-hidden files in the directory tree of 'file_or_dir'.
+    The output and provenance files of incremental runs (see process_incremental()) are skipped, so that a
+    directory can be transcribed again in place.
+    """
+    if os.path.isfile(file_or_dir):
+        return [file_or_dir]
+    input_files = []
+    for root, dirs, files in os.walk(file_or_dir):
+        for filename in files:
+            if filename.startswith('.') or filename.endswith(incremental.PROVENANCE_SUFFIX):
+                continue
+            if incremental.provenance_path(filename) in files:
+                continue
+            input_files.append(Path(os.path.join(root, filename)))
+    return input_files
+
+
+def process_corpus(file_or_dir: Path, out_suffix: str, dialect='standard', use_dict=False, syllab_symbol='', word_sep='',
+                   stress_label=False, lang_detect=False, keep_original=False, alphabet=None, dialects=None, morph=False, decoding=None,
+                   warm_cache=None, custom_dict_file=None,
+                   out_format='tsv', outdir=None, compression=None) -> None:
+    """
+    Transcribes a file or a directory of files in three passes:
+    1) collect the vocabulary of all input files with word frequencies
+    2) transcribe each word of the vocabulary once, sending all unknown words to the model(s) in batches
+    3) render each line from the transcribed vocabulary and write the output files
+    The output is the same as from process_file_or_dir(), but the g2p work depends on the size of the vocabulary
+    instead of the number of tokens.
+    """
     print("processing: " + str(file_or_dir))
-    if os.path.isdir(file_or_dir):
-        for root, dirs, files in os.walk(file_or_dir):
-            for filename in files:
-                if filename.startswith('.'):
-                    continue
-                file_path = Path(os.path.join(root, filename))
-                transcribed_content = process_file(file_path, dialect=dialect, use_dict=use_dict, syllab_symbol=syllab_symbol, word_sep=word_sep,
-                   stress_label=stress_label, lang_detect=lang_detect)
-                write_transcribed(transcribed_content, file_path, out_suffix, keep_original)
-    elif os.path.isfile(file_or_dir):
-        transcribed_content = process_file(file_or_dir, dialect=dialect, use_dict=use_dict, syllab_symbol=syllab_symbol, word_sep=word_sep,
-                   stress_label=stress_label, lang_detect=lang_detect)
-        write_transcribed(transcribed_content, file_or_dir, out_suffix, keep_original)
-
-
-def convert(transcription: str, from_alpha: str, to_alpha):
-    converter = Converter()
-    converted = converter.convert(transcription, from_alpha, to_alpha)
+    input_files = list_input_files(file_or_dir)
+    vocabulary = Counter()
+    for file_path in input_files:
+        for line in corpus_io.read_lines(file_path):
+            vocabulary.update(wrd.strip() for wrd in line.split(' '))
+    print(f'{len(vocabulary)} unique words in {len(input_files)} file(s)')
+
+    g2p = Transcriber(G2P_METHOD.FAIRSEQ, dialect=dialect, use_dict=use_dict, syllab_symbol=syllab_symbol, word_sep=word_sep,
+                      stress_label=stress_label, lang_detect=lang_detect, dialects=dialects, morph_fallback=morph, decoding=decoding,
+                      warm_cache=warm_cache, custom_dict_file=custom_dict_file)
+    tables = g2p.transcribe_vocabulary_dialects([wrd for wrd, freq in vocabulary.most_common()])
+    jsonl_tables = None
+    if out_format == 'jsonl':
+        jsonl_tables = tables
+        if alphabet:
+            jsonl_tables = {dialect: convert_transcribed(table, alphabet) for dialect, table in tables.items()}
+
+    for file_path in input_files:
+        print("processing: " + str(file_path))
+        file_content = corpus_io.read_lines(file_path)
+        transcribed_content = {}
+        for line in file_content:
+            transcribed_content[line] = render_line(g2p, line, tables)
+        if alphabet:
+            transcribed_content = convert_transcribed(transcribed_content, alphabet, syllab_symbol, word_sep)
+        tokens = {line: token_transcripts(line, jsonl_tables) for line in file_content} if jsonl_tables else None
+        write_transcribed(transcribed_content, file_path, out_suffix, keep_original, out_format, outdir, compression,
+                          tokens)
+    if morph:
+        report_saved_calls(g2p)
+
+
+def process_incremental(file_or_dir: Path, out_suffix: str, dialect='standard', use_dict=False, syllab_symbol='',
+                        word_sep='', stress_label=False, lang_detect=False, keep_original=False, alphabet=None, dialects=None, morph=False, decoding=None,
+                        warm_cache=None, custom_dict_file=None,
+                        outdir=None, compression=None) -> dict:
+    """
+    Transcribes a file or a directory of files like process_file_or_dir(), but only the lines containing a word
+    whose transcription source (dictionary entry, model) has changed since the last run, see incremental.py.
+    :return: the number of lines 'reused' from the previous run and lines 'transcribed'
+    """
+    print("processing: " + str(file_or_dir))
+    g2p = Transcriber(G2P_METHOD.FAIRSEQ, dialect=dialect, use_dict=use_dict, syllab_symbol=syllab_symbol, word_sep=word_sep,
+                      stress_label=stress_label, lang_detect=lang_detect, dialects=dialects, morph_fallback=morph, decoding=decoding,
+                      warm_cache=warm_cache, custom_dict_file=custom_dict_file)
+    settings = {'dialects': g2p.dialects, 'use_dict': use_dict, 'syllab_symbol': syllab_symbol, 'word_sep': word_sep,
+                'stress_label': stress_label, 'lang_detect': lang_detect, 'alphabet': alphabet, 'morph': morph}
+
+    def transcribe_lines(lines: list) -> list:
+        transcribed = [transcribe_line(g2p, line) for line in lines]
+        if alphabet:
+            transcribed = convert_lines(transcribed, alphabet, syllab_symbol, word_sep)
+        return transcribed
+
+    total = Counter()
+    for file_path in list_input_files(file_or_dir):
+        print("processing: " + str(file_path))
+        file_content = corpus_io.read_lines(file_path)
+        output_file = transcribed_filename(file_path, out_suffix, outdir=outdir, compression=compression)
+        prov_file = incremental.provenance_path(output_file)
+        prev_settings, previous = incremental.read_provenance(prov_file)
+        if not os.path.exists(output_file):
+            previous = {}
+        transcribed_content, records, stats = incremental.transcribe_incremental(
+            file_content, transcribe_lines, g2p.word_source, settings, prev_settings, previous)
+        write_transcribed(transcribed_content, file_path, out_suffix, keep_original, outdir=outdir, compression=compression)
+        incremental.write_provenance(prov_file, settings, records)
+        total.update(stats)
+    print(f'lines reused: {total["reused"]}, transcribed: {total["transcribed"]}')
+    if morph:
+        report_saved_calls(g2p)
+    return dict(total)
+
+
+def process_job(manifest: Path, outdir: Path, dialect='standard', use_dict=False, syllab_symbol='', word_sep='',
+                stress_label=False, lang_detect=False, keep_original=False, alphabet=None, corpus_mode=False, dialects=None, morph=False, decoding=None,
+                warm_cache=None, custom_dict_file=None) -> dict:
+    """
+    Processes the unfinished shards of the job defined in 'manifest', see jobs.run_job().
+    The model(s) are only loaded if there is a shard left to process.
+    """
+    g2p = None
+
+    def process_lines(lines: list) -> list:
+        nonlocal g2p
+        if g2p is None:
+            g2p = Transcriber(G2P_METHOD.FAIRSEQ, dialect=dialect, use_dict=use_dict, syllab_symbol=syllab_symbol,
+                              word_sep=word_sep, stress_label=stress_label, lang_detect=lang_detect, dialects=dialects, morph_fallback=morph, decoding=decoding,
+                              warm_cache=warm_cache, custom_dict_file=custom_dict_file)
+        if corpus_mode:
+            tables = g2p.transcribe_vocabulary_dialects({wrd.strip() for line in lines for wrd in line.split(' ')})
+            transcribed = [render_line(g2p, line, tables) for line in lines]
+        else:
+            transcribed = [transcribe_line(g2p, line) for line in lines]
+        if alphabet:
+            transcribed = convert_lines(transcribed, alphabet, syllab_symbol, word_sep)
+        return transcribed
+
+    summary = jobs.run_job(manifest, outdir, process_lines, keep_original=keep_original)
+    if morph and g2p is not None:
+        report_saved_calls(g2p)
+    print(f'shards processed: {summary["processed"]}, already done: {summary["done"]}, '
+          f'claimed by other workers: {summary["locked"]}')
+    return summary
+
+
+def process_stdio(dialect='standard', use_dict=False, syllab_symbol='', word_sep='', stress_label=False,
+                  lang_detect=False, alphabet=None, dialects=None, morph=False, decoding=None, warm_cache=None,
+                  custom_dict_file=None, result_cache_size=0, result_cache_ttl=None) -> int:
+    """
+    Answers JSON requests from stdin with one resident transcriber until stdin is closed, see serve.py.
+    The output options given here are the defaults of each request. The custom dictionary file is reloaded
+    when it changes. Repeated requests are answered from a cache of up to 'result_cache_size' results, valid for
+    'result_cache_ttl' seconds if set.
+    :return: the number of requests answered
+    """
+    g2p = Transcriber(G2P_METHOD.FAIRSEQ, dialect=dialect, use_dict=use_dict, syllab_symbol=syllab_symbol, word_sep=word_sep,
+                      stress_label=stress_label, lang_detect=lang_detect, dialects=dialects, morph_fallback=morph, decoding=decoding,
+                      warm_cache=warm_cache, custom_dict_file=custom_dict_file, watch_custom_dict=True,
+                      result_cache_size=result_cache_size, result_cache_ttl=result_cache_ttl)
+    defaults = {'dialect': g2p.dialects[0], 'syll': syllab_symbol, 'sep': word_sep, 'stress': stress_label,
+                'alphabet': alphabet}
+    return serve.Server(g2p, defaults).serve()
+
+
+def convert(transcription: str, from_alpha: str, to_alpha, syllab_symbol='', word_sep=''):
+    converter = get_converter()
+    converted = converter.convert(transcription, from_alpha, to_alpha, passthrough=(syllab_symbol, word_sep))
     return converted
 
 
+def convert_transcribed(transcribed: dict, to_alpha: str, syllab_symbol='', word_sep='') -> dict:
+    """
+    Converts the SAMPA transcriptions (values) of 'transcribed' to 'to_alpha'
+    """
+    converted = convert_lines(list(transcribed.values()), to_alpha, syllab_symbol, word_sep)
+    return dict(zip(transcribed.keys(), converted))
+
+
+def convert_lines(transcripts: list, to_alpha: str, syllab_symbol='', word_sep='') -> list:
+    """
+    Converts SAMPA transcriptions to 'to_alpha', the tab separated columns of multi-dialect output one by one
+    """
+    converter = get_converter()
+    passthrough = (syllab_symbol, word_sep)
+    if not any('\t' in transcr for transcr in transcripts):
+        return converter.convert_many(transcripts, 'SAMPA', to_alpha, passthrough=passthrough)
+    return ['\t'.join(converter.convert_many(transcr.split('\t'), 'SAMPA', to_alpha, passthrough=passthrough))
+            for transcr in transcripts]
+
+
+def report_unknown_symbols():
+    report = get_converter().report_unknown()
+    if report:
+        logging.warning(report)
+
+
 def get_alphabets():
-    converter = Converter()
+    converter = get_converter()
     return converter.get_valid_alphabets()
 
 
@@ -109,8 +426,18 @@ def get_arguments():
     group = parser.add_mutually_exclusive_group(required=True)
     group.add_argument('--infile', '-if', type=Path, help='inputfile or directory')
     group.add_argument('--inputstr', '-i', help='input string')
+    group.add_argument('--job', type=Path, help='manifest file of a resumable job, one input shard per line')
+    group.add_argument('--serve-stdio', action='store_true', help='answer newline-delimited JSON requests from stdin '
+                       'on stdout with one resident transcriber, until stdin is closed')
+    parser.add_argument('--outdir', type=Path, help='output directory, default: the directory of each input file, '
+                        'for --job: "transcribed" next to the manifest')
+    parser.add_argument('--format', default='tsv', choices=corpus_io.OUTPUT_FORMATS, help='output format for file '
+                        'or directory input: tab separated, or JSON lines with the transcription of each token')
+    parser.add_argument('--compress', choices=list(corpus_io.OPENERS) + ['none'], help='compression of the output '
+                        'files, default: the compression of the input file')
     parser.add_argument('--dialect', '-a', default='standard',
-                        help='dialect to transcribe by, available: "standard" and "north"')
+                        help='dialect to transcribe by, available: "standard" and "north". Several dialects separated '
+                             'by commas ("standard,north") are transcribed in one pass, one output column per dialect')
     parser.add_argument('--sep', '-s', type=str, help='word separator to use')
     parser.add_argument('--syll', '-y', type=str, help='syllable separator to use')
     parser.add_argument('--stress', '-t', action='store_true', help='use stress labels')
@@ -118,24 +445,86 @@ def get_arguments():
     parser.add_argument('--keep', '-k', action='store_true', help='keep original')
     parser.add_argument('--langdetect', '-l', action='store_true', help='use word-based language detection')
     parser.add_argument('--phoneticalpha', '-p', type=str, help='output in a specific phonetic alphabet')
+    parser.add_argument('--corpus', '-c', action='store_true', help='corpus mode for file or directory input: '
+                                                                    'transcribe each unique word only once')
+    parser.add_argument('--morph', action='store_true', help='with --dict: transcribe inflected forms of dictionary '
+                        'words from the dictionary before calling the model')
+    parser.add_argument('--deadline', type=float, help='time budget in milliseconds per input string or line, '
+                        'unknown words are transcribed with cheaper strategies when the time runs out')
+    parser.add_argument('--profile', default='default', choices=list(DECODING_PROFILES),
+                        help='decoding profile of the model: "default" (beam search) or "fast" (greedy decoding)')
+    parser.add_argument('--beam', type=int, help='beam size, overrides the profile')
+    parser.add_argument('--lenpen', type=float, help='length penalty, overrides the profile')
+    parser.add_argument('--maxlen-a', type=float, help='maximum output length: maxlen-a * input length + maxlen-b')
+    parser.add_argument('--maxlen-b', type=int, help='maximum output length: maxlen-a * input length + maxlen-b')
+    parser.add_argument('--warm-cache', action='append', help='cache file written by "ice-g2p warm" (see '
+                        '"ice-g2p warm --help"), used with --dict, can be given several times')
+    parser.add_argument('--custom-dict', help='with --dict: custom dictionary file, one "word<TAB>transcription" '
+                        'line per entry, has priority over the pronunciation dictionary (first dialect only)')
+    parser.add_argument('--result-cache', type=int, default=0, metavar='SIZE', help='for --serve-stdio: answer '
+                        'repeated requests from a cache of up to SIZE results')
+    parser.add_argument('--result-cache-ttl', type=float, metavar='SECONDS', help='seconds a cached result is valid, '
+                        'default: until a dictionary changes')
+    parser.add_argument('--nbest', type=int, help='for string input: print the n best transcriptions of each word '
+                                                  'with their scores')
+    parser.add_argument('--no-daemon', action='store_true', help='for string input: transcribe in this process '
+                        'even if a daemon is running (see "ice-g2p daemon --help")')
+    parser.add_argument('--pipelined', action='store_true', help='for file or directory input: read, preprocess, '
+                        'transcribe and write in parallel threads, one dialect only')
+    parser.add_argument('--incremental', action='store_true', help='for file or directory input: only transcribe '
+                        'lines again whose dictionary entries or model have changed since the last run')
     return parser.parse_args()
 
 
 def main():
+    if sys.argv[1:2] == ['daemon']:
+        daemon.main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ['warm']:
+        warm.main(sys.argv[2:])
+        return
     args = get_arguments()
     keep_original = args.keep
-    dialect = args.dialect
+    dialects = args.dialect.split(',')
+    dialect = dialects[0]
     word_sep = args.sep
     use_dict = args.dict
     syllab = args.syll
     stress = args.stress
     lang_detect = args.langdetect
     alphabet = args.phoneticalpha
+    corpus_mode = args.corpus
+    morph = args.morph
+    deadline_ms = args.deadline
+    decoding = {'profile': args.profile, 'beam': args.beam, 'lenpen': args.lenpen, 'max_len_a': args.maxlen_a,
+                'max_len_b': args.maxlen_b}
+    out_format = args.format
+    warm_cache = args.warm_cache
+    custom_dict_file = args.custom_dict
+    compression = '' if args.compress == 'none' else args.compress
 
-    if dialect not in AVAILABLE_DIALECTS:
-        logging.error(f'Transcription is not available for dialect "{dialect}". Available dialects: {AVAILABLE_DIALECTS}')
+    for dial in dialects:
+        if dial not in AVAILABLE_DIALECTS:
+            logging.error(f'Transcription is not available for dialect "{dial}". Available dialects: {AVAILABLE_DIALECTS}')
+            sys.exit(1)
+
+    if deadline_ms is not None and (len(dialects) > 1 or corpus_mode or args.incremental or args.job or args.serve_stdio):
+        logging.error('A deadline (--deadline) is only available for a single dialect and line by line transcription')
+        sys.exit(1)
+
+    if args.pipelined and (len(dialects) > 1 or deadline_ms is not None or corpus_mode or args.incremental
+                           or args.infile is None):
+        logging.error('Pipelined transcription (--pipelined) is only available for file or directory input, '
+                      'a single dialect and line by line transcription without a deadline')
+        sys.exit(1)
+
+    if out_format == 'jsonl' and (args.incremental or args.job):
+        logging.error('The jsonl output format is not available with --incremental or --job')
         sys.exit(1)
 
+    if morph and not use_dict:
+        logging.warning('The morphological fallback (--morph) is only used with the pronunciation dictionary (--dict)')
+
     available_alphabets = get_alphabets()
     if alphabet and not alphabet in available_alphabets:
         logging.error(f'{alphabet} is not available. Available phonetic alphabets: {available_alphabets}')
@@ -146,21 +535,61 @@ def main():
         if not args.infile.exists():
             logging.error(str(args.infile) + ' does not exist.')
             sys.exit(1)
+        elif args.incremental:
+            process_incremental(args.infile, '_transcribed', dialect=dialect, use_dict=use_dict, syllab_symbol=syllab,
+                                word_sep=word_sep, stress_label=stress, lang_detect=lang_detect,
+                                keep_original=keep_original, alphabet=alphabet, dialects=dialects, morph=morph, decoding=decoding,
+                                warm_cache=warm_cache, custom_dict_file=custom_dict_file,
+                                outdir=args.outdir, compression=compression)
+        elif corpus_mode:
+            process_corpus(args.infile, '_transcribed', dialect=dialect, use_dict=use_dict, syllab_symbol=syllab, word_sep=word_sep,
+                           stress_label=stress, lang_detect=lang_detect, keep_original=keep_original, alphabet=alphabet,
+                           dialects=dialects, morph=morph, decoding=decoding,
+                           warm_cache=warm_cache,
+                           custom_dict_file=custom_dict_file, out_format=out_format, outdir=args.outdir,
+                           compression=compression)
         else:
             process_file_or_dir(args.infile, '_transcribed', dialect=dialect, use_dict=use_dict, syllab_symbol=syllab, word_sep=word_sep,
-                                stress_label=stress, lang_detect=lang_detect, keep_original=keep_original)
+                                stress_label=stress, lang_detect=lang_detect, keep_original=keep_original,
+                                alphabet=alphabet, dialects=dialects, morph=morph, deadline_ms=deadline_ms, decoding=decoding,
+                                warm_cache=warm_cache, custom_dict_file=custom_dict_file,
+                                out_format=out_format, outdir=args.outdir, compression=compression,
+                                pipelined=args.pipelined)
+
+    if args.job is not None:
+        if not args.job.exists():
+            logging.error(str(args.job) + ' does not exist.')
+            sys.exit(1)
+        outdir = args.outdir if args.outdir else args.job.parent / 'transcribed'
+        process_job(args.job, outdir, dialect=dialect, use_dict=use_dict, syllab_symbol=syllab, word_sep=word_sep,
+                    stress_label=stress, lang_detect=lang_detect, keep_original=keep_original, alphabet=alphabet,
+                    corpus_mode=corpus_mode, dialects=dialects, morph=morph, decoding=decoding, warm_cache=warm_cache,
+                    custom_dict_file=custom_dict_file)
 
-    if args.inputstr is not None:
+    if args.serve_stdio:
+        process_stdio(dialect=dialect, use_dict=use_dict, syllab_symbol=syllab, word_sep=word_sep, stress_label=stress,
+                      lang_detect=lang_detect, alphabet=alphabet, dialects=dialects, morph=morph, decoding=decoding,
+                      warm_cache=warm_cache, custom_dict_file=custom_dict_file, result_cache_size=args.result_cache,
+                      result_cache_ttl=args.result_cache_ttl)
+
+    if args.inputstr is not None and args.nbest:
+        process_nbest(args.inputstr, args.nbest, dialect=dialect, use_dict=use_dict, lang_detect=lang_detect, morph=morph,
+                      decoding=decoding, warm_cache=warm_cache, custom_dict_file=custom_dict_file)
+    elif args.inputstr is not None:
         transcribed = process_string(args.inputstr, dialect=dialect, use_dict=use_dict, syllab_symbol=syllab, word_sep=word_sep,
-                                stress_label=stress, lang_detect=lang_detect)
+                                stress_label=stress, lang_detect=lang_detect, dialects=dialects, morph=morph,
+                                deadline_ms=deadline_ms, decoding=decoding,
+                                warm_cache=warm_cache, custom_dict_file=custom_dict_file, use_daemon=not args.no_daemon)
 
         if alphabet:
-            transcribed = convert(transcribed, 'SAMPA', alphabet)
+            transcribed = convert_lines([transcribed], alphabet, syllab_symbol=syllab, word_sep=word_sep)[0]
         if keep_original:
             print(args.inputstr + ' : ' + transcribed)
         else:
             print(transcribed)
 
+    report_unknown_symbols()
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,159 @@
+"""
+A morphological fallback for words not found in the pronunciation dictionary.
+
+Many words that are not in the dictionary are inflected forms of dictionary words: 'hestanna' is not in the
+dictionary, but 'hestar' and 'hesta' are. From the dictionary we learn how the transcription changes when one
+ending is replaced by another: for all pairs of dictionary words with a common stem and endings from
+stress.ENDING_SYLLABLES (or no ending), we collect the phones following the longest common phone prefix of the two
+transcriptions. For 'hest|ur' and 'hest|inum' this gives the rule ('t', 'ur' -> 'inum'): ('Y', 'r') ->
+('I', 'n', 'Y', 'm'), with the last letter of the stem as context.
+
+To transcribe an unknown word, we look for dictionary words with the same stem and another ending, and apply the most
+frequent rule matching the transcription of the dictionary word. Only rules seen at least 'min_count' times are
+applied. If no rule applies, the word goes on to the model.
+
+The accuracy of the fallback can be evaluated on held-out dictionary entries:
+
+    $ python -m ice_g2p.morphology --dialect standard --holdout 0.05
+"""
+
+import argparse
+from collections import Counter, defaultdict
+
+from ice_g2p.stress import ENDING_SYLLABLES
+from ice_g2p.evaluation import edit_distance, split_dictionary
+
+# only apply rules that were seen at least this often in the dictionary
+MIN_RULE_COUNT = 5
+# minimum number of letters of a stem
+MIN_STEM_LENGTH = 3
+
+
+class MorphIndex:
+
+    def __init__(self, pron_dict: dict, endings=ENDING_SYLLABLES, min_count: int = MIN_RULE_COUNT):
+        """
+        Builds the ending rules from 'pron_dict'.
+        :param pron_dict: the pronunciation dictionary, word -> transcription
+        :param endings: the grammatical endings to consider, the empty ending is always included
+        :param min_count: only apply rules that were seen at least 'min_count' times
+        """
+        self.pron_dict = pron_dict
+        self.min_count = min_count
+        # longest endings first
+        self.endings = sorted(set(endings) | {''}, key=lambda e: (-len(e), e))
+        # (last letter of the stem, ending of the known word, ending of the new word) ->
+        # Counter of (phones to remove, phones to add)
+        self.rules = defaultdict(Counter)
+        # words and compound parts transcribed by the fallback instead of the model
+        self.saved_calls = Counter()
+        self._build()
+
+    def _build(self):
+        stems = defaultdict(list)
+        for word, transcr in self.pron_dict.items():
+            for ending in self.endings:
+                if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM_LENGTH:
+                    stems[word[:len(word) - len(ending)]].append((ending, transcr.split()))
+        for stem, forms in stems.items():
+            if len(forms) < 2:
+                continue
+            for ending1, phones1 in forms:
+                for ending2, phones2 in forms:
+                    if ending1 == ending2:
+                        continue
+                    common = common_prefix_length(phones1, phones2)
+                    self.rules[(stem[-1], ending1, ending2)][(tuple(phones1[common:]), tuple(phones2[common:]))] += 1
+
+    def transcribe(self, word: str) -> str:
+        """
+        Returns the transcription of 'word' derived from an inflected form in the dictionary,
+        an empty string if no rule applies.
+        """
+        best_count = 0
+        best = ''
+        for ending in self.endings:
+            if not word.endswith(ending):
+                continue
+            stem = word[:len(word) - len(ending)]
+            if len(stem) < MIN_STEM_LENGTH:
+                continue
+            for known_ending in self.endings:
+                known = self.pron_dict.get(stem + known_ending)
+                if known_ending == ending or not known:
+                    continue
+                rules = self.rules.get((stem[-1], known_ending, ending))
+                if not rules:
+                    continue
+                phones = known.split()
+                for (remove, add), count in rules.most_common():
+                    if count < self.min_count or count <= best_count:
+                        break
+                    if len(remove) <= len(phones) and tuple(phones[len(phones) - len(remove):]) == remove:
+                        best_count = count
+                        best = ' '.join(phones[:len(phones) - len(remove)] + list(add))
+                        break
+        return best
+
+    def lookup(self, word: str, kind: str = 'word') -> str:
+        """ Same as transcribe(), counts the transcribed words as saved model calls of 'kind' """
+        transcr = self.transcribe(word)
+        if transcr:
+            self.saved_calls[kind] += 1
+        return transcr
+
+
+def common_prefix_length(seq1, seq2) -> int:
+    length = 0
+    for elem1, elem2 in zip(seq1, seq2):
+        if elem1 != elem2:
+            break
+        length += 1
+    return length
+
+
+def evaluate(pron_dict: dict, holdout: float = 0.05, seed: int = 1, min_count: int = MIN_RULE_COUNT) -> dict:
+    """
+    Evaluates the fallback on held-out dictionary entries: builds the index on the remaining entries and
+    transcribes the held-out words.
+    :return: the number of held-out words, the 'coverage' (fraction of held-out words transcribed by the fallback),
+    the word 'accuracy' and the phone error rate 'per' of the covered words
+    """
+    held_out, train = split_dictionary(pron_dict, int(len(pron_dict) * holdout), seed)
+    index = MorphIndex(train, min_count=min_count)
+    covered = correct = errors = phones = 0
+    for word in held_out:
+        transcr = index.transcribe(word)
+        if not transcr:
+            continue
+        covered += 1
+        reference = pron_dict[word].split()
+        correct += transcr.split() == reference
+        errors += edit_distance(transcr.split(), reference)
+        phones += len(reference)
+    return {'words': len(held_out),
+            'coverage': covered / len(held_out) if held_out else 0.0,
+            'accuracy': correct / covered if covered else 0.0,
+            'per': errors / phones if phones else 0.0}
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser(description='Evaluate the morphological fallback on held-out dictionary entries.')
+    parser.add_argument('--dialect', '-a', default='standard', help='dialect of the pronunciation dictionary')
+    parser.add_argument('--holdout', type=float, default=0.05, help='fraction of dictionary entries to hold out')
+    parser.add_argument('--seed', type=int, default=1, help='random seed for the held-out sample')
+    parser.add_argument('--mincount', type=int, default=MIN_RULE_COUNT, help='minimum count of a rule to apply it')
+    return parser.parse_args()
+
+
+def main():
+    from ice_g2p.dictionaries import get_dictionary
+    args = get_arguments()
+    pron_dict = get_dictionary(args.dialect)
+    result = evaluate(pron_dict, args.holdout, args.seed, args.mincount)
+    print(f'held-out words: {result["words"]}, coverage: {result["coverage"]:.3f}, '
+          f'accuracy: {result["accuracy"]:.3f}, PER: {result["per"]:.4f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+A shared inventory of phone symbols for each phonetic alphabet. Each phone gets an integer id and transcripts
+are encoded once as arrays of these ids. All properties of a phone we need during syllabification, compound
+analysis and alphabet conversion are precomputed per id, such that checking for a vowel, a consonant cluster,
+comparing phones regardless of length or aspiration, or converting to another alphabet is a table lookup.
+
+The symbols are read from data/sampa_ipa_single_flite.csv, data/vowels_*.txt and data/cons_clusters_*.txt.
+Symbols not contained in these files (e.g. from a custom dictionary) are added to the inventory when
+first encoded.
+
+Example:
+    inventory = get_inventory('SAMPA')
+    ids = inventory.encode('p_h au f Y k l_0')
+    inventory.convert(ids, 'IPA')   # ['pʰ', 'au', 'f', 'ʏ', 'k', 'l̥']
+
+"""
+
+from array import array
+
+from ice_g2p import dictionaries
+
+# symbols to strip from a phone to get its base phone, i.e. the phone without length, aspiration or voicelessness
+# marks: 'a:' -> 'a', 't_h' -> 't', 'r_0' -> 'r'
+MODIFIER_SYMBOLS = {'SAMPA': (':', '_h', '_0'),
+                    'IPA': ('ː', '\u02B0', '\u0325', '\u030A')}
+# the phone 'h' might be missing in one of two transcripts we are comparing: 'hluthafi' vs. 'hafi'
+ASPIRATION_PHONE = 'h'
+
+
+class PhoneInventory:
+
+    def __init__(self, alphabet: str = 'SAMPA'):
+        self.alphabet = alphabet
+        self.symbols = []               # id -> symbol
+        self.ids = {}                   # symbol -> id
+        self.is_vowel = bytearray()     # id -> 1 if the phone is a vowel
+        # id -> 1 if the first character of the symbol is a vowel symbol. 'e' and 'o' aren't actually in the
+        # inventory, regardless of if we are using SAMPA or IPA, but we need to be able to identify 'ei' and 'ou'
+        # from the first character only, so those characters are contained in the vowels lists.
+        self.vowel_initial = bytearray()
+        self.in_alphabet = bytearray()  # id -> 1 if the symbol is defined in the alphabets file
+        self.base = array('H')          # id -> id of the base phone
+        self.conversion = {}            # alphabet -> list of symbols, indexed by id
+
+        if alphabet in MODIFIER_SYMBOLS:
+            self.vowels = set(dictionaries.get_vowels(alphabet))
+            cluster_list = dictionaries.get_cons_clusters(alphabet)
+        else:
+            self.vowels = set()
+            cluster_list = []
+
+        table = dictionaries.get_alphabets_table()
+        headers = table[0]
+        if alphabet in headers:
+            col = headers.index(alphabet)
+            for row in table[1:]:
+                self.in_alphabet[self.add(row[col])] = 1
+            for i, header in enumerate(headers):
+                mapping = {row[col]: row[i] for row in table[1:]}
+                self.conversion[header] = [mapping.get(symb, symb) for symb in self.symbols]
+        for vowel in sorted(self.vowels):
+            self.add(vowel)
+
+        self.clusters = {tuple(self.encode(clust)) for clust in cluster_list}
+        self.cluster_lengths = sorted({len(clust) for clust in self.clusters})
+        self.aspiration_id = self.add(ASPIRATION_PHONE)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def add(self, symbol: str) -> int:
+        """
+        Returns the id of 'symbol', adds it to the inventory if it is not yet contained.
+        """
+        if symbol in self.ids:
+            return self.ids[symbol]
+        base_symbol = symbol
+        for modifier in MODIFIER_SYMBOLS.get(self.alphabet, ()):
+            base_symbol = base_symbol.replace(modifier, '')
+        # the base phone has to be in the inventory before the phone itself
+        base_id = self.add(base_symbol) if base_symbol and base_symbol != symbol else None
+        phone_id = len(self.symbols)
+        self.symbols.append(symbol)
+        self.ids[symbol] = phone_id
+        self.is_vowel.append(symbol in self.vowels)
+        self.vowel_initial.append(symbol[0] in self.vowels)
+        self.in_alphabet.append(0)
+        # the base of a base phone is the phone itself
+        self.base.append(phone_id if base_id is None else base_id)
+        for symbols in self.conversion.values():
+            symbols.append(symbol)
+        return phone_id
+
+    def encode(self, transcript: str) -> array:
+        """
+        Encodes a transcript with space separated phones as an array of phone ids.
+        """
+        return self.encode_phones(transcript.split())
+
+    def encode_phones(self, phones) -> array:
+        """
+        Encodes a sequence of phone symbols as an array of phone ids.
+        """
+        ids = self.ids
+        return array('H', [ids[p] if p in ids else self.add(p) for p in phones])
+
+    def decode(self, phone_ids) -> list:
+        symbols = self.symbols
+        return [symbols[i] for i in phone_ids]
+
+    def to_string(self, phone_ids) -> str:
+        return ' '.join(self.decode(phone_ids))
+
+    def same_base(self, id1: int, id2: int) -> bool:
+        """ True if the two phones only differ in length, aspiration or voicelessness """
+        return self.base[id1] == self.base[id2]
+
+    def ends_with_cluster(self, phone_ids):
+        """
+        Returns the consonant cluster 'phone_ids' ends with as a tuple of ids, or None if it does not
+        end with a cluster.
+        """
+        cluster = None
+        for clust_len in self.cluster_lengths:
+            if len(phone_ids) >= clust_len and tuple(phone_ids[-clust_len:]) in self.clusters:
+                cluster = tuple(phone_ids[-clust_len:])
+        return cluster
+
+    def convert(self, phone_ids, to_alphabet: str) -> list:
+        """
+        Returns the symbols of 'phone_ids' in 'to_alphabet'. Phones not defined in the alphabets file
+        are returned unchanged.
+        """
+        symbols = self.conversion[to_alphabet]
+        return [symbols[i] for i in phone_ids]
+
+
+def rfind(phone_ids: array, sub_ids: array) -> int:
+    """
+    Returns the highest index in 'phone_ids' where 'sub_ids' is found, -1 if it is not found.
+    """
+    if not sub_ids:
+        return len(phone_ids)
+    haystack = phone_ids.tobytes()
+    needle = sub_ids.tobytes()
+    end = len(haystack)
+    while True:
+        ind = haystack.rfind(needle, 0, end)
+        # only matches at phone boundaries are valid
+        if ind < 0 or ind % phone_ids.itemsize == 0:
+            return ind // phone_ids.itemsize if ind >= 0 else -1
+        end = ind + len(needle) - 1
+
+
+_inventories = {}
+
+
+def get_inventory(alphabet: str = 'SAMPA') -> PhoneInventory:
+    """
+    Returns the inventory for 'alphabet', shared by all modules.
+    """
+    if alphabet not in _inventories:
+        _inventories[alphabet] = PhoneInventory(alphabet)
+    return _inventories[alphabet]
@@ -0,0 +1,328 @@
+"""
+The transcription pipeline: a sequence of stages, each processing a batch of tokens.
+
+    normalize -> language -> lexicon -> compound -> model -> syllabify -> stress -> format
+
+A batch is a list of utterances, each utterance a list of Token objects (see tokens.py), one per space separated
+word. Each stage updates the tokens of the whole batch in place, such that e.g. the model stage sends the compound
+parts of all unknown words of the batch to the model in batched calls. Stages can be replaced, removed or added
+by name, and the time spent in each stage is measured. The format stage joins the tokens of an utterance to the
+output string.
+
+Transcriber is a preset of this pipeline (see Transcriber.pipeline), a pipeline can also be created directly:
+
+    pipeline = Pipeline.create(FairseqG2P(), use_dict=True, syllab_symbol='.', stress_label=True)
+    pipeline.transcribe(['hestur í haga', 'hlaupastrákur'])
+    pipeline.timings
+    # {'normalize': 0.0001, 'lexicon': 0.0002, ...}
+"""
+
+import math
+import time
+from collections import Counter
+from nltk import trigrams
+
+import ice_g2p.syllab_stress_processing as syllabify
+from ice_g2p import compound_analysis
+from ice_g2p.cache import LRUCache
+from ice_g2p.stress import set_stress
+from ice_g2p.tokens import Token
+from ice_g2p.trigrams import ice_grams, eng_grams
+
+# maximum number of words in the compound parts cache of the compound stage
+COMP_PARTS_CACHE_SIZE = 100000
+
+
+def is_icelandic(word: str, foreign_alphabet) -> bool:
+    """ Use trigrams to estimate the probability of a word being Icelandic or not """
+    # If word contains non-valid characters for either of the models, it can't be transcribed by
+    # the corresponding model. We use the Icelandic one as fallback, so just check for non-valid
+    # English characters. Important check because of loanwords that might contain Icelandic characters
+    # like: 'absúrd', 'dnépr', 'penélope' that have higher combined trigram probs for English despite
+    # the non-valid trigrams containing Icelandic characters.
+    if set(word).difference(foreign_alphabet):
+        return True
+    # Special case for spelling
+    if len(word) == 1:
+        return True
+    ice_probs = []
+    eng_probs = []
+    for c1, c2, c3 in trigrams(word.lower(), pad_right=True, pad_left=True):
+        if (c1, c2) in ice_grams and c3 in ice_grams[(c1, c2)]:
+            ice_probs.append(ice_grams[(c1, c2)][c3])
+        else:
+            ice_probs.append(0.001)
+        if (c1, c2) in eng_grams and c3 in eng_grams[(c1, c2)]:
+            eng_probs.append(eng_grams[(c1, c2)][c3])
+        else:
+            eng_probs.append(0.001)
+    if math.prod(ice_probs) >= math.prod(eng_probs):
+        return True
+    return False
+
+
+def batch_tokens(batch: list):
+    """ All tokens of a batch of utterances """
+    for tokens in batch:
+        yield from tokens
+
+
+def pending_tokens(batch: list):
+    """ The tokens of a batch that still need a transcription """
+    for token in batch_tokens(batch):
+        if token.normalized and not token.source:
+            yield token
+
+
+class Stage:
+    """ A pipeline stage: process() updates the tokens of a batch of utterances in place """
+    name = ''
+
+    def process(self, batch: list) -> None:
+        raise NotImplementedError
+
+
+class NormalizeStage(Stage):
+    """ Strips whitespace from the words. The input is expected to be normalized text otherwise. """
+    name = 'normalize'
+
+    def process(self, batch: list) -> None:
+        for token in batch_tokens(batch):
+            token.normalized = token.word.strip()
+
+
+class LanguageStage(Stage):
+    """ Word-based language detection, tokens found not to be Icelandic are transcribed with the foreign model """
+    name = 'language'
+
+    def __init__(self, foreign_alphabet, detect=is_icelandic):
+        """
+        :param foreign_alphabet: the alphabet of the foreign model
+        :param detect: a function (word, foreign_alphabet) -> True if the word is Icelandic
+        """
+        self.foreign_alphabet = foreign_alphabet
+        self.detect = detect
+
+    def process(self, batch: list) -> None:
+        for token in batch_tokens(batch):
+            # only tokens labelled as Icelandic are sent to language detection
+            if token.icelandic:
+                token.icelandic = self.detect(token.normalized, self.foreign_alphabet)
+
+
+class ModelChoice:
+    """ Chooses the Icelandic or the foreign g2p for a token by its language """
+
+    def __init__(self, g2p, foreign=None, use_dict=False):
+        self.g2p = g2p
+        self.foreign = foreign
+        self.use_dict = use_dict
+
+    def g2p_for(self, token: Token):
+        if self.foreign is not None and not token.icelandic:
+            return self.foreign
+        token.icelandic = True
+        return self.g2p
+
+
+class LexiconStage(ModelChoice, Stage):
+    """
+    Looks the words up in the cache of automatic transcriptions, the custom and the core dictionary and
+    the morphological fallback, see FairseqG2P.lookup_word(). Words with non valid characters are marked
+    as 'invalid'.
+    """
+    name = 'lexicon'
+
+    def process(self, batch: list) -> None:
+        for token in pending_tokens(batch):
+            token.transcript, token.source = self.g2p_for(token).lookup_word(token.normalized, self.use_dict)
+
+
+class CompoundStage(Stage):
+    """ Splits the words still needing a transcription into compound parts """
+    name = 'compound'
+
+    def __init__(self):
+        self.comp_parts = LRUCache(COMP_PARTS_CACHE_SIZE)
+
+    def process(self, batch: list) -> None:
+        for token in pending_tokens(batch):
+            parts = self.comp_parts.get(token.normalized)
+            if parts is None:
+                parts = compound_analysis.get_compound_parts(token.normalized)
+                self.comp_parts.put(token.normalized, parts)
+            token.parts = parts
+
+
+class ModelStage(ModelChoice, Stage):
+    """
+    Transcribes the remaining words with the g2p models: the compound parts not found in the dictionaries are
+    sent to the model in batches, see FairseqG2P.model_transcribe_batch(). The transcriptions are cached.
+    """
+    name = 'model'
+
+    def process(self, batch: list) -> None:
+        pending = {}
+        for token in pending_tokens(batch):
+            g2p = self.g2p_for(token)
+            pending.setdefault(id(g2p), (g2p, []))[1].append(token)
+        for g2p, tokens in pending.values():
+            comp_parts = {token.normalized: token.parts for token in tokens if token.parts is not None}
+            transcribed = g2p.model_transcribe_batch(list(dict.fromkeys(token.normalized for token in tokens)),
+                                                     self.use_dict, comp_parts)
+            for token in tokens:
+                token.transcript = transcribed[token.normalized]
+                token.source = 'model'
+                g2p.automatic_g2p_dict[token.normalized] = token.transcript
+
+
+class SyllabifyStage(Stage):
+    """ Syllabifies the transcription of each token """
+    name = 'syllabify'
+
+    def __init__(self, syllab_symbol='.'):
+        self.syllab_symbol = syllab_symbol
+
+    def process(self, batch: list) -> None:
+        for tokens in batch:
+            # one entry per word of an utterance, repeated words share their entry in stress labeling
+            phones = {token.word: token.phones for token in tokens}
+            entries = {wrd: syllabify.syllabify_phones_cached(wrd, word_phones, self.syllab_symbol)
+                       for wrd, word_phones in phones.items()}
+            for token in tokens:
+                token.entry = entries[token.word]
+
+
+class StressStage(Stage):
+    """ Sets the stress labels of the syllables, in the context of the previous words of the utterance """
+    name = 'stress'
+
+    def process(self, batch: list) -> None:
+        for tokens in batch:
+            set_stress([token.entry for token in tokens])
+
+
+class FormatStage:
+    """ Joins the tokens of an utterance to the output string, syllabified and stress labeled if set """
+    name = 'format'
+
+    def __init__(self, syllab_symbol='', word_sep='', stress_label=False):
+        self.syllab_symbol = syllab_symbol
+        self.word_separator = word_sep
+        self.add_stress_label = stress_label
+
+    def format(self, tokens: list, cmu=False) -> str:
+        if self.syllab_symbol:
+            return self.extract_transcript([token.entry for token in tokens], cmu)
+        elif self.word_separator:
+            return f' {self.word_separator} '.join(token.transcript for token in tokens)
+        return ' '.join(token.transcript for token in tokens)
+
+    def extract_transcript(self, syllabified: list, cmu=False) -> str:
+        if cmu:
+            return self.extract_cmu_transcript(syllabified)
+        result = ''
+        for entr in syllabified:
+            if self.add_stress_label:
+                string_repr = entr.simple_stress_format()
+            else:
+                string_repr = entr.dot_format_syllables()
+            if not result:
+                result += string_repr
+            elif self.word_separator:
+                result += f" {self.word_separator} " + string_repr
+            else:
+                result += " " + string_repr
+
+        return result
+
+    def extract_cmu_transcript(self, syllabified: list) -> str:
+        result = ''
+        for entr in syllabified:
+            if not result:
+                result += entr.cmu_format()
+            elif self.word_separator:
+                result += f" {self.word_separator} " + entr.cmu_format()
+            else:
+                result += " " + entr.cmu_format()
+
+        return result
+
+
+class Pipeline:
+
+    def __init__(self, stages: list, formatter: FormatStage):
+        """
+        :param stages: the stages in processing order, each with a unique name
+        :param formatter: the format stage
+        """
+        self.stages = list(stages)
+        self.formatter = formatter
+        # seconds spent in each stage
+        self.timings = Counter()
+
+    @classmethod
+    def create(cls, g2p, foreign=None, use_dict=False, lang_detect=False, syllab_symbol='', word_sep='',
+               stress_label=False) -> 'Pipeline':
+        """
+        Creates the default pipeline.
+        :param g2p: the FairseqG2P of the dialect to transcribe
+        :param foreign: the FairseqG2P for foreign words, if any
+        :param lang_detect: add the language stage (only with a foreign g2p)
+        :param syllab_symbol: add the syllabify and stress stages with this syllable symbol
+        """
+        stages = [NormalizeStage()]
+        if lang_detect and foreign is not None:
+            stages.append(LanguageStage(foreign.alphabet))
+        stages += [LexiconStage(g2p, foreign, use_dict), CompoundStage(), ModelStage(g2p, foreign, use_dict)]
+        if syllab_symbol:
+            stages += [SyllabifyStage(syllab_symbol), StressStage()]
+        return cls(stages, FormatStage(syllab_symbol, word_sep, stress_label))
+
+    def stage(self, name: str) -> Stage:
+        for stage in self.stages:
+            if stage.name == name:
+                return stage
+        raise KeyError(f'No stage "{name}" in the pipeline: {[stage.name for stage in self.stages]}')
+
+    def replace(self, name: str, stage: Stage) -> None:
+        self.stages[self.stages.index(self.stage(name))] = stage
+
+    def remove(self, name: str) -> None:
+        self.stages.remove(self.stage(name))
+
+    def insert(self, before: str, stage: Stage) -> None:
+        """ Inserts 'stage' before the stage named 'before' """
+        self.stages.insert(self.stages.index(self.stage(before)), stage)
+
+    @staticmethod
+    def tokenize(lines: list, icelandic=True) -> list:
+        """
+        Returns a batch with one utterance per line, one token per space separated word.
+        :param icelandic: if False, all tokens are labelled as foreign and skip language detection
+        """
+        return [[Token(wrd, '', icelandic=icelandic) for wrd in line.split(' ')] for line in lines]
+
+    def process(self, batch: list, names=None) -> list:
+        """ Runs all stages, or the stages in 'names', over 'batch' and returns it """
+        for stage in self.stages:
+            if names is not None and stage.name not in names:
+                continue
+            start = time.perf_counter()
+            stage.process(batch)
+            self.timings[stage.name] += time.perf_counter() - start
+        return batch
+
+    def run(self, lines: list, icelandic=True) -> list:
+        """ Transcribes 'lines', returns a list of tokens for each line """
+        return self.process(self.tokenize(lines, icelandic))
+
+    def format(self, tokens: list, cmu=False) -> str:
+        start = time.perf_counter()
+        formatted = self.formatter.format(tokens, cmu)
+        self.timings[self.formatter.name] += time.perf_counter() - start
+        return formatted
+
+    def transcribe(self, lines: list, icelandic=True, cmu=False) -> list:
+        """ Transcribes 'lines' in one batch, returns the output string of each line """
+        return [self.format(tokens, cmu) for tokens in self.run(lines, icelandic)]
@@ -0,0 +1,190 @@
+"""
+A coprocess mode for services calling ice-g2p as a subprocess: one resident Transcriber reads newline-delimited
+JSON requests from stdin and writes one JSON response per request to stdout, in the order of the requests.
+
+Request:  {"id": 1, "text": "hestur í haga", "dialect": "north", "syll": ".", "stress": true, "sep": "",
+           "alphabet": "IPA"}
+Response: {"id": 1, "transcription": "..."} or {"id": 1, "error": "..."}
+
+Only "text" is required, the options default to the command line settings, "dialect" has to be one of the
+dialects given on the command line. All requests waiting in the pipe are handled as one batch: the vocabulary
+of the batch is transcribed with shared, batched model calls (see Transcriber.transcribe_vocabulary_dialects()),
+then each request is rendered with its own options. With a result cache (see Transcriber.enable_result_cache()),
+repeated requests are answered from the cache.
+
+Example:
+    $ ice-g2p --serve-stdio -d -a standard,north
+"""
+
+import sys
+import copy
+import json
+import queue
+import logging
+import threading
+import contextlib
+
+from ice_g2p.converter import get_converter
+from ice_g2p.transcriber import Transcriber
+
+MAX_BATCH = 256
+# the type of each request option
+OPTION_TYPES = {'dialect': str, 'syll': str, 'sep': str, 'stress': bool, 'alphabet': str}
+
+
+def read_requests(instream, requests: queue.Queue) -> None:
+    """ Puts each line of 'instream' into 'requests', None at the end of the stream """
+    for line in instream:
+        requests.put(line)
+    requests.put(None)
+
+
+def next_batch(requests: queue.Queue, max_batch: int = MAX_BATCH) -> tuple:
+    """
+    Waits for the next request and takes all further requests already waiting, up to 'max_batch'.
+    :return: the list of request lines and True if the end of the input has been reached
+    """
+    line = requests.get()
+    if line is None:
+        return [], True
+    batch = [line]
+    while len(batch) < max_batch:
+        try:
+            line = requests.get_nowait()
+        except queue.Empty:
+            break
+        if line is None:
+            return batch, True
+        batch.append(line)
+    return batch, False
+
+
+def parse_request(line: str, defaults: dict, dialects: list, strip_text=True) -> dict:
+    """
+    Parses a request line and completes its options from 'defaults'.
+    :param strip_text: strip whitespace from the beginning and the end of the text
+    :raises ValueError: if the request is not valid
+    """
+    request = json.loads(line)
+    if not isinstance(request, dict) or not isinstance(request.get('text'), str):
+        raise ValueError('a request has to be a JSON object with a "text" string')
+    options = dict(defaults)
+    options.update({key: request[key] for key in defaults if request.get(key) is not None})
+    for key, value in options.items():
+        if value is not None and not isinstance(value, OPTION_TYPES[key]):
+            raise ValueError(f'"{key}" has to be of type {OPTION_TYPES[key].__name__}, found {json.dumps(value)}')
+    if options['dialect'] not in dialects:
+        raise ValueError(f'dialect "{options["dialect"]}" is not loaded, available: {dialects}')
+    if options['alphabet']:
+        get_converter().validate('SAMPA', options['alphabet'])
+    options['id'] = request.get('id')
+    options['text'] = request['text'].strip() if strip_text else request['text']
+    return options
+
+
+def request_id(line: str):
+    """ The id of a request line, None if it can not be parsed """
+    try:
+        request = json.loads(line)
+    except ValueError:
+        return None
+    return request.get('id') if isinstance(request, dict) else None
+
+
+class Server:
+
+    def __init__(self, g2p: Transcriber, defaults: dict, strip_text=True):
+        """
+        :param g2p: the resident transcriber
+        :param defaults: the default options of a request: dialect, syll, stress, sep and alphabet
+        :param strip_text: strip whitespace from the beginning and the end of the request texts
+        """
+        self.g2p = g2p
+        self.defaults = defaults
+        self.strip_text = strip_text
+        # (syll, sep, stress) -> a shallow copy of 'g2p' with these output options, sharing its models
+        self.formatters = {}
+
+    def formatter(self, syll: str, sep: str, stress: bool) -> Transcriber:
+        key = (syll, sep, stress)
+        if key not in self.formatters:
+            formatter = copy.copy(self.g2p)
+            formatter.syllab_symbol = syll
+            formatter.word_separator = sep
+            formatter.add_stress_label = stress
+            self.formatters[key] = formatter
+        return self.formatters[key]
+
+    def handle_batch(self, lines: list) -> list:
+        """
+        Transcribes a batch of request lines, returns the responses in the same order. If the batch fails, the
+        requests are transcribed one by one, so a request that fails unexpectedly only gets an error response.
+        """
+        try:
+            return self.transcribe_batch(lines)
+        except Exception as e:
+            if len(lines) > 1:
+                return [self.handle_batch([line])[0] for line in lines]
+            logging.exception(f'Request failed: {lines[0].strip()}')
+            return [{'id': request_id(lines[0]), 'error': f'internal error: {e}'}]
+
+    def transcribe_batch(self, lines: list) -> list:
+        """ Transcribes a batch of request lines, see handle_batch() """
+        responses = [None] * len(lines)
+        requests = []
+        for ind, line in enumerate(lines):
+            try:
+                requests.append((ind, parse_request(line, self.defaults, self.g2p.dialects, self.strip_text)))
+            except ValueError as e:
+                # json.JSONDecodeError is a ValueError as well
+                responses[ind] = {'id': request_id(line), 'error': str(e)}
+        # the requests answered from the result cache of the transcriber, if enabled, are not transcribed again
+        uncached = []
+        for ind, request in requests:
+            formatter = self.formatter(request['syll'] or '', request['sep'] or '', bool(request['stress']))
+            request['key'] = formatter.result_key(request['text'], dialect=request['dialect'],
+                                                  alphabet=request['alphabet'])
+            transcribed = formatter.cached_result(request['key'])
+            if transcribed is None:
+                uncached.append((ind, request))
+            else:
+                responses[ind] = {'id': request['id'], 'transcription': transcribed}
+        if uncached:
+            words = {wrd.strip() for ind, request in uncached for wrd in request['text'].split(' ')}
+            needed = {request['dialect'] for ind, request in uncached}
+            tables = self.g2p.transcribe_vocabulary_dialects(
+                words, dialects=[dialect for dialect in self.g2p.dialects if dialect in needed])
+            for ind, request in uncached:
+                formatter = self.formatter(request['syll'] or '', request['sep'] or '', bool(request['stress']))
+                transcribed = formatter.render(request['text'], tables[request['dialect']])
+                if request['alphabet']:
+                    transcribed = get_converter().convert(transcribed, 'SAMPA', request['alphabet'],
+                                                          passthrough=(request['syll'] or '', request['sep'] or ''))
+                formatter.cache_result(request['key'], transcribed)
+                responses[ind] = {'id': request['id'], 'transcription': transcribed}
+        return responses
+
+    def serve(self, instream=None, outstream=None, max_batch: int = MAX_BATCH) -> int:
+        """
+        Answers the requests from 'instream' (default: stdin) on 'outstream' (default: stdout) until the end
+        of the input. Other output, e.g. warnings of the models, is redirected to stderr.
+        :return: the number of requests answered
+        """
+        instream = instream or sys.stdin
+        outstream = outstream or sys.stdout
+        requests = queue.Queue()
+        reader = threading.Thread(target=read_requests, args=(instream, requests), daemon=True)
+        reader.start()
+        answered = 0
+        with contextlib.redirect_stdout(sys.stderr):
+            done = False
+            while not done:
+                lines, done = next_batch(requests, max_batch)
+                lines = [line for line in lines if line.strip()]
+                if not lines:
+                    continue
+                for response in self.handle_batch(lines):
+                    outstream.write(json.dumps(response, ensure_ascii=False) + '\n')
+                outstream.flush()
+                answered += len(lines)
+        return answered
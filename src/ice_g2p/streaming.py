@@ -0,0 +1,175 @@
+"""
+Pipelined file mode: reading, preprocessing, model inference and writing of a file run in separate threads,
+connected by bounded queues of chunks of lines:
+
+    reader -> preprocess (normalize, language, lexicon, compound) -> model -> writer (syllabify, stress, format)
+
+While the model transcribes one chunk, the next chunks are read and looked up in the dictionaries, and the previous
+chunk is formatted and written. The model stage sends the unknown words of a whole chunk to the model in batched
+calls. When a stage falls behind, the queues in front of it fill up and the stages before it wait, so at most
+QUEUE_SIZE chunks are held between two stages regardless of the size of the input.
+
+The stages are those of Transcriber.pipeline (see pipeline.py), so the output is the same as of line by line
+transcription: repeated lines are written once, at their first position.
+"""
+
+import queue
+import hashlib
+import threading
+
+from ice_g2p import corpus_io
+from ice_g2p.converter import get_converter
+
+# number of lines transcribed as one batch
+CHUNK_LINES = 256
+# maximum number of chunks waiting between two stages
+QUEUE_SIZE = 4
+# seconds between checks whether another stage has failed, while waiting on a queue
+POLL_INTERVAL = 0.1
+
+
+class Stopped(Exception):
+    """ Raised in a stage thread when another stage has failed """
+
+
+class Channel:
+    """ A bounded queue between two stages, the end of the input is marked by None """
+
+    def __init__(self, stop: threading.Event, size: int = QUEUE_SIZE):
+        self.queue = queue.Queue(maxsize=size)
+        self.stop = stop
+
+    def put(self, item) -> None:
+        while True:
+            if self.stop.is_set():
+                raise Stopped()
+            try:
+                self.queue.put(item, timeout=POLL_INTERVAL)
+                return
+            except queue.Full:
+                pass
+
+    def __iter__(self):
+        while True:
+            if self.stop.is_set():
+                raise Stopped()
+            try:
+                item = self.queue.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            if item is None:
+                return
+            yield item
+
+
+def chunked(lines, size: int):
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def split_stages(pipeline) -> tuple:
+    """ The names of the stages before the model stage, the model stage and the stages after it """
+    names = [stage.name for stage in pipeline.stages]
+    index = names.index(pipeline.stage('model').name)
+    return tuple(names[:index]), (names[index],), tuple(names[index + 1:])
+
+
+def unique_lines(records):
+    """ Skips records of lines already seen, like the line -> transcription map of line by line file mode """
+    seen = set()
+    for record in records:
+        digest = hashlib.blake2b(record[0].encode('utf-8'), digest_size=16).digest()
+        if digest not in seen:
+            seen.add(digest)
+            yield record
+
+
+class FileTranscriber:
+
+    def __init__(self, g2p, alphabet=None, out_format='tsv', keep_original=False, chunk_lines: int = CHUNK_LINES,
+                 queue_size: int = QUEUE_SIZE):
+        """
+        :param g2p: a Transcriber of one dialect, its pipeline is run in the stage threads
+        :param alphabet: the output alphabet, if not SAMPA
+        :param out_format: 'tsv' or 'jsonl', see corpus_io.py
+        """
+        self.g2p = g2p
+        self.alphabet = alphabet
+        self.out_format = out_format
+        self.keep_original = keep_original
+        self.chunk_lines = chunk_lines
+        self.queue_size = queue_size
+
+    def records(self, batch: list, pipeline, lines: list) -> list:
+        """ The output records (line, transcription, tokens) of a transcribed chunk, see corpus_io.write_records() """
+        transcripts = [pipeline.format(tokens) for tokens in batch]
+        words = None
+        if self.out_format == 'jsonl':
+            words = [[(token.word, token.transcript) for token in tokens] for tokens in batch]
+        if self.alphabet:
+            converter = get_converter()
+            transcripts = converter.convert_many(transcripts, 'SAMPA', self.alphabet,
+                                                 passthrough=(self.g2p.syllab_symbol or '',
+                                                              self.g2p.word_separator or ''))
+            if words is not None:
+                words = [[(wrd, converter.convert(transcr, 'SAMPA', self.alphabet, passthrough=('', '')))
+                          for wrd, transcr in tokens] for tokens in words]
+        return list(zip(lines, transcripts, words if words is not None else [None] * len(lines)))
+
+    def transcribe_file(self, filename, out_path) -> int:
+        """
+        Transcribes 'filename' to 'out_path' in the stage threads.
+        :return: the number of lines written
+        """
+        pipeline = self.g2p.pipeline
+        preprocess, model, postprocess = split_stages(pipeline)
+        stop = threading.Event()
+        read, preprocessed, transcribed = (Channel(stop, self.queue_size) for i in range(3))
+        errors = []
+        written = []
+
+        def reader():
+            for lines in chunked(corpus_io.iter_lines(filename), self.chunk_lines):
+                read.put((lines, pipeline.tokenize(lines)))
+            read.put(None)
+
+        def process(source: Channel, target: Channel, names: tuple):
+            for lines, batch in source:
+                pipeline.process(batch, names)
+                target.put((lines, batch))
+            target.put(None)
+
+        def records():
+            for lines, batch in transcribed:
+                pipeline.process(batch, postprocess)
+                yield from self.records(batch, pipeline, lines)
+
+        def writer():
+            written.append(corpus_io.write_records(out_path, unique_lines(records()), self.out_format,
+                                                   self.keep_original))
+
+        def run(target, *args):
+            try:
+                target(*args)
+            except Stopped:
+                pass
+            except BaseException as e:
+                errors.append(e)
+                stop.set()
+
+        threads = [threading.Thread(target=run, args=args, daemon=True)
+                   for args in [(reader,), (process, read, preprocessed, preprocess),
+                                (process, preprocessed, transcribed, model), (writer,)]]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+        return written[0]
@@ -24,21 +24,31 @@ Example:
 
 __license__ = 'Apache 2.0 (see: LICENSE)'
 
+import copy
+from functools import lru_cache
+
 from ice_g2p.syllabification import syllabify_tree_dict
 from ice_g2p.tree_builder import build_compound_tree
 
 from ice_g2p.entry import PronDictEntry
+from ice_g2p.phone_inventory import get_inventory
+
+# max number of syllabified (word, transcript) pairs kept in memory by syllabify_and_label_cached()
+SYLLAB_CACHE_SIZE = 100000
 
 
-def init_pron_dict(dict_file):
+def read_dict_tuples(dict_file):
     with open(dict_file) as f:
         dict_list = f.read().splitlines()
 
-    tuples = [tuple(line.split('\t')) for line in dict_list]
-    return init_pron_dict_from_tuples(tuples)
+    return [tuple(line.split('\t')) for line in dict_list]
+
+
+def init_pron_dict(dict_file, syllab_symbol: str = '.'):
+    return init_pron_dict_from_tuples(read_dict_tuples(dict_file), syllab_symbol)
 
 
-def init_pron_dict_from_tuples(tuples: list, syllab_symbol: str):
+def init_pron_dict_from_tuples(tuples: list, syllab_symbol: str = '.'):
     pron_dict = {}
     for word, transcr in tuples:
         entry = PronDictEntry(word, transcr, syllab_symbol=syllab_symbol)
@@ -61,6 +71,62 @@ def syllabify_and_label(pron_dict):
     return syllabified
 
 
+@lru_cache(maxsize=SYLLAB_CACHE_SIZE)
+def _syllabify_word(word, phones: tuple):
+    """
+    Builds the compound tree for 'word' with the transcription 'phones' (a tuple of phone symbols) and syllabifies
+    it. The returned entry is shared by all callers and must not be modified, use syllabify_and_label_cached()
+    to get copies.
+    """
+    tree = build_compound_tree(PronDictEntry(word, phones=get_inventory().encode_phones(phones)))
+    return syllabify_tree_dict({word: tree})[word]
+
+
+def copy_syllabified(entry, syllab_symbol: str):
+    """
+    Returns a copy of the syllabified 'entry' that can safely be stress labeled, i.e. with copies of
+    all its syllables.
+    """
+    entry_copy = copy.copy(entry)
+    entry_copy.syllables = [copy.copy(syll) for syll in entry.syllables]
+    entry_copy.syllab_symbol = syllab_symbol
+    return entry_copy
+
+
+def syllabify_and_label_cached(pron_dict):
+    """
+    Same as syllabify_and_label(), but the syllabification of each (word, transcript) pair is only
+    computed once and then served from a cache of size SYLLAB_CACHE_SIZE.
+    The returned entries are copies, safe to be modified by stress.set_stress().
+    """
+    syllabified = {}
+    for word, entry in pron_dict.items():
+        syllabified[word] = copy_syllabified(_syllabify_word(word, tuple(entry.transcript.split())),
+                                             entry.syllab_symbol)
+    return syllabified
+
+
+def syllabify_word_cached(word: str, transcript: str, syllab_symbol: str = '.'):
+    """
+    Returns a syllabified copy of the entry (word, transcript) from the cache of syllabify_and_label_cached(),
+    without creating an entry to look it up
+    """
+    return syllabify_phones_cached(word, tuple(transcript.split()), syllab_symbol)
+
+
+def syllabify_phones_cached(word: str, phones: tuple, syllab_symbol: str = '.'):
+    """ Same as syllabify_word_cached() for a transcription given as a tuple of phone symbols """
+    return copy_syllabified(_syllabify_word(word, phones), syllab_symbol)
+
+
+def syllab_cache_info():
+    return _syllabify_word.cache_info()
+
+
+def clear_syllab_cache():
+    _syllabify_word.cache_clear()
+
+
 def syllabify_and_label_dict(dictfile):
     pron_dict = init_pron_dict(dictfile)
     return syllabify_and_label(pron_dict)
@@ -33,15 +33,11 @@ Thus it is important to perform compound analysis before applying the core sylla
 """
 
 from ice_g2p import syllable
-from ice_g2p import dictionaries
+from ice_g2p.phone_inventory import get_inventory
 
-# each syllable has a vowel as a nucleus. 'e' and 'o' aren't actually in the inventory, regardless of if we
-# are using SAMPA or IPA, but we need to be able to identify 'ei' and 'ou' from the first character only, so those
-# characters should be contained in the vowels list.
-VOWELS = dictionaries.get_vowels()
-
-# certain consonant clusters should not be split up between syllables
-CONS_CLUSTERS = dictionaries.get_cons_clusters()
+# Each syllable has a vowel as a nucleus, and certain consonant clusters should not be split up between syllables.
+# The syllabification works on arrays of phone ids, vowels and clusters (data/vowels_*.txt,
+# data/cons_clusters_*.txt) are looked up in the phone inventory of the alphabet of the entry.
 
 # Since we don't know which phonetic alphabet we are using, we check for either IPA or SAMPA representation of 'E'.
 # If you are using a different alphabet, you need to add the definition of 'e' like in 'elda' of the respective
@@ -51,32 +47,35 @@ VOWEL_E_IPA = 'ɛ'
 CONS_J = 'j'
 
 
-def syllabify_on_nucleus(transcription_arr):
+def syllabify_on_nucleus(phones, inventory=None):
     """
     First round of syllabification. Divide the word such that each syllable
     starts with a vowel (except the first one, if the word starts with a consonant/consonants).
+    The syllables are ranges in phones, an array of phone ids.
     """
+    if inventory is None:
+        inventory = get_inventory()
+    is_vowel = inventory.is_vowel
     syllables = []
-    current_syllable = syllable.Syllable()
-    for phone in transcription_arr:
-        if current_syllable.has_nucleus and phone in VOWELS:
+    current_syllable = syllable.Syllable(phones, inventory)
+    for ind, phone in enumerate(phones):
+        if current_syllable.has_nucleus and is_vowel[phone]:
             syllables.append(current_syllable)
-            current_syllable = syllable.Syllable()
+            current_syllable = syllable.Syllable(phones, inventory, ind)
 
-        if phone in VOWELS:
+        if is_vowel[phone]:
             current_syllable.has_nucleus = True
 
-        current_syllable.append(phone)
+        current_syllable.append()
     # append last syllable
     syllables.append(current_syllable)
     return syllables
 
 
 def identify_clusters(entry):
+    inventory = entry.inventory
     for syll in entry.syllables:
-        for clust in CONS_CLUSTERS:
-            if syll.content.strip().endswith(clust):
-                syll.cons_cluster = clust
+        syll.cons_cluster = inventory.ends_with_cluster(syll.phone_ids())
 
 
 def syllabify_final(entry):
@@ -89,34 +88,28 @@ def syllabify_final(entry):
     the boundary can not be changed.
     """
 
+    inventory = entry.inventory
     for ind, syll in enumerate(entry.syllables):
         if ind == 0:
             continue
         prev_syll = entry.syllables[ind - 1]
         # syllable after the first syllable starts with a vowel - look for consonant onset in previous syllable
         # and move the consonant / consonant cluster from the previous to the current syllable
-        if ind > 0 and syll.content[0] in VOWELS:
+        if inventory.vowel_initial[syll.phones[syll.start]]:
             if prev_syll.cons_cluster:
-                # copy cons_cluster to next syllable
-                syll.prepend(prev_syll.cons_cluster)
-                prev_syll.remove_cluster()
-                entry.update_syllables(ind, prev_syll, syll)
-            elif prev_syll.last_phones() not in VOWELS:
+                # move cons_cluster to next syllable
+                syll.move_onset(prev_syll, len(prev_syll.cons_cluster))
+            elif not inventory.is_vowel[prev_syll.phones[prev_syll.end - 1]]:
                 # handle 'jE' (=é) as one vowel
                 if prev_syll.endswith(CONS_J) and (syll.startswith(VOWEL_E_SAMPA) or syll.startswith(VOWEL_E_IPA)):
-                    phone = prev_syll.last_phones(1)
-                    syll.prepend(phone)
-                    prev_syll.content = prev_syll.content[:-(len(phone)+1)]
+                    syll.move_onset(prev_syll)
                 else:
-                    phone = prev_syll.last_phones()
-                    syll.prepend(phone)
-                    prev_syll.content = prev_syll.content[:-(len(phone)+1)]
-                entry.update_syllables(ind, prev_syll, syll)
+                    syll.move_onset(prev_syll)
 
 
 def syllabify_entry(entry):
 
-    entry.syllables = syllabify_on_nucleus(entry.transcription_arr)
+    entry.syllables = syllabify_on_nucleus(entry.phones, entry.inventory)
     identify_clusters(entry)
     syllabify_final(entry)
 
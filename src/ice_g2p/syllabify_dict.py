@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Syllabifies and stress labels a whole pronunciation dictionary ('word\ttranscription' per line) using a pool
+of worker processes.
+
+Stress labeling (stress.set_stress) is not independent for each entry: a word that starts with a previous word
+inherits the stress pattern of that word, such that the dictionary has to be processed in its original order.
+We therefore only split the dictionary at positions where no previous word is a prefix of the current word.
+At such a position set_stress starts over with an empty modifier chain, so each shard can be processed on its
+own and the concatenated output is identical to processing the whole dictionary in one run.
+
+Example:
+    $ syllabify-dict ice_pron_dict_standard_clear.csv -o ice_pron_dict_standard_cmu.txt --format cmu
+
+"""
+
+import sys
+import argparse
+from multiprocessing import Pool
+
+from ice_g2p.syllab_stress_processing import read_dict_tuples, init_pron_dict_from_tuples, syllabify_and_label
+from ice_g2p.stress import set_stress
+
+FORMATS = ['cmu', 'dot', 'stress']
+DEFAULT_SHARD_SIZE = 2000
+
+
+def safe_boundaries(words: list) -> list:
+    """
+    Returns the indices in 'words' where a shard may start, i.e. where none of the preceding words
+    is a prefix of the word at that index. Index 0 is always a safe boundary.
+
+    We keep a stack of the current prefix chain: each word on the stack is a prefix of the word above it.
+    Words that are not a prefix of the current word can not influence the stress of any following word either,
+    since set_stress drops them from its modifier list as well.
+    """
+    boundaries = []
+    chain = []
+    for ind, word in enumerate(words):
+        while chain and not word.startswith(chain[-1]):
+            chain.pop()
+        if not chain:
+            boundaries.append(ind)
+        chain.append(word)
+    return boundaries
+
+
+def create_shards(entries: list, shard_size: int = DEFAULT_SHARD_SIZE) -> list:
+    """
+    Divides 'entries' (a list of (word, transcription) tuples) into shards of at least 'shard_size' entries
+    (except for the last one), each shard starting at a safe boundary.
+    """
+    boundaries = safe_boundaries([word for word, transcr in entries])
+    shards = []
+    start = 0
+    for ind in boundaries[1:]:
+        if ind - start >= shard_size:
+            shards.append(entries[start:ind])
+            start = ind
+    if start < len(entries):
+        shards.append(entries[start:])
+    return shards
+
+
+def format_entry(entry, out_format: str) -> str:
+    if out_format == 'cmu':
+        return entry.cmu_format()
+    elif out_format == 'stress':
+        return entry.word + '\t' + entry.stress_format()
+    return entry.word + '\t' + entry.dot_format_syllables()
+
+
+def process_shard(shard: list, out_format: str = 'cmu', syllab_symbol: str = '.') -> list:
+    """
+    Syllabifies and stress labels the entries in 'shard' and returns the formatted output lines.
+    """
+    pron_dict = init_pron_dict_from_tuples(shard, syllab_symbol)
+    syllabified = syllabify_and_label(pron_dict)
+    return [format_entry(entr, out_format) for entr in set_stress(list(syllabified.values()))]
+
+
+def _process_shard_args(args):
+    return process_shard(*args)
+
+
+def syllabify_dict(entries: list, out, out_format: str = 'cmu', syllab_symbol: str = '.', processes: int = None,
+                   shard_size: int = DEFAULT_SHARD_SIZE) -> None:
+    """
+    Syllabifies and stress labels 'entries' in parallel and writes the results to the open file 'out',
+    in the original order of 'entries'. Shards are written as soon as they and all shards before them are done.
+
+    :param entries: a list of (word, transcription) tuples
+    :param out: a writable text file
+    :param out_format: one of FORMATS
+    :param syllab_symbol: syllable separator for the 'dot' and 'stress' formats
+    :param processes: number of worker processes, defaults to the number of CPUs
+    :param shard_size: minimum number of entries per shard
+    """
+    # duplicates are resolved like in the serial version: the last transcription of a word wins
+    entries = list(dict(entries).items())
+    shards = create_shards(entries, shard_size)
+    with Pool(processes) as pool:
+        for lines in pool.imap(_process_shard_args, [(shard, out_format, syllab_symbol) for shard in shards]):
+            if lines:
+                out.write('\n'.join(lines) + '\n')
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser(description='Syllabify and stress label a pronunciation dictionary in parallel.')
+    parser.add_argument('dictfile', help='pronunciation dictionary, "word\\ttranscription" per line')
+    parser.add_argument('--outfile', '-o', help='output file, default: stdout')
+    parser.add_argument('--format', '-f', default='cmu', choices=FORMATS, help='output format')
+    parser.add_argument('--syll', '-y', default='.', help='syllable separator for dot and stress format')
+    parser.add_argument('--processes', '-j', type=int, help='number of worker processes, default: number of CPUs')
+    parser.add_argument('--shardsize', type=int, default=DEFAULT_SHARD_SIZE, help='minimum number of entries per shard')
+    return parser.parse_args()
+
+
+def main():
+    args = get_arguments()
+    entries = read_dict_tuples(args.dictfile)
+    if args.outfile:
+        with open(args.outfile, 'w') as out:
+            syllabify_dict(entries, out, args.format, args.syll, args.processes, args.shardsize)
+    else:
+        syllabify_dict(entries, sys.stdout, args.format, args.syll, args.processes, args.shardsize)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,15 +4,23 @@
 
 class Syllable:
     """
-    Syllabification processes phonetic transcripts of words, where each phone is separated by a space. This space
-    separated transcription represents the content field of a Syllable object.
+    Syllabification processes phonetic transcripts of words as arrays of phone ids (see phone_inventory).
+    A syllable does not store its own copy of the phones, it is a range [start, end) in the phone array of the word
+    it belongs to. Moving phones between two neighbouring syllables is thus only a matter of moving the boundary.
     Note that some phones might be written as two characters.
+
+    The content field gives the transcription of the syllable, space separated with a trailing space, as
+    used in the output formats.
     """
+    __slots__ = ('phones', 'inventory', 'start', 'end', 'has_nucleus', 'cons_cluster', 'stress')
 
-    def __init__(self):
-        self.content = '' #the transcription of the syllable, space between each phone
+    def __init__(self, phones, inventory, start=0, end=None):
+        self.phones = phones
+        self.inventory = inventory
+        self.start = start
+        self.end = start if end is None else end
         self.has_nucleus = False
-        self.cons_cluster = None
+        self.cons_cluster = None  # tuple of phone ids
         self.stress = 0
 
     def __str__(self):
@@ -21,11 +29,26 @@ class Syllable:
     def __repr__(self):
         return self.content
 
-    def append(self, phone_str):
-        self.content += phone_str + ' '
+    def phone_count(self):
+        return self.end - self.start
+
+    @property
+    def content(self):
+        if self.end <= self.start:
+            return ''
+        return self.inventory.to_string(self.phone_ids()) + ' '
+
+    def phone_ids(self):
+        return self.phones[self.start:self.end]
 
-    def prepend(self, phone_str):
-        self.content = phone_str + ' ' + self.content
+    def phone_list(self):
+        return self.inventory.decode(self.phone_ids())
+
+    def append(self):
+        """
+        Extend the syllable by the next phone in the phone array
+        """
+        self.end += 1
 
     def last_phones(self, number=1):
         """
@@ -33,36 +56,25 @@ class Syllable:
         :param number: number of last phones to return
         :return:
         """
-        phone_arr = self.content.split()
-        if number <= len(phone_arr):
-            result_phones = phone_arr[-number:]
-            return ' '.join(result_phones)
+        if number <= self.phone_count():
+            return self.inventory.to_string(self.phones[self.end - number:self.end])
         raise IndexError('Number of phones to large: ' + str(number)
                          + ' is larger than length of content (' + self.content + ')')
 
-    def last_index(self):
-        """
-        :return: index of last character (not space) in content
-        """
-        cont_len = len(self.content.strip())
-        ind = cont_len - 1 if cont_len > 0 else 0
-        return ind
-
     def startswith(self, phone):
-        if self.content[0] == phone:
+        if self.inventory.symbols[self.phones[self.start]][0] == phone:
             return True
         return False
 
     def endswith(self, phone):
-        if self.content[self.last_index()] == phone:
+        if self.inventory.symbols[self.phones[self.end - 1]][-1] == phone:
             return True
         return False
 
-    def index_of_cluster(self):
-        if self.cons_cluster:
-            return self.content.rfind(self.cons_cluster)
-        else:
-            return -1
-
-    def remove_cluster(self):
-        self.content = self.content[:self.index_of_cluster()]
+    def move_onset(self, prev_syll, number=1):
+        """
+        Move the last 'number' phones of the preceding syllable to the beginning of this syllable.
+        Both syllables have to be neighbours in the same phone array.
+        """
+        prev_syll.end -= number
+        self.start -= number
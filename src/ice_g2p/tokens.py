@@ -0,0 +1,70 @@
+"""
+Token level transcription results, see Transcriber.transcribe_tokens() and pipeline.py.
+"""
+
+# the sources of a transcription, see FairseqG2P.transcribe_word()
+SOURCES = ('custom', 'dict', 'morph', 'model', 'invalid')
+
+
+class Token:
+    """
+    The transcription of one token (a space separated word of the input) with its source, language decision,
+    and, if syllabified, its syllables and their stress labels.
+
+    The transcription is kept as the string returned by the lookup or the model, and split into the tuple 'phones'
+    once when it is set. The syllable spans are only computed when accessed.
+    """
+    __slots__ = ('word', 'normalized', '_transcript', 'phones', 'source', 'icelandic', 'parts', 'entry')
+
+    def __init__(self, word: str, transcript: str, source: str = '', icelandic: bool = True):
+        """
+        :param word: the token as in the input
+        :param transcript: its transcription, space separated phones, empty if not transcribed
+        :param source: where the transcription comes from, one of SOURCES, empty for an empty token
+        :param icelandic: False if the token was transcribed with the foreign model
+        """
+        self.word = word
+        # the word as looked up and transcribed, set by the normalize stage of the pipeline
+        self.normalized = word
+        self.transcript = transcript
+        self.source = source
+        self.icelandic = icelandic
+        # the compound parts of a word to be transcribed by the model, set by the compound stage
+        self.parts = None
+        # the syllabified and stress labeled entry, set by the syllabify and stress stages
+        self.entry = None
+
+    def __repr__(self):
+        return f'Token({self.word!r}, {self.transcript!r}, {self.source!r}, {self.icelandic})'
+
+    @property
+    def transcript(self) -> str:
+        return self._transcript
+
+    @transcript.setter
+    def transcript(self, transcript: str):
+        self._transcript = transcript
+        self.phones = tuple(transcript.split())
+
+    @property
+    def syllables(self) -> list:
+        """ The syllables as (start, end) ranges of 'phones', an empty list if not syllabified """
+        if self.entry is None:
+            return []
+        spans = []
+        start = 0
+        for syll in self.entry.syllables:
+            spans.append((start, start + syll.phone_count()))
+            start += syll.phone_count()
+        return spans
+
+    @property
+    def stress(self) -> tuple:
+        """ The stress label of each syllable (see stress.py), an empty tuple if not syllabified """
+        if self.entry is None:
+            return ()
+        return tuple(syll.stress for syll in self.entry.syllables)
+
+    def to_dict(self) -> dict:
+        return {'word': self.word, 'phones': list(self.phones), 'source': self.source, 'icelandic': self.icelandic,
+                'syllables': self.syllables, 'stress': list(self.stress)}
@@ -1,10 +1,17 @@
-import math
-from nltk import trigrams
+import time
+import logging
+from collections import Counter
 from enum import Enum
-import ice_g2p.syllab_stress_processing as syllabify
 from ice_g2p.g2p_lstm import FairseqG2P
-from ice_g2p.trigrams import ice_grams, eng_grams
-from ice_g2p.stress import set_stress
+from ice_g2p import tree_builder
+from ice_g2p.tokens import Token
+from ice_g2p.pipeline import Pipeline, is_icelandic
+from ice_g2p.warm import read_warm_cache
+from ice_g2p.cache import LRUCache
+
+SNAPSHOT_VERSION = 1
+# default number of utterances in the result cache, see Transcriber.enable_result_cache()
+RESULT_CACHE_SIZE = 10000
 
 
 class G2P_METHOD(Enum):
@@ -15,40 +22,173 @@ class G2P_METHOD(Enum):
 class Transcriber:
 
     def __init__(self, g2p_method=G2P_METHOD.FAIRSEQ, dialect='standard', lang_detect=False, use_dict=False,
-                 stress_label=False, syllab_symbol='', word_sep=''):
-
-        self.g2p = self.init_g2p(g2p_method, dialect)
+                 stress_label=False, syllab_symbol='', word_sep='', dialects=None, morph_fallback=False, decoding=None,
+                 model=None, warm_cache=None, custom_dict_file=None, watch_custom_dict=False, result_cache_size=0,
+                 result_cache_ttl=None):
+        """
+        :param dialects: a list of dialects to transcribe in one pass, see transcribe_dialects(). If set, 'dialect'
+        is ignored and the first dialect of the list is used by transcribe() and transcribe_vocabulary().
+        :param morph_fallback: transcribe inflected forms of dictionary words from the dictionary instead of
+        calling the model (only with use_dict=True), see morphology.py
+        :param decoding: decoding profile and settings of the models, e.g. {'profile': 'fast'},
+        see g2p_lstm.decoding_settings()
+        :param model: a model used for all dialects and languages instead of the fairseq models, e.g.
+        differential.StubModel for deterministic tests
+        :param warm_cache: a list of cache files written by 'ice-g2p warm', see load_warm_cache()
+        :param custom_dict_file: a custom dictionary file for the first dialect, see load_custom_dict()
+        :param watch_custom_dict: reload the custom dictionary file when it changes
+        :param result_cache_size: cache the results of up to this many utterances, see enable_result_cache()
+        :param result_cache_ttl: seconds a cached result is valid, default: until the dictionaries change
+        """
+        self.dialects = list(dialects) if dialects else [dialect]
+        self.g2p_dialects = {d: self.init_g2p(g2p_method, d, decoding=decoding, model=model) for d in self.dialects}
+        if morph_fallback:
+            for g2p in self.g2p_dialects.values():
+                g2p.enable_morph_fallback()
+        self.g2p = self.g2p_dialects[self.dialects[0]]
         self.use_dict = use_dict
         self.syllab_symbol = syllab_symbol
         self.word_separator = word_sep
         self.add_stress_label = stress_label
         if lang_detect:
-            self.g2p_foreign = self.init_g2p(g2p_method, dialect=dialect, use_english=True)
+            self.g2p_foreign = self.init_g2p(g2p_method, dialect=dialect, use_english=True, decoding=decoding,
+                                            model=model)
             self.lang_detect = True
         else:
             self.g2p_foreign = None
             self.lang_detect = False
+        for path in warm_cache or []:
+            self.load_warm_cache(path)
+        if custom_dict_file:
+            self.load_custom_dict(custom_dict_file, watch=watch_custom_dict)
+        self._pipeline = None
+        self._pipeline_options = None
+        self.result_cache = None
+        if result_cache_size:
+            self.enable_result_cache(result_cache_size, result_cache_ttl)
         if use_dict:
-            from ice_g2p.dictionaries import get_dictionary
-            self.dictionary = get_dictionary()
+            # the standard dictionary is parsed once, for compound analysis and here
+            self.dictionary = tree_builder.get_compound_maps()[2]
         else:
             self.dictionary = None
 
-    def init_g2p(self, g2p_method: G2P_METHOD, dialect: str='standard', use_english=False) -> FairseqG2P:
+    def save_snapshot(self, path, include_cache=False):
+        """
+        Saves the fully initialized transcriber to 'path': the models, the dictionaries and the compound maps,
+        such that load_snapshot() restores it without parsing dictionaries or loading checkpoints.
+        :param include_cache: include the words and compound parts transcribed by the models so far (the automatic
+        g2p dictionaries and the part caches). The result cache is always saved empty.
+        """
+        import torch
+        g2ps = [g2p for g2p in list(self.g2p_dialects.values()) + [self.g2p_foreign] if g2p is not None]
+        caches = [(g2p.automatic_g2p_dict, g2p.part_cache) for g2p in g2ps]
+        result_cache = self.result_cache
+        try:
+            if result_cache is not None:
+                # the expiry times of the entries are only valid in this process
+                self.result_cache = LRUCache(result_cache.max_size, result_cache.ttl)
+            for g2p in g2ps:
+                # computed now, so the checkpoint is not needed to compute it after loading
+                g2p.model_hash
+                if not include_cache:
+                    g2p.automatic_g2p_dict = {}
+                    g2p.part_cache = LRUCache(g2p.part_cache.max_size)
+            torch.save({'version': SNAPSHOT_VERSION, 'transcriber': self,
+                        'compound_maps': tree_builder.get_compound_maps()}, path)
+        finally:
+            self.result_cache = result_cache
+            for g2p, (cache, part_cache) in zip(g2ps, caches):
+                g2p.automatic_g2p_dict = cache
+                g2p.part_cache = part_cache
+
+    @classmethod
+    def load_snapshot(cls, path) -> 'Transcriber':
+        """
+        Loads a transcriber saved by save_snapshot(). The model weights are memory-mapped if supported
+        by the installed torch version.
+        """
+        import torch
+        try:
+            snapshot = torch.load(path, mmap=True, weights_only=False)
+        except TypeError:
+            # torch < 2.1
+            snapshot = torch.load(path)
+        if snapshot.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(f'Unsupported snapshot version in {path}: {snapshot.get("version")}')
+        tree_builder.set_compound_maps(*snapshot['compound_maps'])
+        return snapshot['transcriber']
+
+    def init_g2p(self, g2p_method: G2P_METHOD, dialect: str='standard', use_english=False, decoding=None,
+                 model=None) -> FairseqG2P:
         if g2p_method == G2P_METHOD.FAIRSEQ:
-                return FairseqG2P(dialect=dialect, use_english=use_english)
+                return FairseqG2P(dialect=dialect, use_english=use_english, decoding=decoding, g2p_model=model)
         else:
             raise ValueError('Model ' + str(g2p_method) + ' does not exist!')
 
-    def override_core_dict(self, pron_dict: dict):
+    def load_warm_cache(self, path) -> int:
+        """
+        Loads a cache file written by 'ice-g2p warm' (see warm.py) into the models it was built with, such that
+        the words in it are not sent to the model any more (with use_dict=True).
+        :return: the number of words loaded
+        """
+        header, transcribed = read_warm_cache(path)
+        g2ps = [g2p for g2p in list(self.g2p_dialects.values()) + [self.g2p_foreign] if g2p is not None]
+        if not [g2p for g2p in g2ps if g2p.add_warm_cache(header, transcribed)]:
+            logging.warning(f'Skipping warm cache {path}: built with model {header.get("model")}, not loaded here')
+            return 0
+        return len(transcribed)
+
+    def part_cache_stats(self) -> dict:
+        """ The statistics of the cache of model output for compound parts of each dialect, see cache.LRUCache """
+        return {dialect: g2p.part_cache.stats() for dialect, g2p in self.g2p_dialects.items()}
+
+    def enable_result_cache(self, max_size=RESULT_CACHE_SIZE, ttl=None):
+        """
+        Caches the results of transcribe() and of the serve modes (see serve.py) for up to 'max_size' utterances,
+        for 'ttl' seconds if set. A result is cached for the input text with all output options, see result_key().
+        The cache is cleared when a dictionary or the decoding settings of a model change.
+        """
+        self.result_cache = LRUCache(max_size, ttl)
+
+    def result_state(self) -> tuple:
+        """ The versions of the dictionaries and the settings of all models, the cached results are valid for """
+        g2ps = [g2p for g2p in list(self.g2p_dialects.values()) + [self.g2p_foreign] if g2p is not None]
+        return tuple((g2p.lexicon.version, dict(g2p.decoding), g2p.morph is not None) for g2p in g2ps)
+
+    def result_key(self, input_str: str, icelandic=True, cmu=False, dialect=None, alphabet=None) -> tuple:
+        """
+        The key of the result for 'input_str' in the result cache: the text as the pipeline sees it (whitespace
+        changes the output) with the dialect, the lookup and language options and all output options
+        """
+        return (input_str, dialect or self.dialects[0], self.use_dict, self.lang_detect, self.syllab_symbol,
+                self.word_separator, self.add_stress_label, cmu, alphabet, icelandic)
+
+    def cached_result(self, key: tuple):
+        """ The cached result for 'key' (see result_key()), None if it is not cached or there is no result cache """
+        if self.result_cache is None:
+            return None
+        self.result_cache.validate(self.result_state())
+        return self.result_cache.get(key)
+
+    def cache_result(self, key: tuple, transcribed: str) -> None:
+        """ Caches 'transcribed' for 'key', unless the dictionaries have changed since the lookup of 'key' """
+        if self.result_cache is not None and self.result_cache.version == self.result_state():
+            self.result_cache.put(key, transcribed)
+
+    def result_cache_stats(self):
+        """ The statistics of the result cache (see cache.LRUCache), None if there is no result cache """
+        return self.result_cache.stats() if self.result_cache is not None else None
+
+    def override_core_dict(self, pron_dict: dict, dialect=None):
         """
         Override the default pronunciation dictionary
         :param pron_dict:
+        :param dialect: the dialect to override the dictionary for, default: the first dialect
         :return:
         """
-        self.g2p.override_pron_dict(pron_dict)
+        self.g2p_dialects.get(dialect, self.g2p).override_pron_dict(pron_dict)
 
-    def set_custom_dict(self, custom_dict: dict):
+    def set_custom_dict(self, custom_dict: dict, dialect=None):
         """
         A custom dictionary will be used additionally to the built in dictionary.
         The custom dictionary, if present, is checked first and thus has priority over the built-in dictionary
@@ -58,60 +198,207 @@ class Transcriber:
 
         :param custom_dict: a dictionary with custom vocabulary and/or transcriptions. Has priority over the
         built-in dicionary
+        :param dialect: the dialect to use the custom dictionary for, default: the first dialect
         """
-        self.g2p.set_custom_dict(custom_dict)
+        self.g2p_dialects.get(dialect, self.g2p).set_custom_dict(custom_dict)
 
-    def transcribe(self, input_str: str, icelandic=True, cmu=False) -> str:
-        transcr_arr = []
-        for wrd in input_str.split(' '):
-            if icelandic:
-                # a word labelled as Icelandic will be sent to automatic lang detection
-                transcr_arr.append(self.transcribe_lang(wrd.strip(), icelandic=self.is_icelandic(wrd.strip())))
-            else:
-                # word labelled as not Icelandic, will be sent directly to foreign transcription model
-                transcr_arr.append(
-                    self.transcribe_lang(wrd.strip(), icelandic=False))
-        if self.syllab_symbol:
-            entries = syllabify.init_pron_dict_from_tuples(list(zip(input_str.split(' '), transcr_arr)), self.syllab_symbol)
-            syllabified_dict = syllabify.syllabify_and_label(entries)
-            transcribed_utt = set_stress([syllabified_dict[wrd] for wrd in input_str.split(' ')])
-            transcribed = self.extract_transcript(transcribed_utt, cmu)
-        elif self.word_separator:
-            transcribed = f' {self.word_separator} '.join(transcr_arr)
-        else:
-            transcribed = ' '.join(transcr_arr)
+    def load_custom_dict(self, path, dialect=None, watch=False) -> int:
+        """
+        Loads a custom dictionary from the file 'path', one 'word<TAB>transcription' line per entry. Large files are
+        compiled on the first load for faster loading, see lexicon.py.
+        :param dialect: the dialect to load the dictionary for, default: the first dialect
+        :param watch: check the file for changes in a background thread and swap in a changed version, while
+        transcription goes on with the previous version
+        :return: the number of entries loaded
+        """
+        return self.g2p_dialects.get(dialect, self.g2p).load_custom_dict(path, watch)
+
+    def set_decoding(self, profile='default', **settings):
+        """ Set the decoding profile and settings of all models, see g2p_lstm.decoding_settings() """
+        for g2p in list(self.g2p_dialects.values()) + [self.g2p_foreign]:
+            if g2p is not None:
+                g2p.set_decoding(profile, **settings)
+
+    def transcribe_nbest(self, wrd: str, nbest=5, icelandic=True) -> list:
+        """
+        Returns the 'nbest' best transcriptions of the word 'wrd' in the first dialect with their scores,
+        see FairseqG2P.transcribe_nbest()
+        """
+        wrd = wrd.strip()
+        g2p = self.g2p_foreign if self.use_foreign(wrd, icelandic) else self.g2p
+        return g2p.transcribe_nbest(wrd, nbest, self.use_dict)
+
+    def saved_model_calls(self) -> Counter:
+        """
+        Returns the number of words and compound parts the morphological fallback has transcribed
+        instead of the model, summed over all dialects
+        """
+        saved = Counter()
+        for g2p in self.g2p_dialects.values():
+            if g2p.morph:
+                saved.update(g2p.morph.saved_calls)
+        return saved
 
+    def transcribe(self, input_str: str, icelandic=True, cmu=False, deadline_ms=None) -> str:
+        if deadline_ms is not None:
+            return self.transcribe_with_deadline(input_str, deadline_ms, icelandic, cmu)[0]
+        if self.result_cache is None:
+            return self.format_tokens(self.transcribe_tokens(input_str, icelandic), cmu)
+        key = self.result_key(input_str, icelandic, cmu)
+        transcribed = self.cached_result(key)
+        if transcribed is None:
+            transcribed = self.format_tokens(self.transcribe_tokens(input_str, icelandic), cmu)
+            self.cache_result(key, transcribed)
         return transcribed
 
-    def extract_transcript(self, syllabified: list, cmu=False) -> str:
-        if cmu:
-            return self.extract_cmu_transcript(syllabified)
-        result = ''
-        for entr in syllabified:
-            if self.add_stress_label:
-                string_repr = entr.simple_stress_format()
-            else:
-                string_repr = entr.dot_format_syllables()
-            if not result:
-                result += string_repr
-            elif self.word_separator:
-                result += f" {self.word_separator} " + string_repr
-            else:
-                result += " " + string_repr
+    def transcribe_tokens(self, input_str: str, icelandic=True) -> list:
+        """
+        Transcribes 'input_str' like transcribe(), but returns a Token for each space separated word, with its
+        transcription, the source of the transcription and the language decision. If a syllable symbol is set,
+        the tokens are syllabified and stress labeled, see Token.syllables and Token.stress.
+        Use format_tokens() to get the output string of transcribe().
+        """
+        return self.pipeline.run([input_str], icelandic)[0]
 
-        return result
+    @property
+    def pipeline(self) -> Pipeline:
+        """
+        The pipeline of this transcriber (see pipeline.py) for the first dialect, created again when the
+        models, the lookup and language options or the output options have changed
+        """
+        # all arguments of Pipeline.create()
+        options = (self.g2p, self.g2p_foreign, self.use_dict, self.lang_detect, self.syllab_symbol,
+                   self.word_separator, self.add_stress_label)
+        if self._pipeline is None or self._pipeline_options != options:
+            self._pipeline = Pipeline.create(*options)
+            self._pipeline_options = options
+        return self._pipeline
 
-    def extract_cmu_transcript(self, syllabified: list) -> str:
-        result = ''
-        for entr in syllabified:
-            if not result:
-                result += entr.cmu_format()
-            elif self.word_separator:
-                result += f" {self.word_separator} " + entr.cmu_format()
+    def syllabify_tokens(self, tokens: list) -> list:
+        """ Syllabifies and stress labels 'tokens' in place, with the syllable symbol of this transcriber """
+        return self.pipeline.process([tokens], names=('syllabify', 'stress'))[0]
+
+    def format_tokens(self, tokens: list, cmu=False) -> str:
+        """ Joins the transcriptions of 'tokens' to the output string, syllabified and stress labeled if set """
+        if self.syllab_symbol and any(token.entry is None for token in tokens):
+            self.syllabify_tokens(tokens)
+        return self.pipeline.format(tokens, cmu)
+
+    def transcribe_with_deadline(self, input_str: str, deadline_ms: float, icelandic=True, cmu=False) -> tuple:
+        """
+        Transcribes 'input_str' like transcribe(), but within a time budget of 'deadline_ms' milliseconds.
+        Words are transcribed in order, when the remaining time does not allow for a model call any more,
+        the remaining unknown words are transcribed with cheaper strategies, see FairseqG2P.transcribe_within().
+        :return: a tuple (transcription, degraded), where 'degraded' maps each degraded word to its strategy
+        """
+        tokens, degraded = self.transcribe_tokens_with_deadline(input_str, deadline_ms, icelandic)
+        return self.format_tokens(tokens, cmu), degraded
+
+    def transcribe_tokens_with_deadline(self, input_str: str, deadline_ms: float, icelandic=True) -> tuple:
+        """
+        Same as transcribe_with_deadline(), but returns a Token for each space separated word (see
+        transcribe_tokens()), without its source.
+        :return: a tuple (tokens, degraded)
+        """
+        deadline = time.perf_counter() + deadline_ms / 1000
+        tokens = []
+        degraded = {}
+        for word in input_str.split(' '):
+            wrd = word.strip()
+            foreign = self.use_foreign(wrd, icelandic)
+            g2p = self.g2p_foreign if foreign else self.g2p
+            transcr, strategy = g2p.transcribe_within(wrd, self.use_dict, (deadline - time.perf_counter()) * 1000)
+            tokens.append(Token(word, transcr, icelandic=not foreign))
+            if strategy:
+                degraded[wrd] = strategy
+        return tokens, degraded
+
+    def transcribe_vocabulary(self, words, icelandic=True) -> dict:
+        """
+        Transcribes each word in 'words' once, with the same language detection and lookup as transcribe(),
+        but sending all words that need automatic g2p to the models in batches.
+        :param words: an iterable of words, e.g. the keys of a frequency list
+        :param icelandic: if False, all words are transcribed with the foreign model
+        :return: a dictionary mapping each word to its transcription, to be used with render()
+        """
+        return self.transcribe_vocabulary_dialects(words, icelandic, dialects=self.dialects[:1])[self.dialects[0]]
+
+    def transcribe_vocabulary_dialects(self, words, icelandic=True, dialects=None) -> dict:
+        """
+        Same as transcribe_vocabulary() for each of 'dialects' (default: all dialects of this transcriber).
+        Language detection, the foreign model and the compound analysis do not depend on the dialect and are
+        only run once, each dialect model gets all compound parts it needs to transcribe in one batched call.
+        :return: a dictionary mapping each dialect to its word transcriptions
+        """
+        icelandic_words = []
+        foreign_words = []
+        for wrd in words:
+            wrd = wrd.strip()
+            if self.use_foreign(wrd, icelandic):
+                foreign_words.append(wrd)
             else:
-                result += " " + entr.cmu_format()
+                icelandic_words.append(wrd)
+        foreign_table = {}
+        if foreign_words:
+            foreign_table = self.g2p_foreign.transcribe_words(foreign_words, self.use_dict)
+        comp_parts = {}
+        tables = {}
+        for dialect in dialects or self.dialects:
+            table = self.g2p_dialects[dialect].transcribe_words(icelandic_words, self.use_dict, comp_parts)
+            table.update(foreign_table)
+            tables[dialect] = table
+        return tables
+
+    def transcribe_dialects(self, input_str: str, icelandic=True, cmu=False) -> dict:
+        """
+        Transcribes 'input_str' in all dialects of this transcriber, with the same output options as transcribe().
+        :return: a dictionary mapping each dialect to the transcription of 'input_str'
+        """
+        tables = self.transcribe_vocabulary_dialects(input_str.split(' '), icelandic)
+        return self.render_dialects(input_str, tables, cmu)
+
+    def render_dialects(self, input_str: str, tables: dict, cmu=False) -> dict:
+        """ Same as render() for each dialect table in 'tables' (see transcribe_vocabulary_dialects()) """
+        return {dialect: self.render(input_str, table, cmu) for dialect, table in tables.items()}
 
-        return result
+    def use_foreign(self, wrd: str, icelandic=True) -> bool:
+        """ True if 'wrd' is transcribed with the foreign model """
+        if self.g2p_foreign is None:
+            return False
+        return not icelandic or not self.is_icelandic(wrd)
+
+    def word_source(self, wrd: str, icelandic=True) -> str:
+        """
+        Describes where the transcription of 'wrd' comes from with the current dictionaries and models,
+        without transcribing it, see FairseqG2P.transcription_source(). The sources of several dialects
+        are separated by '|'.
+        """
+        wrd = wrd.strip()
+        if self.use_foreign(wrd, icelandic):
+            return 'foreign/' + self.g2p_foreign.transcription_source(wrd, self.use_dict)
+        return '|'.join(g2p.transcription_source(wrd, self.use_dict) for g2p in self.g2p_dialects.values())
+
+    def render(self, input_str: str, table: dict, cmu=False) -> str:
+        """
+        Formats the transcription of 'input_str' from the word transcriptions in 'table' (see
+        transcribe_vocabulary()), with the same output options as transcribe().
+        """
+        transcr_arr = [table.get(wrd.strip(), '') for wrd in input_str.split(' ')]
+        return self.format_transcripts(input_str, transcr_arr, cmu)
+
+    def format_transcripts(self, input_str: str, transcr_arr: list, cmu=False) -> str:
+        """
+        Joins the transcriptions of the words in 'input_str' (space separated) to the output string,
+        syllabified and stress labeled if set.
+        """
+        return self.format_tokens([Token(wrd, transcr) for wrd, transcr in zip(input_str.split(' '), transcr_arr)],
+                                  cmu)
+
+    def extract_transcript(self, syllabified: list, cmu=False) -> str:
+        return self.pipeline.formatter.extract_transcript(syllabified, cmu)
+
+    def extract_cmu_transcript(self, syllabified: list) -> str:
+        return self.pipeline.formatter.extract_cmu_transcript(syllabified)
 
     def transcribe_lang(self, input_str: str, icelandic=True) -> str:
         if icelandic or self.g2p_foreign is None:
@@ -124,28 +411,4 @@ class Transcriber:
         # if we don't have a foreign g2p, all words are processed as Icelandic
         if not self.lang_detect or not self.g2p_foreign:
             return True
-
-        # If word contains non-valid characters for either of the models, it can't be transcribed by
-        # the corresponding model. We use the Icelandic one as fallback, so just check for non-valid
-        # English characters. Important check because of loanwords that might contain Icelandic characters
-        # like: 'absúrd', 'dnépr', 'penélope' that have higher combined trigram probs for English despite
-        # the non-valid trigrams containing Icelandic characters.
-        if set(word).difference(self.g2p_foreign.alphabet):
-            return True
-        # Special case for spelling
-        if len(word) == 1:
-            return True
-        ice_probs = []
-        eng_probs = []
-        for c1, c2, c3 in trigrams(word.lower(), pad_right=True, pad_left=True):
-            if (c1, c2) in ice_grams and c3 in ice_grams[(c1, c2)]:
-                ice_probs.append(ice_grams[(c1, c2)][c3])
-            else:
-                ice_probs.append(0.001)
-            if (c1, c2) in eng_grams and c3 in eng_grams[(c1, c2)]:
-                eng_probs.append(eng_grams[(c1, c2)][c3])
-            else:
-                eng_probs.append(0.001)
-        if math.prod(ice_probs) >= math.prod(eng_probs):
-            return True
-        return False
+        return is_icelandic(word, self.g2p_foreign.alphabet)
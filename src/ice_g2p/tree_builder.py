@@ -1,18 +1,41 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+from array import array
+
 from ice_g2p import dictionaries
 from ice_g2p import entry
+from ice_g2p.phone_inventory import get_inventory, rfind
 
 
 VOWELS = ['a', 'á', 'e', 'é', 'i', 'í', 'o', 'ó', 'u', 'ú', 'y', 'ý', 'ö']
-MODIFIER_MAP = dictionaries.get_modifier_map()
-HEAD_MAP = dictionaries.get_head_map()
-TRANSCR_MAP = dictionaries.get_dictionary()
+# modifiers and heads of the compound database and the pronunciation dictionary, loaded on first use
+# or restored from a snapshot, see get_compound_maps() and set_compound_maps()
+MODIFIER_MAP = None
+HEAD_MAP = None
+TRANSCR_MAP = None
+HEAD_PHONES = {}    # (alphabet, head) -> transcript from TRANSCR_MAP encoded as phone ids, filled on demand
 MIN_COMP_LEN = 4
 MIN_INDEX = 2       # the position from which to start searching for a head word
 
 
+def get_compound_maps() -> tuple:
+    """
+    Returns the modifier map, the head map and the pronunciation dictionary used for compound analysis
+    """
+    if TRANSCR_MAP is None:
+        set_compound_maps(dictionaries.get_modifier_map(), dictionaries.get_head_map(), dictionaries.get_dictionary())
+    return MODIFIER_MAP, HEAD_MAP, TRANSCR_MAP
+
+
+def set_compound_maps(modifier_map: dict, head_map: dict, transcr_map: dict):
+    global MODIFIER_MAP, HEAD_MAP, TRANSCR_MAP
+    MODIFIER_MAP = modifier_map
+    HEAD_MAP = head_map
+    TRANSCR_MAP = transcr_map
+    HEAD_PHONES.clear()
+
+
 class CompoundTree:
     def __init__(self, pron_dict_entry):
         self.elem = pron_dict_entry
@@ -36,31 +59,37 @@ def contains_vowel(word):
     return False
 
 
-def compare_transcripts(comp_transcript, head_transcript):
+def compare_transcripts(comp_phones, head_phones, inventory=None):
     """
     If a transcript differs only in a length mark or in voiced/voiceless or having post aspriation or not,
-    it should be recognized as the same transcript (since we have already matched the corresponding word strings)
+    it should be recognized as the same transcript (since we have already matched the corresponding word strings).
+    An 'h' missing in one of the transcripts is also accepted.
+    The transcripts are compared from the end, as arrays of phone ids.
+
+    :return: the index in comp_phones where head_phones starts, -1 if the transcripts do not match
     """
-    if not comp_transcript:
+    if not comp_phones:
         return -1
+    if inventory is None:
+        inventory = get_inventory()
+    base = inventory.base
+    aspiration = inventory.aspiration_id
 
-    head_ind = len(head_transcript) - 1
-    comp_ind = len(comp_transcript) - 1
+    head_ind = len(head_phones) - 1
+    comp_ind = len(comp_phones) - 1
 
     while head_ind >= 0:
-        head_char = head_transcript[head_ind]
-        comp_char = comp_transcript[comp_ind]
-        if head_char == comp_char:
+        if comp_ind < 0:
+            return -1
+        head_phone = head_phones[head_ind]
+        comp_phone = comp_phones[comp_ind]
+        if base[head_phone] == base[comp_phone]:
             head_ind -= 1
             comp_ind -= 1
-        elif head_char == ':':
+        elif head_phone == aspiration:
             head_ind -= 1
-        elif comp_char == ':':
+        elif comp_phone == aspiration:
             comp_ind -= 1
-        elif head_char == '0' or head_char == 'h':
-            head_ind -= 2
-        elif comp_char == '0' or comp_char == 'h':
-            comp_ind -= 2
         else:
             return -1
 
@@ -78,23 +107,26 @@ def extract_transcription(entry, comp_head):
 
     :param entry: PronDictEntry of the compound being analysed
     :param comp_head: the head of the compound as string
-    :return:
+    :return: the phone ids of the modifier and of the head, empty arrays if the head transcript was not found
     """
 
-    head_transcr = TRANSCR_MAP[comp_head] if comp_head in TRANSCR_MAP else 'NO_TRANSCRIPT'
-    head_syllable_index = entry.transcript.rfind(head_transcr)
+    transcr_map = get_compound_maps()[2]
+    if comp_head not in transcr_map:
+        return array('H'), array('H')
+    # the phone ids depend on the inventory of the entry's alphabet
+    key = (entry.alphabet, comp_head)
+    if key not in HEAD_PHONES:
+        HEAD_PHONES[key] = entry.inventory.encode(transcr_map[comp_head])
+    head_phones = HEAD_PHONES[key]
+    head_syllable_index = rfind(entry.phones, head_phones)
 
     if head_syllable_index <= 0:
-       head_syllable_index = compare_transcripts(entry.transcript, head_transcr)
+        head_syllable_index = compare_transcripts(entry.phones, head_phones, entry.inventory)
     if head_syllable_index <= 0:
-        #print("did not find transcription of " + comp_head + "!")
-        #print("transcription in db: " + head_transcr + ", compound transcr: " + entry.transcript)
-        return '', ''
+        return array('H'), array('H')
 
     else:
-        modifier_transcr = entry.transcript[0:head_syllable_index]
-        head_transcr = entry.transcript[head_syllable_index:]
-        return modifier_transcr, head_transcr
+        return entry.phones[0:head_syllable_index], entry.phones[head_syllable_index:]
 
 
 def lookup_compound_components(word):
@@ -110,13 +142,14 @@ def lookup_compound_components(word):
     if len(word) <= MIN_COMP_LEN:
         return '', ''
 
+    modifier_map, head_map, transcr_map = get_compound_maps()
     n = MIN_INDEX
     longest_valid_head = ''
     mod = ''
     while n < len(word) - 2:
         head = word[n:]
-        if head in HEAD_MAP:
-            if word[:n] in MODIFIER_MAP:
+        if head in head_map:
+            if word[:n] in modifier_map:
                 return word[:n], head
             elif longest_valid_head == '':
                 longest_valid_head = head
@@ -142,12 +175,12 @@ def extract_compound_components(comp_tree):
     """
     mod, head = lookup_compound_components(comp_tree.elem.word)
     if len(mod) > 0 and len(head) > 0:
-        mod_transcr, head_transcr = extract_transcription(comp_tree.elem, head)
-        if len(mod_transcr) > 0 and len(head_transcr) > 0:
-            left_elem = entry.PronDictEntry(mod, mod_transcr)
+        mod_phones, head_phones = extract_transcription(comp_tree.elem, head)
+        if len(mod_phones) > 0 and len(head_phones) > 0:
+            left_elem = entry.PronDictEntry(mod, phones=mod_phones)
             left_tree = CompoundTree(left_elem)
             comp_tree.left = left_tree
-            right_elem = entry.PronDictEntry(head, head_transcr)
+            right_elem = entry.PronDictEntry(head, phones=head_phones)
             right_tree = CompoundTree(right_elem)
             comp_tree.right = right_tree
             extract_compound_components(left_tree)
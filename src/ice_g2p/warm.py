@@ -0,0 +1,127 @@
+"""
+Offline warm-up of the model cache from a word frequency list: the most frequent words not found in the
+dictionaries are transcribed ahead of time and written to a cache file, which FairseqG2P loads on startup (see
+FairseqG2P.load_warm_cache()), so the first requests for these words do not wait for the model.
+
+    $ ice-g2p warm wordlist.txt --top 100000 -a standard -o warm_standard.tsv.gz
+    $ ice-g2p -if corpus.txt -d --warm-cache warm_standard.tsv.gz
+
+The word list has one word per line, most frequent first, optionally followed by a tab and further columns (e.g.
+the frequency). The words are transcribed like unknown words at runtime, with the compound analysis and the
+dictionary lookup of the compound parts, in batched model calls.
+
+The cache file (optionally compressed, see corpus_io.py) starts with a JSON header holding the model signature
+(checkpoint and decoding settings, see FairseqG2P.model_signature()), followed by one 'word<TAB>transcription' line
+per word. A cache built with another model or other decoding settings is not loaded.
+"""
+
+import sys
+import json
+import time
+import logging
+import argparse
+
+from ice_g2p import corpus_io
+from ice_g2p.g2p_lstm import FairseqG2P, DECODING_PROFILES
+
+CACHE_VERSION = 1
+# number of words passed to the model per model_transcribe_batch() call, for progress logging
+CHUNK_WORDS = 10000
+
+
+def ranked_words(lines):
+    """ The words of a frequency list (first tab separated column), in order, without duplicates """
+    seen = set()
+    for line in lines:
+        wrd = line.split('\t')[0].strip()
+        if wrd and wrd not in seen:
+            seen.add(wrd)
+            yield wrd
+
+
+def unknown_words(g2p: FairseqG2P, words, top: int) -> list:
+    """
+    The first 'top' words of 'words' that would be sent to the model at runtime with the dictionary: words found in
+    the dictionaries or by the morphological fallback (if enabled) and words with non valid characters are skipped.
+    """
+    unknown = []
+    for wrd in words:
+        if len(unknown) >= top:
+            break
+        if g2p.dict_lookup(wrd, True) or set(wrd).difference(g2p.alphabet) or g2p.morph_lookup(wrd, True):
+            continue
+        unknown.append(wrd)
+    return unknown
+
+
+def build_warm_cache(g2p: FairseqG2P, words, top: int, chunk_words: int = CHUNK_WORDS) -> dict:
+    """
+    Transcribes the 'top' most frequent unknown words of the ranked 'words' with the model of 'g2p'.
+    :return: a dictionary word -> transcription
+    """
+    unknown = unknown_words(g2p, words, top)
+    logging.info(f'transcribing {len(unknown)} unknown words')
+    transcribed = {}
+    comp_parts = {}
+    start_time = time.time()
+    for start in range(0, len(unknown), chunk_words):
+        transcribed.update(g2p.model_transcribe_batch(unknown[start:start + chunk_words], True, comp_parts))
+        logging.info(f'{len(transcribed)}/{len(unknown)} words transcribed in {time.time() - start_time:.1f}s')
+    return transcribed
+
+
+def write_warm_cache(path, g2p: FairseqG2P, transcribed: dict) -> None:
+    header = {'version': CACHE_VERSION, 'model': g2p.model_signature(), 'words': len(transcribed)}
+    with corpus_io.open_text(path, 'w') as f:
+        f.write(json.dumps(header) + '\n')
+        f.write(''.join(f'{wrd}\t{transcr}\n' for wrd, transcr in transcribed.items()))
+
+
+def read_warm_cache(path) -> tuple:
+    """
+    :return: the header of the cache file and a dictionary word -> transcription
+    :raises ValueError: if 'path' is not a cache file of this version
+    """
+    with corpus_io.open_text(path) as f:
+        header = json.loads(f.readline())
+        if not isinstance(header, dict) or header.get('version') != CACHE_VERSION:
+            raise ValueError(f'{path} is not a warm cache file of version {CACHE_VERSION}')
+        transcribed = {}
+        for line in f:
+            wrd, transcr = line.rstrip('\n').split('\t')
+            transcribed[wrd] = transcr
+    return header, transcribed
+
+
+def get_arguments(argv: list):
+    parser = argparse.ArgumentParser(prog='ice-g2p warm', description='Transcribe the most frequent unknown words of '
+                                     'a word list ahead of time, for FairseqG2P to load on startup (--warm-cache).')
+    parser.add_argument('wordlist', help='word list, one word per line, most frequent first')
+    parser.add_argument('--out', '-o', required=True, help='cache file to write, compressed if it ends with '
+                        '.gz, .bz2 or .xz')
+    parser.add_argument('--top', '-n', type=int, default=100000, help='number of unknown words to transcribe')
+    parser.add_argument('--dialect', '-a', default='standard', help='dialect of the model')
+    parser.add_argument('--morph', action='store_true', help='skip words transcribed by the morphological fallback')
+    parser.add_argument('--profile', default='default', choices=list(DECODING_PROFILES), help='decoding profile')
+    parser.add_argument('--beam', type=int, help='beam size, overrides the profile')
+    parser.add_argument('--lenpen', type=float, help='length penalty, overrides the profile')
+    parser.add_argument('--maxlen-a', type=float, help='maximum output length: maxlen-a * input length + maxlen-b')
+    parser.add_argument('--maxlen-b', type=int, help='maximum output length: maxlen-a * input length + maxlen-b')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = get_arguments(sys.argv[1:] if argv is None else list(argv))
+    logging.basicConfig(level=logging.INFO)
+    decoding = {'profile': args.profile, 'beam': args.beam, 'lenpen': args.lenpen, 'max_len_a': args.maxlen_a,
+                'max_len_b': args.maxlen_b}
+    g2p = FairseqG2P(dialect=args.dialect, decoding=decoding)
+    if args.morph:
+        g2p.enable_morph_fallback()
+    transcribed = build_warm_cache(g2p, ranked_words(corpus_io.iter_lines(args.wordlist)), args.top)
+    write_warm_cache(args.out, g2p, transcribed)
+    logging.info(f'{len(transcribed)} words written to {args.out}')
+
+
+if __name__ == '__main__':
+    main()
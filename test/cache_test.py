@@ -0,0 +1,118 @@
+import pickle
+import unittest
+from unittest import mock
+from ice_g2p import cache
+from ice_g2p import differential
+from ice_g2p import serve
+from ice_g2p.cache import LRUCache
+from ice_g2p.g2p_lstm import FairseqG2P
+
+
+class LengthMarkModel(differential.StubModel):
+    """ Marks each 'E' as long, to follow the length marks through the compound parts """
+
+    @staticmethod
+    def transcribe(sentence: str) -> str:
+        return differential.StubModel.transcribe(sentence).replace('E', 'E:')
+
+
+class CacheTestCase(unittest.TestCase):
+
+    def test_lru(self):
+        cache = LRUCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(1, cache.get('a'))
+        cache.put('c', 3)
+        # 'b' was the least recently used entry
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual({'size': 2, 'max_size': 2, 'ttl': None, 'hits': 1, 'misses': 1, 'evictions': 1,
+                          'expirations': 0, 'invalidations': 0, 'hit_rate': 0.5}, cache.stats())
+        copied = pickle.loads(pickle.dumps(cache))
+        self.assertEqual(3, copied.get('c'))
+        cache.clear()
+        self.assertEqual(0, len(cache))
+
+    def test_ttl(self):
+        lru = LRUCache(10, ttl=5)
+        with mock.patch.object(cache.time, 'monotonic', return_value=100.0):
+            lru.put('a', 1)
+        with mock.patch.object(cache.time, 'monotonic', return_value=104.0):
+            self.assertEqual(1, lru.get('a'))
+        with mock.patch.object(cache.time, 'monotonic', return_value=105.0):
+            self.assertNotIn('a', lru)
+            self.assertIsNone(lru.get('a'))
+        self.assertEqual((0, 1), (len(lru), lru.expirations))
+        self.assertFalse(lru.validate(1))
+        lru.put('b', 2)
+        self.assertTrue(lru.validate(1))
+        self.assertFalse(lru.validate(2))
+        self.assertEqual((0, 1), (len(lru), lru.invalidations))
+
+    def test_part_cache(self):
+        model = LengthMarkModel()
+        g2p = FairseqG2P(g2p_model=model)
+        translated = []
+        translate = model.translate
+
+        def counting_translate(sentences, **kwargs):
+            translated.extend(sentences if isinstance(sentences, list) else [sentences])
+            return translate(sentences, **kwargs)
+        model.translate = counting_translate
+        self.assertEqual('s E: p r a k E n n s l a', g2p.model_transcribe_batch(['zebrakennsla'], False)['zebrakennsla'])
+        self.assertEqual(['z e b r a', 'k e n n s l a'], translated)
+        # the parts of new compounds are served from the cache
+        self.assertEqual('v E: r s l Y n a r k E n n s l a', g2p.model_transcribe('verslunarkennsla', False))
+        self.assertEqual(['z e b r a', 'k e n n s l a', 'v e r s l u n a r'], translated)
+        # a part cached in a non-first position keeps its length marks in the first position
+        self.assertEqual('k E: n n s l a', g2p.model_transcribe('kennsla', False))
+        self.assertEqual(3, len(translated))
+        stats = g2p.part_cache.stats()
+        self.assertEqual((2, 3), (stats['hits'], stats['misses']))
+        g2p.set_decoding('fast')
+        self.assertEqual(0, len(g2p.part_cache))
+
+    def test_known_parts_within(self):
+        g2p = FairseqG2P(g2p_model=differential.StubModel())
+        # all compound parts are in the dictionary, the spent budget does not degrade the word
+        self.assertEqual(('h E s t a h a G a', ''), g2p.transcribe_within('hestahaga', True, -1))
+        self.assertEqual('h E s t a h a G a', g2p.automatic_g2p_dict['hestahaga'])
+
+    def test_result_cache(self):
+        g2p = differential.create_transcriber({'use_dict': True})
+        g2p.enable_result_cache(10)
+        expected = g2p.transcribe('zebrahestur í haga')
+        with mock.patch.object(g2p, 'transcribe_tokens') as transcribe_tokens:
+            self.assertEqual(expected, g2p.transcribe('zebrahestur í haga'))
+            transcribe_tokens.assert_not_called()
+        # each output option has its own entry
+        g2p.syllab_symbol = '.'
+        self.assertIn('.', g2p.transcribe('zebrahestur í haga'))
+        g2p.syllab_symbol = ''
+        self.assertEqual((1, 2), (g2p.result_cache_stats()['hits'], g2p.result_cache_stats()['misses']))
+        # a dictionary change clears the cache
+        g2p.set_custom_dict({'haga': 'h a G a'})
+        self.assertTrue(g2p.transcribe('zebrahestur í haga').endswith('h a G a'))
+        self.assertEqual(1, g2p.result_cache_stats()['invalidations'])
+        # so do the lookup options
+        with_dict = g2p.transcribe('hlaupa')
+        g2p.use_dict = False
+        self.assertNotEqual(with_dict, g2p.transcribe('hlaupa'))
+
+    def test_serve_result_cache(self):
+        g2p = differential.create_transcriber({'use_dict': True}, dialects=['standard', 'north'])
+        g2p.enable_result_cache(10)
+        server = serve.Server(g2p, {'dialect': 'standard', 'syll': '', 'sep': '', 'stress': False, 'alphabet': None})
+        lines = ['{"id": 1, "text": "hestur"}\n', '{"id": 2, "text": "hestur", "alphabet": "IPA"}\n',
+                 '{"id": 3, "text": "hestur", "dialect": "north"}\n']
+        first = server.handle_batch(lines)
+        with mock.patch.object(g2p, 'transcribe_vocabulary_dialects') as transcribe:
+            self.assertEqual(first, server.handle_batch(lines))
+            transcribe.assert_not_called()
+        self.assertEqual(3, len(g2p.result_cache))
+        self.assertEqual(first[0]['transcription'], g2p.transcribe('hestur'))
+        self.assertEqual(4, g2p.result_cache_stats()['hits'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+import unittest
+from ice_g2p.converter import Converter, get_converter, get_symbol_table
+
+
+class ConverterTestCase(unittest.TestCase):
+
+    def test_shared(self):
+        self.assertIs(get_converter(), get_converter())
+        self.assertIs(get_symbol_table('SAMPA', 'IPA'), get_symbol_table('SAMPA', 'IPA'))
+
+    def test_convert_many(self):
+        converter = Converter()
+        converted = converter.convert_many(['p_h au f Y k l_0', 'a: . t_h a'], 'SAMPA', 'IPA', passthrough=('.',))
+        self.assertEqual(['pʰ au f ʏ k l̥', 'aː . tʰ a'], converted)
+        self.assertEqual('', converter.report_unknown())
+
+    def test_unknown_symbols(self):
+        converter = Converter()
+        converted = list(converter.convert_stream(['a w a', 'w'], 'SAMPA', 'SINGLE'))
+        self.assertEqual(['a w a', 'w'], converted)
+        self.assertEqual(2, converter.unknown_symbols[('SAMPA', 'w')])
+        self.assertIn('"w" (SAMPA): 2', converter.report_unknown())
+        self.assertEqual('', converter.report_unknown())
+
+    def test_invalid_alphabet(self):
+        with self.assertRaises(ValueError):
+            Converter().convert('a', 'SAMPA', 'XSAMPA')
+
+
+if __name__ == '__main__':
+    unittest.main()
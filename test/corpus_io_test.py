@@ -0,0 +1,36 @@
+import os
+import json
+import tempfile
+import unittest
+from ice_g2p import corpus_io
+
+
+class CorpusIOTestCase(unittest.TestCase):
+
+    def test_output_path(self):
+        self.assertEqual('in/corpus_transcribed.tsv', corpus_io.output_path('in/corpus.txt', '_transcribed'))
+        self.assertEqual('in/corpus_transcribed.tsv.gz', corpus_io.output_path('in/corpus.txt.gz', '_transcribed'))
+        self.assertEqual('out/corpus_transcribed.jsonl.xz',
+                         corpus_io.output_path('in/corpus.txt.gz', '_transcribed', 'jsonl', 'out', 'xz'))
+        self.assertEqual('in/corpus_transcribed.tsv',
+                         corpus_io.output_path('in/corpus.txt.bz2', '_transcribed', compression=''))
+
+    def test_compressed_round_trip(self):
+        records = [('hestur í haga', 'h E s t Y r i: h a: G a', None), ('hestur', 'h E s t Y r', None)]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for compression in ('', 'gz', 'bz2', 'xz'):
+                path = os.path.join(tmp_dir, 'out', 'corpus.tsv' + ('.' + compression if compression else ''))
+                self.assertEqual(2, corpus_io.write_records(path, records, keep_original=True))
+                self.assertEqual(['hestur í haga\th E s t Y r i: h a: G a', 'hestur\th E s t Y r'],
+                                 corpus_io.read_lines(path))
+
+    def test_jsonl(self):
+        line = corpus_io.format_record('hestur í', 'h E s t Y r i:', 'jsonl',
+                                       tokens=[('hestur', 'h E s t Y r'), ('í', 'i:')])
+        self.assertEqual({'text': 'hestur í', 'transcription': 'h E s t Y r i:',
+                          'tokens': [{'word': 'hestur', 'transcription': 'h E s t Y r'},
+                                     {'word': 'í', 'transcription': 'i:'}]}, json.loads(line))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import json
+import stat
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from ice_g2p import daemon
+from ice_g2p import differential
+
+
+class DaemonTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'g2p.sock')
+        self.g2p = differential.create_transcriber({'use_dict': True}, dialects=['standard', 'north'])
+        self.settings = daemon.model_settings(['standard', 'north'], use_dict=True)
+        self.server = daemon.DaemonServer(self.path, self.g2p, self.settings)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp_dir.cleanup()
+
+    def test_transcribe_remote(self):
+        transcribed = daemon.transcribe_remote('hestur í haga', self.settings, path=self.path)
+        self.assertEqual('\t'.join(self.g2p.transcribe_dialects('hestur í haga').values()), transcribed)
+        syllabified = daemon.transcribe_remote('hestur', self.settings, syllab_symbol='.', stress_label=True,
+                                               path=self.path)
+        self.assertIn('.', syllabified)
+
+    def test_same_as_in_process(self):
+        formatter = differential.create_transcriber({'use_dict': True, 'syllab_symbol': '.', 'word_sep': '/'},
+                                                    dialects=['standard', 'north'])
+        for text in [' hestur í ', 'hestur  í haga']:
+            self.assertEqual('\t'.join(formatter.transcribe_dialects(text).values()),
+                             daemon.transcribe_remote(text, self.settings, syllab_symbol='.', word_sep='/',
+                                                      path=self.path))
+
+    def test_invalid_hello(self):
+        with daemon.connect(self.path) as sock, sock.makefile('rw', encoding='utf-8') as f:
+            f.write('[1]\n')
+            f.flush()
+            self.assertIn('error', json.loads(f.readline()))
+
+    def test_socket_owner(self):
+        self.assertEqual(0o600, stat.S_IMODE(os.stat(self.path).st_mode))
+        with mock.patch.object(daemon.os, 'getuid', return_value=os.getuid() + 1):
+            self.assertRaises(OSError, daemon.connect, self.path)
+            self.assertIsNone(daemon.transcribe_remote('hestur', self.settings, path=self.path))
+
+    def test_other_settings_fall_back(self):
+        settings = daemon.model_settings(['standard'], use_dict=False)
+        self.assertIsNone(daemon.transcribe_remote('hestur', settings, path=self.path))
+        self.assertIsNone(daemon.transcribe_remote('hestur', self.settings, path=self.path + '.missing'))
+
+    def test_status_and_stop(self):
+        self.assertEqual(self.settings, daemon.status(self.path)['settings'])
+        self.assertEqual({'stopped': True}, daemon.send_command(self.path, 'stop'))
+        self.thread.join(5)
+        self.assertFalse(self.thread.is_alive())
+
+
+class StartTestCase(unittest.TestCase):
+
+    def test_start_default_path(self):
+        with tempfile.TemporaryDirectory() as tmp_dir, \
+                mock.patch.dict(os.environ, {daemon.SOCKET_ENV: '', 'XDG_RUNTIME_DIR': ''}), \
+                mock.patch.object(daemon.tempfile, 'tempdir', tmp_dir), \
+                mock.patch.object(daemon.subprocess, 'Popen') as popen, \
+                mock.patch.object(daemon, 'status', side_effect=[None, {'pid': 1}]):
+            path = daemon.socket_path()
+            self.assertTrue(daemon.start(path, ['-d']))
+            # the socket directory is created before the log is opened in it
+            self.assertEqual(0o700, stat.S_IMODE(os.stat(os.path.dirname(path)).st_mode))
+            self.assertTrue(os.path.exists(path + '.log'))
+            self.assertEqual(['run', '-d'], popen.call_args[0][0][-2:])
+
+    def test_start_fails(self):
+        with tempfile.TemporaryDirectory() as tmp_dir, \
+                mock.patch.object(daemon.subprocess, 'Popen') as popen, \
+                mock.patch.object(daemon, 'status', return_value=None):
+            popen.return_value.poll.return_value = 1
+            self.assertFalse(daemon.start(os.path.join(tmp_dir, 'g2p.sock'), []))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+from ice_g2p import differential
+
+
+class DifferentialTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.lines = ['hestur í haga', 'hlaupa í burtu hlaupastrákur', 'zebrahestur']
+        self.options = {'use_dict': True, 'syllab_symbol': '.', 'stress_label': True}
+
+    def test_corpus_mode_equals_reference(self):
+        report = differential.compare(self.lines, self.options, 'corpus')
+        self.assertEqual({'lines': 3, 'divergent': 0, 'first': None}, report)
+
+    def test_dialects_equal_reference(self):
+        report = differential.compare(self.lines, self.options, 'dialects')
+        self.assertEqual(0, report['divergent'])
+
+    def test_first_divergence(self):
+        def run_broken(options, lines):
+            g2p, results = differential.run_corpus(options, lines)
+            # drop the length mark of 'haga'
+            transcripts, output = results[0]
+            transcripts[2] = transcripts[2].replace(':', '')
+            results[0] = (transcripts, g2p.format_transcripts(lines[0], transcripts))
+            return g2p, results
+
+        report = differential.compare(self.lines, self.options, run_candidate=run_broken)
+        self.assertEqual(1, report['divergent'])
+        first = report['first']
+        self.assertEqual((1, 2, 'haga', 'g2p'), (first['line_no'], first['word_index'], first['word'], first['stage']))
+        self.assertIn('line 1', differential.format_report(report))
+
+
+if __name__ == '__main__':
+    unittest.main()
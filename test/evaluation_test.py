@@ -0,0 +1,36 @@
+import unittest
+from ice_g2p import evaluation
+
+
+class EvaluationTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.pron_dict = {'hestur': 'h E s t Y r', 'dag': 't a: G', 'hlaupa': 'l_0 9i: p a', 'í': 'i:',
+                          'burtu': 'p Y r_0 t Y', 'takk': 't_h a h k'}
+
+    def test_edit_distance(self):
+        self.assertEqual(0, evaluation.edit_distance(['a', 'b'], ['a', 'b']))
+        self.assertEqual(2, evaluation.edit_distance('h E s t'.split(), 'h E s t a n'.split()))
+        self.assertEqual(1, evaluation.edit_distance('t a: G'.split(), 't a G'.split()))
+
+    def test_split_is_seeded(self):
+        held_out, rest = evaluation.split_dictionary(self.pron_dict, 3, seed=7)
+        self.assertEqual(3, len(held_out))
+        self.assertEqual(self.pron_dict, {**held_out, **rest})
+        self.assertFalse(set(held_out) & set(rest))
+        self.assertEqual(held_out, evaluation.split_dictionary(self.pron_dict, 3, seed=7)[0])
+
+    def test_report(self):
+        references = {'dag': 't a: G', 'hestur': 'h E s t Y r'}
+        hypotheses = {'dag': 't a G', 'hestur': 'h E s t Y r'}
+        report = evaluation.evaluate(lambda words: {wrd: hypotheses[wrd] for wrd in words}, references)
+        self.assertEqual(2, report['words'])
+        self.assertAlmostEqual(1 / 9, report['per'])
+        self.assertAlmostEqual(0.5, report['wer'])
+        self.assertGreater(report['words_per_sec'], 0)
+        # missing transcriptions are errors
+        self.assertEqual(1.0, evaluation.score({}, references)['wer'])
+
+
+if __name__ == '__main__':
+    unittest.main()
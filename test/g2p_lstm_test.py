@@ -1,6 +1,6 @@
 import unittest
 import os
-from src.ice_g2p.g2p_lstm import FairseqG2P
+from src.ice_g2p.g2p_lstm import FairseqG2P, decoding_settings
 from src.ice_g2p.transcriber import Transcriber
 
 class TestG2P_LSTM(unittest.TestCase):
@@ -83,6 +83,30 @@ class TestG2P_LSTM(unittest.TestCase):
             transcribed = g2p.transcribe(word)
             print(word + ': ' + transcribed)
 
+    def test_deadline(self):
+        test_string = 'hlaupa í burtu hlaupastrákur'
+        g2p = Transcriber(use_dict=True)
+        transcribed, degraded = g2p.transcribe_with_deadline(test_string, deadline_ms=60000)
+        self.assertEqual(g2p.transcribe(test_string), transcribed)
+        self.assertEqual({}, degraded)
+        # no time for model calls: 'hlaupastrákur' is concatenated from dictionary parts
+        g2p = Transcriber(use_dict=True)
+        transcribed, degraded = g2p.transcribe_with_deadline(test_string, deadline_ms=0)
+        self.assertEqual({'hlaupastrákur': 'parts'}, degraded)
+
+    def test_decoding_profile(self):
+        self.assertEqual({'beam': 1, 'lenpen': 1.2}, decoding_settings('fast', lenpen=1.2))
+        self.assertRaises(ValueError, decoding_settings, 'slow')
+        g2p = FairseqG2P(decoding={'profile': 'fast'})
+        self.assertEqual('l_0 9i: p a', g2p.transcribe('hlaupa'))
+
+    def test_nbest(self):
+        g2p = FairseqG2P()
+        nbest = g2p.transcribe_nbest('hlaupa', nbest=3)
+        self.assertEqual(3, len(nbest))
+        self.assertEqual(g2p.transcribe('hlaupa'), nbest[0][0])
+        self.assertEqual(sorted(nbest, key=lambda hypo: -hypo[1]), nbest)
+
     def get_custom_dict(self):
         custom = {'texti': 't_h E x s t I', 'engir': '9 N k v I r'}
         return custom
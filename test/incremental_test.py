@@ -0,0 +1,56 @@
+import tempfile
+import unittest
+from ice_g2p import incremental
+
+
+class IncrementalTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.sources = {'hestur': 'dict:1', 'í': 'dict:2', 'haga': 'model:a:3'}
+        self.calls = []
+        self.settings = {'dialect': 'standard', 'syllab_symbol': ''}
+
+    def transcribe_lines(self, lines):
+        self.calls.append(lines)
+        return [line.upper() for line in lines]
+
+    def word_source(self, wrd):
+        return self.sources[wrd]
+
+    def run_incremental(self, lines, prev_settings=None, previous=None, settings=None):
+        return incremental.transcribe_incremental(lines, self.transcribe_lines, self.word_source,
+                                                  settings or self.settings, prev_settings, previous)
+
+    def test_only_changed_lines(self):
+        lines = ['hestur í haga', 'hestur']
+        transcribed, records, stats = self.run_incremental(lines)
+        self.assertEqual({'hestur í haga': 'HESTUR Í HAGA', 'hestur': 'HESTUR'}, transcribed)
+        self.assertEqual({'reused': 0, 'transcribed': 2}, stats)
+
+        # the model has changed: only the line containing a model transcribed word is transcribed again
+        self.sources['haga'] = 'model:b:3'
+        transcribed, records, stats = self.run_incremental(lines, self.settings, records)
+        self.assertEqual({'reused': 1, 'transcribed': 1}, stats)
+        self.assertEqual(['hestur í haga'], self.calls[-1])
+
+        # changed settings: everything is transcribed again
+        transcribed, records, stats = self.run_incremental(lines, self.settings, records,
+                                                           settings={'dialect': 'north', 'syllab_symbol': ''})
+        self.assertEqual({'reused': 0, 'transcribed': 2}, stats)
+
+    def test_provenance_file(self):
+        lines = ['hestur í haga', 'hestur']
+        transcribed, records, stats = self.run_incremental(lines)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = incremental.provenance_path(tmp_dir + '/out.tsv')
+            incremental.write_provenance(path, self.settings, records)
+            prev_settings, previous = incremental.read_provenance(path)
+        self.assertEqual(self.settings, prev_settings)
+        transcribed_again, records, stats = self.run_incremental(lines, prev_settings, previous)
+        self.assertEqual(transcribed, transcribed_again)
+        self.assertEqual({'reused': 2, 'transcribed': 0}, stats)
+        self.assertEqual([], self.calls[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
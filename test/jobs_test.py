@@ -0,0 +1,109 @@
+import os
+import time
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+from ice_g2p import jobs
+
+
+class JobsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.job_dir = Path(self.tmp_dir.name)
+        for name, content in [('a.txt', 'hlaupa í burtu\nhestur\n'), ('b.txt', 'góðan dag\n')]:
+            with open(self.job_dir / name, 'w') as f:
+                f.write(content)
+        self.manifest = self.job_dir / 'manifest.txt'
+        with open(self.manifest, 'w') as f:
+            f.write('a.txt\n# comment\n\nb.txt\n')
+        self.outdir = self.job_dir / 'out'
+        self.calls = []
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def process_lines(self, lines):
+        self.calls.append(lines)
+        return [line.upper() for line in lines]
+
+    def test_run_and_resume(self):
+        summary = jobs.run_job(self.manifest, self.outdir, self.process_lines, keep_original=True)
+        self.assertEqual({'done': 0, 'processed': 2, 'locked': 0}, summary)
+        with open(self.outdir / 'a_0_transcribed.tsv') as f:
+            self.assertEqual('hlaupa í burtu\tHLAUPA Í BURTU\nhestur\tHESTUR\n', f.read())
+        self.assertFalse(os.path.exists(str(self.outdir / 'a_0_transcribed.tsv') + jobs.LOCK_SUFFIX))
+
+        summary = jobs.run_job(self.manifest, self.outdir, self.process_lines)
+        self.assertEqual({'done': 2, 'processed': 0, 'locked': 0}, summary)
+        self.assertEqual(2, len(self.calls))
+
+    def test_locked_and_stale(self):
+        os.makedirs(self.outdir)
+        output = jobs.shard_output_path(self.outdir, 1, self.job_dir / 'b.txt')
+        self.assertTrue(jobs.claim(output))
+        summary = jobs.run_job(self.manifest, self.outdir, self.process_lines)
+        self.assertEqual({'done': 0, 'processed': 1, 'locked': 1}, summary)
+
+        # the lock is older than the timeout: the worker holding it is considered dead
+        old = time.time() - 100
+        os.utime(str(output) + jobs.LOCK_SUFFIX, (old, old))
+        summary = jobs.run_job(self.manifest, self.outdir, self.process_lines, lock_timeout=50)
+        self.assertEqual({'done': 1, 'processed': 1, 'locked': 0}, summary)
+        self.assertTrue(jobs.is_done(output))
+
+    def test_lock_token(self):
+        os.makedirs(self.outdir)
+        output = jobs.shard_output_path(self.outdir, 0, self.job_dir / 'a.txt')
+        token = jobs.claim(output)
+        self.assertTrue(jobs.refresh(output, token))
+        old = time.time() - 100
+        os.utime(str(output) + jobs.LOCK_SUFFIX, (old, old))
+        new_token = jobs.claim(output, lock_timeout=50)
+        self.assertNotEqual(token, new_token)
+        # the worker whose lock was taken over neither refreshes nor releases the new lock
+        self.assertFalse(jobs.refresh(output, token))
+        jobs.release(output, token)
+        self.assertEqual(new_token, jobs.lock_token(output))
+        jobs.release(output, new_token)
+        self.assertFalse(jobs.refresh(output, new_token))
+
+    def test_stale_takeover_race(self):
+        os.makedirs(self.outdir)
+        output = jobs.shard_output_path(self.outdir, 0, self.job_dir / 'a.txt')
+        lock_path = str(output) + jobs.LOCK_SUFFIX
+        with open(lock_path, 'w') as f:
+            f.write('dead')
+        old = time.time() - 100
+        os.utime(lock_path, (old, old))
+        rename = os.rename
+
+        def takeover_first(src, dst):
+            # another worker takes the stale lock over between our staleness check and our rename
+            with open(lock_path, 'w') as f:
+                f.write('other')
+            rename(src, dst)
+        with mock.patch.object(jobs.os, 'rename', takeover_first):
+            self.assertIsNone(jobs.claim(output, lock_timeout=50))
+        self.assertEqual('other', jobs.lock_token(output))
+        self.assertEqual([os.path.basename(lock_path)], [name for name in os.listdir(self.outdir) if 'lock' in name])
+
+    def test_lock_lost(self):
+        os.makedirs(self.outdir)
+
+        def steal_lock(lines):
+            for name in os.listdir(self.outdir):
+                if name.endswith(jobs.LOCK_SUFFIX):
+                    with open(self.outdir / name, 'w') as f:
+                        f.write('other')
+            return self.process_lines(lines)
+        summary = jobs.run_job(self.manifest, self.outdir, steal_lock)
+        self.assertEqual({'done': 0, 'processed': 0, 'locked': 2}, summary)
+        output = jobs.shard_output_path(self.outdir, 0, self.job_dir / 'a.txt')
+        self.assertFalse(jobs.is_done(output))
+        self.assertEqual('other', jobs.lock_token(output))
+
+
+if __name__ == '__main__':
+    unittest.main()
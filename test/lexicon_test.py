@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import pickle
+import tempfile
+import unittest
+from unittest import mock
+from ice_g2p import differential
+from ice_g2p import lexicon
+from ice_g2p.lexicon import Lexicon
+
+
+def write_dict(path, entries: dict):
+    with open(path, 'w') as f:
+        f.write(''.join(f'{wrd}\t{transcr}\n' for wrd, transcr in entries.items()))
+    # a distinct modification time for each version of the file
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9 * (1 + len(entries))))
+
+
+class LexiconTestCase(unittest.TestCase):
+
+    def test_layers(self):
+        lex = Lexicon(core={'hestur': 'h E s t Y r', 'haga': 'h a: G a'}, warm={'zebra': 's E p r a', 'haga': 'x'})
+        self.assertEqual('h a: G a', lex.get('haga'))
+        self.assertEqual('s E p r a', lex.get('zebra'))
+        self.assertEqual('', lex.get('war'))
+        lex.set_layer('custom', {'hestur': 'h E s t r', 'haga': ''})
+        self.assertEqual('h E s t r', lex.get('hestur'))
+        # an empty transcription does not hide the core dictionary
+        self.assertEqual('h a: G a', lex.get('haga'))
+        self.assertEqual(1, lex.version)
+        self.assertRaises(ValueError, lex.set_layer, 'other', {})
+        self.assertEqual(3, len(lex))
+        self.assertIn('haga', lex)
+        self.assertNotIn('war', lex)
+        copied = pickle.loads(pickle.dumps(lex))
+        self.assertEqual('h E s t r', copied.get('hestur'))
+
+    def test_layer_change(self):
+        core = {'hestur': 'h E s t Y r'}
+        lex = Lexicon(core=core)
+        lex.set_layer('custom', {'haga': 'h a G a'})
+        lex.update_layer('warm', {'zebra': 's E p r a'})
+        lex.update_layer('warm', {'hestur': 'x'})
+        # a change only replaces the changed layer
+        self.assertIs(core, lex.layer('core'))
+        self.assertEqual({'zebra': 's E p r a', 'hestur': 'x'}, lex.layer('warm'))
+        self.assertEqual(['h E s t Y r', 'h a G a', 's E p r a'], [lex.get(wrd) for wrd in ['hestur', 'haga', 'zebra']])
+
+    def test_compiled(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'custom.tsv')
+            write_dict(path, {'hestur': 'h E s t Y r', 'zebra': 's E p r a'})
+            self.assertEqual({'hestur': 'h E s t Y r', 'zebra': 's E p r a'}, lexicon.load_dict_file(path)[1])
+            self.assertTrue(os.path.exists(lexicon.compiled_path(path)))
+            with mock.patch.object(lexicon, 'parse_dict_file') as parse:
+                self.assertEqual('s E p r a', lexicon.load_dict_file(path)[1]['zebra'])
+                parse.assert_not_called()
+            write_dict(path, {'hestur': 'h E s t Y r'})
+            self.assertEqual({'hestur': 'h E s t Y r'}, lexicon.load_dict_file(path)[1])
+
+    def test_compiled_format(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'custom.tsv')
+            write_dict(path, {'hestur': 'h E s t Y r'})
+            signature = lexicon.file_signature(path)
+            # a compiled file in another format, e.g. a pickle, is not loaded but replaced
+            with open(lexicon.compiled_path(path), 'wb') as f:
+                pickle.dump({'version': 1, 'source': signature}, f)
+                pickle.dump({'hestur': 'x'}, f)
+            self.assertIsNone(lexicon.read_compiled(path, signature))
+            self.assertEqual({'hestur': 'h E s t Y r'}, lexicon.load_dict_file(path)[1])
+            with open(lexicon.compiled_path(path), encoding='utf-8') as f:
+                self.assertEqual({'hestur': 'h E s t Y r'}, json.loads(f.readlines()[1]))
+            self.assertEqual({'hestur': 'h E s t Y r'}, lexicon.read_compiled(path, signature))
+
+    def test_reload(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'custom.tsv')
+            write_dict(path, {'haga': 'h a: G a'})
+            lex = Lexicon(core={'hestur': 'h E s t Y r'})
+            self.assertEqual(1, lex.load('custom', path))
+            self.assertEqual([], lex.reload())
+            write_dict(path, {'haga': 'h a G a', 'zebra': 's E p r a'})
+            self.assertEqual(['custom'], lex.reload())
+            self.assertEqual('h a G a', lex.get('haga'))
+            # a broken file keeps the previous version
+            with open(path, 'a') as f:
+                f.write('no tab\n')
+            with self.assertLogs(level='ERROR'):
+                self.assertEqual([], lex.reload())
+            self.assertEqual('s E p r a', lex.get('zebra'))
+
+    def test_watch(self):
+        g2p = differential.create_transcriber({'use_dict': True})
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'custom.tsv')
+            write_dict(path, {'haga': 'h a: G a'})
+            g2p.load_custom_dict(path)
+            self.assertEqual(['custom'], [token.source for token in g2p.transcribe_tokens('haga')])
+            lex = g2p.g2p.lexicon
+            lex.watch(interval=0.01)
+            try:
+                write_dict(path, {'zebra': 's E: p r a'})
+                for i in range(500):
+                    if lex.get('zebra') == 's E: p r a':
+                        break
+                    time.sleep(0.01)
+            finally:
+                lex.stop_watching()
+            self.assertEqual('s E: p r a', g2p.transcribe('zebra'))
+
+    def test_reload_cached_compound(self):
+        g2p = differential.create_transcriber({'use_dict': True})
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'custom.tsv')
+            write_dict(path, {'hestur': 'X X X'})
+            g2p.load_custom_dict(path)
+            self.assertTrue(g2p.transcribe('zebrahestur').endswith('X X X'))
+            write_dict(path, {'hestur': 'Y Y'})
+            self.assertEqual(['custom'], g2p.g2p.lexicon.reload())
+            # the compound transcribed before the reload is transcribed again with the new part
+            self.assertTrue(g2p.transcribe('zebrahestur').endswith('Y Y'))
+            self.assertTrue(g2p.transcribe('asnahestur').endswith('Y Y'))
+
+
+if __name__ == '__main__':
+    unittest.main()
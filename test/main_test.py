@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from ice_g2p import differential
+from ice_g2p import main
+from ice_g2p.transcriber import Transcriber
+
+
+class MainTestCase(unittest.TestCase):
+
+    def test_line_tokens(self):
+        g2p = differential.create_transcriber({})
+        tokens = []
+        transcribed = main.transcribe_line(g2p, 'zebrahestur í haga', tokens=tokens)
+        self.assertEqual(g2p.transcribe('zebrahestur í haga'), transcribed)
+        self.assertEqual(transcribed, ' '.join(transcr for wrd, transcr in tokens))
+        self.assertEqual(['zebrahestur', 'í', 'haga'], [wrd for wrd, transcr in tokens])
+
+    def test_deadline_tokens(self):
+        g2p = differential.create_transcriber({})
+        tokens = []
+        degraded = {}
+        # without time for a model call, the tokens are degraded like the line
+        transcribed = main.transcribe_line(g2p, 'zebrahestur haga', 0, degraded, tokens)
+        self.assertEqual({'zebrahestur', 'haga'}, set(degraded))
+        self.assertEqual(transcribed, ' '.join(transcr for wrd, transcr in tokens))
+
+    def test_dialect_tokens(self):
+        g2p = differential.create_transcriber({}, dialects=['standard', 'north'])
+        tokens = []
+        transcribed = main.transcribe_line(g2p, 'hestur', tokens=tokens)
+        self.assertEqual([('hestur', transcribed)], tokens)
+
+    def test_incremental_rerun(self):
+        with tempfile.TemporaryDirectory() as tmp_dir, \
+                mock.patch.object(main, 'Transcriber',
+                                  lambda *args, **kwargs: Transcriber(*args, model=differential.StubModel(), **kwargs)):
+            with open(os.path.join(tmp_dir, 'a.txt'), 'w') as f:
+                f.write('hestur í haga\nzebrahestur\n')
+            self.assertEqual({'reused': 0, 'transcribed': 2}, main.process_incremental(tmp_dir, '_transcribed'))
+            # the output of the first run is not an input of the next runs
+            for run in range(2):
+                self.assertEqual({'reused': 2, 'transcribed': 0}, main.process_incremental(tmp_dir, '_transcribed'))
+            self.assertEqual(['a.txt', 'a_transcribed.tsv', 'a_transcribed.tsv.prov.jsonl'], sorted(os.listdir(tmp_dir)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,25 @@
+import unittest
+from ice_g2p.dictionaries import get_dictionary
+from ice_g2p.morphology import MorphIndex, evaluate
+
+
+class MorphologyTestCase(unittest.TestCase):
+
+    def test_inflected_form(self):
+        pron_dict = {'hestur': 'h E s t Y r', 'hesta': 'h E s t a', 'hestanna': 'h E s t a n a',
+                     'kettir': 'c_h E h t I r', 'ketta': 'c_h E h t a', 'kettanna': 'c_h E h t a n a',
+                     'bíla': 'p i: l a', 'bílanna': 'p i: l a n a', 'hundur': 'h Y n t Y r', 'hunda': 'h Y n t a'}
+        index = MorphIndex(pron_dict, min_count=2)
+        self.assertEqual('h Y n t a n a', index.lookup('hundanna'))
+        self.assertEqual('', index.lookup('hundinum'))
+        self.assertEqual(1, index.saved_calls['word'])
+
+    def test_held_out_accuracy(self):
+        result = evaluate(get_dictionary('standard'), holdout=0.02, seed=3)
+        self.assertGreater(result['coverage'], 0.4)
+        self.assertGreater(result['accuracy'], 0.9)
+        self.assertLess(result['per'], 0.02)
+
+
+if __name__ == '__main__':
+    unittest.main()
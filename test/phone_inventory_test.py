@@ -0,0 +1,55 @@
+import unittest
+from ice_g2p.phone_inventory import get_inventory, rfind
+from ice_g2p import tree_builder
+from ice_g2p.entry import PronDictEntry
+from ice_g2p.tree_builder import compare_transcripts
+from ice_g2p.converter import Converter
+
+
+class PhoneInventoryTestCase(unittest.TestCase):
+
+    def test_encode_decode(self):
+        inventory = get_inventory()
+        phone_ids = inventory.encode('p_h au f Y k l_0')
+        self.assertEqual(['p_h', 'au', 'f', 'Y', 'k', 'l_0'], inventory.decode(phone_ids))
+        self.assertEqual([0, 1, 0, 1, 0, 0], [inventory.is_vowel[p] for p in phone_ids])
+        self.assertTrue(inventory.same_base(inventory.ids['a:'], inventory.ids['a']))
+        self.assertTrue(inventory.same_base(inventory.ids['t_h'], inventory.ids['t']))
+        self.assertFalse(inventory.same_base(inventory.ids['t_h'], inventory.ids['k']))
+
+    def test_rfind(self):
+        inventory = get_inventory()
+        comp = inventory.encode('l_0 9i: p a s t r au k Y r')
+        self.assertEqual(4, rfind(comp, inventory.encode('s t r au k Y r')))
+        self.assertEqual(-1, rfind(comp, inventory.encode('s t r au: k Y r')))
+
+    def test_compare_transcripts(self):
+        inventory = get_inventory()
+        comp = inventory.encode('l_0 Y: t_h a v I')
+        self.assertEqual(3, compare_transcripts(comp, inventory.encode('h a: v I')))
+        comp = inventory.encode('k r ei: a m')
+        self.assertEqual(3, compare_transcripts(comp, inventory.encode('h a: m')))
+        self.assertEqual(-1, compare_transcripts(comp, inventory.encode('h I: m')))
+
+    def test_head_phones_alphabet(self):
+        maps = tree_builder.MODIFIER_MAP, tree_builder.HEAD_MAP, tree_builder.TRANSCR_MAP
+        try:
+            tree_builder.set_compound_maps({}, {}, {'hestur': 'h E s t Y r'})
+            ipa_entry = PronDictEntry('hestur', 'h E s t Y r', alphabet='IPA')
+            self.assertEqual(0, len(tree_builder.extract_transcription(ipa_entry, 'hestur')[0]))
+            # the head transcript cached for the IPA entry is not reused with the ids of another inventory
+            entry = PronDictEntry('zebrahestur', 's E p r a h E s t Y r')
+            modifier, head = tree_builder.extract_transcription(entry, 'hestur')
+            self.assertEqual('h E s t Y r', get_inventory().to_string(head))
+        finally:
+            tree_builder.set_compound_maps(*maps)
+
+    def test_convert(self):
+        converter = Converter()
+        self.assertEqual('pʰ au f ʏ k l̥', converter.convert('p_h au f Y k l_0', 'SAMPA', 'IPA'))
+        self.assertEqual('p_h au f Y k l_0', converter.convert('pʰ au f ʏ k l̥', 'IPA', 'SAMPA'))
+        self.assertEqual('ph au f Y k lz', converter.convert('p_h au f Y k l_0', 'SAMPA', 'FLITE'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+from ice_g2p import differential
+from ice_g2p.pipeline import Pipeline, Stage
+
+
+class UpperStage(Stage):
+    name = 'upper'
+
+    def process(self, batch: list) -> None:
+        for tokens in batch:
+            for token in tokens:
+                token.normalized = token.normalized.upper()
+
+
+class PipelineTestCase(unittest.TestCase):
+
+    def test_stages(self):
+        g2p = differential.create_transcriber({'use_dict': True, 'syllab_symbol': '.', 'stress_label': True})
+        pipeline = Pipeline.create(g2p.g2p, use_dict=True, syllab_symbol='.', stress_label=True)
+        self.assertEqual(['normalize', 'lexicon', 'compound', 'model', 'syllabify', 'stress'],
+                         [stage.name for stage in pipeline.stages])
+        pipeline.insert('lexicon', UpperStage())
+        pipeline.remove('compound')
+        self.assertEqual(['normalize', 'upper', 'lexicon', 'model', 'syllabify', 'stress'],
+                         [stage.name for stage in pipeline.stages])
+        pipeline.replace('upper', Stage())
+        self.assertRaises(KeyError, pipeline.stage, 'upper')
+        self.assertRaises(KeyError, pipeline.remove, 'compound')
+
+    def test_transcribe(self):
+        options = {'use_dict': True, 'syllab_symbol': '.', 'stress_label': True}
+        g2p = differential.create_transcriber(options)
+        lines = ['hestur í haga', 'hlaupastrákur og zebrahestur', 'zebrahestur']
+        expected = [g2p.transcribe(line) for line in lines]
+        g2p = differential.create_transcriber(options)
+        pipeline = Pipeline.create(g2p.g2p, use_dict=True, syllab_symbol='.', stress_label=True)
+        self.assertEqual(expected, pipeline.transcribe(lines))
+        self.assertEqual({'normalize', 'lexicon', 'compound', 'model', 'syllabify', 'stress', 'format'},
+                         set(pipeline.timings))
+
+    def test_batched_model_calls(self):
+        g2p = differential.create_transcriber({'use_dict': True})
+        model = g2p.g2p.g2p_model
+        calls = []
+        translate = model.translate
+
+        def counting_translate(sentences, **kwargs):
+            calls.append(sentences)
+            return translate(sentences, **kwargs)
+        model.translate = counting_translate
+        tokens = g2p.pipeline.run(['zebrahestur í vxyz', 'zebra pakkhústrítill'])
+        self.assertEqual(1, len(calls))
+        self.assertEqual([['model', 'dict', 'model'], ['model', 'model']],
+                         [[token.source for token in line] for line in tokens])
+        # the results are cached
+        g2p.transcribe('zebrahestur pakkhústrítill')
+        self.assertEqual(1, len(calls))
+
+    def test_output_options(self):
+        g2p = differential.create_transcriber({})
+        pipeline = g2p.pipeline
+        self.assertIs(pipeline, g2p.pipeline)
+        g2p.syllab_symbol = '.'
+        self.assertIn('syllabify', [stage.name for stage in g2p.pipeline.stages])
+        self.assertNotIn('syllabify', [stage.name for stage in pipeline.stages])
+
+    def test_lookup_options(self):
+        g2p = differential.create_transcriber({})
+        g2p.transcribe('hestur')
+        g2p.use_dict = True
+        self.assertEqual(differential.create_transcriber({'use_dict': True}).transcribe('hlaupa'),
+                         g2p.transcribe('hlaupa'))
+        self.assertEqual(['dict'], [token.source for token in g2p.transcribe_tokens('hlaupa')])
+
+    def test_shared_lookup(self):
+        g2p = differential.create_transcriber({'use_dict': True})
+        g2p.set_custom_dict({'war': 'v a r'})
+        fairseq_g2p = g2p.g2p
+        # all entry points look the words up the same way as the lexicon stage
+        self.assertEqual({'war': 'v a r', 'wür': ''}, fairseq_g2p.transcribe_words(['war', 'wür'], True))
+        self.assertEqual(('v a r', ''), fairseq_g2p.transcribe_within('war', True, 0))
+        self.assertEqual([('v a r', 0.0)], fairseq_g2p.transcribe_nbest('war', 3, True))
+        self.assertEqual([], fairseq_g2p.transcribe_nbest('wür', 3, True))
+        self.assertEqual('v a r', g2p.transcribe('war'))
+
+
+if __name__ == '__main__':
+    unittest.main()
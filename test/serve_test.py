@@ -0,0 +1,69 @@
+import io
+import json
+import queue
+import unittest
+from ice_g2p import differential
+from ice_g2p import serve
+
+
+class ServeTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.g2p = differential.create_transcriber({'use_dict': True}, dialects=['standard', 'north'])
+        self.defaults = {'dialect': 'standard', 'syll': '', 'sep': '', 'stress': False, 'alphabet': None}
+        self.server = serve.Server(self.g2p, self.defaults)
+
+    def run_server(self, requests: list) -> list:
+        instream = io.StringIO(''.join(json.dumps(request) + '\n' for request in requests))
+        outstream = io.StringIO()
+        self.server.serve(instream, outstream)
+        return [json.loads(line) for line in outstream.getvalue().splitlines()]
+
+    def test_responses_in_order(self):
+        responses = self.run_server([{'id': 1, 'text': 'hestur í haga'},
+                                     {'id': 2, 'text': 'zebrahestur', 'dialect': 'north'},
+                                     {'id': 3, 'text': 'hestur', 'syll': '.', 'stress': True},
+                                     {'id': 4, 'text': 'hestur', 'dialect': 'east'},
+                                     {'id': 5, 'text': 'haga', 'alphabet': 'IPA'}])
+        self.assertEqual([1, 2, 3, 4, 5], [response['id'] for response in responses])
+        self.assertEqual(self.g2p.transcribe('hestur í haga'), responses[0]['transcription'])
+        self.assertEqual(self.g2p.transcribe_dialects('zebrahestur')['north'], responses[1]['transcription'])
+        self.assertIn('.', responses[2]['transcription'])
+        self.assertIn('error', responses[3])
+        self.assertIn('ː', responses[4]['transcription'])
+
+    def test_invalid_request(self):
+        responses = self.server.handle_batch(['no json\n', '{"id": 7}\n'])
+        self.assertEqual([None, 7], [response['id'] for response in responses])
+        self.assertTrue(all('error' in response for response in responses))
+
+    def test_option_types(self):
+        responses = self.server.handle_batch(['{"id": 1, "text": "hestur", "syll": {"a": 1}}\n',
+                                              '{"id": 2, "text": "hestur", "syll": 5}\n',
+                                              '{"id": 3, "text": "hestur", "stress": "yes"}\n',
+                                              '{"id": 4, "text": "hestur"}\n'])
+        self.assertEqual([True, True, True, False], ['error' in response for response in responses])
+        self.assertEqual(self.g2p.transcribe('hestur'), responses[3]['transcription'])
+
+    def test_unexpected_error(self):
+        render = self.g2p.render
+
+        def failing_render(text, table, cmu=False):
+            if text == 'haga':
+                raise RuntimeError('failed')
+            return render(text, table, cmu)
+        self.server.formatter('', '', False).render = failing_render
+        with self.assertLogs(level='ERROR'):
+            responses = self.server.handle_batch(['{"id": 1, "text": "haga"}\n', '{"id": 2, "text": "hestur"}\n'])
+        self.assertEqual('internal error: failed', responses[0]['error'])
+        self.assertEqual(self.g2p.transcribe('hestur'), responses[1]['transcription'])
+
+    def test_waiting_requests_form_one_batch(self):
+        requests = queue.Queue()
+        serve.read_requests(io.StringIO('a\nb\nc\n'), requests)
+        self.assertEqual((['a\n', 'b\n'], False), serve.next_batch(requests, max_batch=2))
+        self.assertEqual((['c\n'], True), serve.next_batch(requests))
+
+
+if __name__ == '__main__':
+    unittest.main()
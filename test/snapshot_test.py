@@ -0,0 +1,36 @@
+import os
+import tempfile
+import unittest
+from ice_g2p import differential
+from ice_g2p.transcriber import Transcriber
+
+
+class SnapshotTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.g2p = differential.create_transcriber({'use_dict': True, 'syllab_symbol': '.', 'stress_label': True})
+        self.line = 'hestur í haga zebrahestur'
+
+    def test_snapshot_equals_transcriber(self):
+        expected = self.g2p.transcribe(self.line)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'g2p.snapshot')
+            self.g2p.save_snapshot(path)
+            loaded = Transcriber.load_snapshot(path)
+        # the cache is only saved on request, and the transcriber keeps its own cache
+        self.assertEqual({}, loaded.g2p.automatic_g2p_dict)
+        self.assertIn('zebrahestur', self.g2p.g2p.automatic_g2p_dict)
+        self.assertEqual(expected, loaded.transcribe(self.line))
+        self.assertEqual(self.g2p.g2p.model_hash, loaded.g2p.model_hash)
+
+    def test_snapshot_with_cache(self):
+        self.g2p.transcribe(self.line)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'g2p.snapshot')
+            self.g2p.save_snapshot(path, include_cache=True)
+            loaded = Transcriber.load_snapshot(path)
+        self.assertEqual(self.g2p.g2p.automatic_g2p_dict, loaded.g2p.automatic_g2p_dict)
+
+
+if __name__ == '__main__':
+    unittest.main()
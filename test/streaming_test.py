@@ -0,0 +1,53 @@
+import os
+import json
+import tempfile
+import unittest
+from ice_g2p import corpus_io
+from ice_g2p import differential
+from ice_g2p import streaming
+
+LINES = ['hestur í haga', 'hlaupastrákur og zebrahestur', '', 'war', 'hestur í haga', 'zebrahestur']
+
+
+class StreamingTestCase(unittest.TestCase):
+
+    def transcribe(self, options, out_format='tsv', keep_original=True):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            in_path = os.path.join(tmp_dir, 'corpus.txt.gz')
+            corpus_io.write_records(in_path, [(line, line, None) for line in LINES])
+            out_path = os.path.join(tmp_dir, 'corpus_transcribed.' + out_format)
+            file_transcriber = streaming.FileTranscriber(differential.create_transcriber(options),
+                                                         out_format=out_format, keep_original=keep_original,
+                                                         chunk_lines=2, queue_size=1)
+            count = file_transcriber.transcribe_file(in_path, out_path)
+            output = corpus_io.read_lines(out_path)
+        self.assertEqual(count, len(output))
+        return output
+
+    def test_same_as_line_by_line(self):
+        options = {'use_dict': True, 'syllab_symbol': '.', 'stress_label': True, 'word_sep': '-'}
+        g2p = differential.create_transcriber(options)
+        expected = [line + '\t' + g2p.transcribe(line) for line in dict.fromkeys(LINES)]
+        self.assertEqual(expected, self.transcribe(options))
+
+    def test_jsonl(self):
+        output = [json.loads(line) for line in self.transcribe({'use_dict': True}, 'jsonl')]
+        self.assertEqual(list(dict.fromkeys(LINES)), [record['text'] for record in output])
+        self.assertEqual(['hestur', 'í', 'haga'], [token['word'] for token in output[0]['tokens']])
+
+    def test_error_stops_all_stages(self):
+        g2p = differential.create_transcriber({'use_dict': True})
+
+        def fail(*args, **kwargs):
+            raise RuntimeError('model failure')
+        g2p.g2p.model_transcribe_batch = fail
+        file_transcriber = streaming.FileTranscriber(g2p, chunk_lines=1, queue_size=1)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            in_path = os.path.join(tmp_dir, 'corpus.txt')
+            corpus_io.write_records(in_path, [('', 'zebrahestur', None)] * 20)
+            with self.assertRaises(RuntimeError):
+                file_transcriber.transcribe_file(in_path, os.path.join(tmp_dir, 'out.tsv'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+from ice_g2p import syllab_stress_processing as syllabify
+from ice_g2p.stress import set_stress
+
+
+class SyllabStressTestCase(unittest.TestCase):
+
+    def get_tuples(self):
+        return [('hlaupa', 'l_0 9i: p a'), ('hlaupastrákur', 'l_0 9i: p a s t r au k Y r'),
+                ('djasstónlistarkennsla', 't j a s t ou n l I s t a r c_h E n s t l a')]
+
+    def labeled(self, syllabified):
+        return [entr.stress_format() for entr in set_stress(list(syllabified.values()))]
+
+    def test_cached_equals_uncached(self):
+        tuples = self.get_tuples()
+        expected = self.labeled(syllabify.syllabify_and_label(syllabify.init_pron_dict_from_tuples(tuples)))
+        for i in range(2):
+            cached = syllabify.syllabify_and_label_cached(syllabify.init_pron_dict_from_tuples(tuples))
+            self.assertEqual(expected, self.labeled(cached))
+
+    def test_cached_copies(self):
+        syllabify.clear_syllab_cache()
+        pron_dict = syllabify.init_pron_dict_from_tuples([('hlaupa', 'l_0 9i: p a')], '-')
+        first = syllabify.syllabify_and_label_cached(pron_dict)['hlaupa']
+        first.syllables[1].stress = 1
+        second = syllabify.syllabify_and_label_cached(pron_dict)['hlaupa']
+        self.assertEqual(0, second.syllables[1].stress)
+        self.assertEqual('l_0 9i: - p a', second.dot_format_syllables())
+        self.assertEqual(1, syllabify.syllab_cache_info().hits)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,26 @@
+import io
+import os
+import unittest
+from ice_g2p import syllabify_dict
+from ice_g2p.syllab_stress_processing import read_dict_tuples
+
+DICT_FILE = os.path.join(os.path.dirname(syllabify_dict.__file__), 'dictionaries/ice_pron_dict_standard_clear.csv')
+
+
+class SyllabifyDictTestCase(unittest.TestCase):
+
+    def test_safe_boundaries(self):
+        words = ['hest', 'hestur', 'hestar', 'hestarnir', 'hesta', 'hús', 'húsið', 'kona']
+        self.assertEqual([0, 5, 7], syllabify_dict.safe_boundaries(words))
+
+    def test_parallel_equals_serial(self):
+        entries = read_dict_tuples(DICT_FILE)[:5000]
+        for out_format in syllabify_dict.FORMATS:
+            serial = syllabify_dict.process_shard(entries, out_format)
+            out = io.StringIO()
+            syllabify_dict.syllabify_dict(entries, out, out_format, processes=2, shard_size=100)
+            self.assertEqual(serial, out.getvalue().splitlines())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+from unittest import mock
+from ice_g2p import differential
+from ice_g2p import phone_inventory
+from ice_g2p import syllab_stress_processing
+from ice_g2p.tokens import Token
+
+
+class TokensTestCase(unittest.TestCase):
+
+    def test_tokens(self):
+        g2p = differential.create_transcriber({'use_dict': True})
+        g2p.set_custom_dict({'haga': 'h a: G a'})
+        tokens = g2p.transcribe_tokens('hestur í haga zebrahestur war')
+        self.assertEqual(['hestur', 'í', 'haga', 'zebrahestur', 'war'], [token.word for token in tokens])
+        self.assertEqual(['dict', 'dict', 'custom', 'model', 'invalid'], [token.source for token in tokens])
+        self.assertEqual(('h', 'E', 's', 't', 'Y', 'r'), tokens[0].phones)
+        self.assertEqual((), tokens[4].phones)
+        self.assertEqual([], tokens[0].syllables)
+        # cached words keep their source
+        self.assertEqual('model', g2p.transcribe_tokens('zebrahestur')[0].source)
+
+    def test_syllabified_tokens(self):
+        g2p = differential.create_transcriber({'use_dict': True, 'syllab_symbol': '.', 'stress_label': True})
+        line = 'hlaupa í burtu hlaupastrákur'
+        tokens = g2p.transcribe_tokens(line)
+        for token in tokens:
+            spans = token.syllables
+            self.assertEqual(len(spans), len(token.stress))
+            self.assertEqual(0, spans[0][0])
+            self.assertEqual(len(token.phones), spans[-1][1])
+        self.assertEqual(1, tokens[3].stress[0])
+        self.assertEqual(g2p.transcribe(line), g2p.format_tokens(tokens))
+
+    def test_phones(self):
+        token = Token('hestur', 'h E s t Y r')
+        self.assertEqual(('h', 'E', 's', 't', 'Y', 'r'), token.phones)
+        token.transcript = 'h E s t r'
+        self.assertEqual(('h', 'E', 's', 't', 'r'), token.phones)
+        # syllabification starts from the phones, the transcription string is not parsed again
+        g2p = differential.create_transcriber({'syllab_symbol': '.'})
+        syllab_stress_processing.clear_syllab_cache()
+        encode = phone_inventory.PhoneInventory.encode
+        encoded = []
+
+        def recording_encode(inventory, transcript):
+            encoded.append(transcript)
+            return encode(inventory, transcript)
+        with mock.patch.object(phone_inventory.PhoneInventory, 'encode', recording_encode):
+            tokens = g2p.transcribe_tokens('zebrahestur')
+        self.assertNotIn(tokens[0].transcript, encoded)
+        self.assertEqual(g2p.transcribe('zebrahestur'), g2p.format_tokens(tokens))
+
+
+if __name__ == '__main__':
+    unittest.main()
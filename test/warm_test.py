@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+from ice_g2p import differential
+from ice_g2p import warm
+from ice_g2p.g2p_lstm import FairseqG2P
+
+WORDS = ['hestur', 'zebrahestur', 'war', 'hestur', 'pakkhústrítill', 'zebra', 'og']
+
+
+class WarmTestCase(unittest.TestCase):
+
+    def test_ranked_words(self):
+        self.assertEqual(['hestur', 'zebra'], list(warm.ranked_words(['hestur\t10', '', 'zebra\t5', 'hestur\t1'])))
+
+    def test_unknown_words(self):
+        g2p = FairseqG2P(g2p_model=differential.StubModel())
+        self.assertEqual(['zebrahestur', 'pakkhústrítill'], warm.unknown_words(g2p, WORDS, 2))
+
+    def test_round_trip(self):
+        g2p = FairseqG2P(g2p_model=differential.StubModel())
+        transcribed = warm.build_warm_cache(g2p, WORDS, 10, chunk_words=2)
+        self.assertEqual(['zebrahestur', 'pakkhústrítill', 'zebra'], list(transcribed))
+        self.assertEqual(transcribed['zebrahestur'], g2p.model_transcribe('zebrahestur', True))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'warm.tsv.gz')
+            warm.write_warm_cache(path, g2p, transcribed)
+
+            g2p = differential.create_transcriber({'use_dict': True})
+            calls = []
+            g2p.g2p.translate_batch = lambda parts: calls.append(parts)
+            self.assertEqual(3, g2p.load_warm_cache(path))
+            tokens = g2p.transcribe_tokens('zebrahestur og zebra')
+            self.assertEqual([], calls)
+            self.assertEqual([transcribed['zebrahestur'], transcribed['zebra']],
+                             [tokens[0].transcript, tokens[2].transcript])
+            self.assertEqual('model', tokens[0].source)
+
+            # a cache of another model is skipped
+            g2p = differential.create_transcriber({'use_dict': True})
+            g2p.g2p.decoding = {'beam': 1}
+            self.assertEqual(0, g2p.load_warm_cache(path))
+            self.assertEqual({}, g2p.g2p.warm_dict)
+
+
+if __name__ == '__main__':
+    unittest.main()